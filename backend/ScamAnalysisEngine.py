@@ -11,19 +11,102 @@ Requirements:
 
 import re
 import os
+import time
+import asyncio
+import hashlib
+import threading
+import weakref
 from typing import Optional, List
+import httpx
 from dotenv import load_dotenv
 
+from result_cache import ResultCache
+from local_scorer import extract_features, preclassify
+from script_index import ScriptMatch, nearest as nearest_script
+from model_router import ModelRouter
+
 from google import genai
 from google.genai import errors as genai_errors
+from google.genai import types as genai_types
 
 load_dotenv()
 
+# Without a key every call is labelled by the deterministic fallback rules
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY environment variable is not set")
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Per-request deadline for a model call, in seconds
+GEMINI_TIMEOUT_S = float(os.getenv("GEMINI_TIMEOUT_S", "10"))
+# Size of the shared connection pool used by the async client
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+# Hedging (async path only): if the first model hasn't answered after its p95 latency
+# (or GEMINI_HEDGE_DELAY_MS if set), also ask the next healthy model and take the first valid label
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "1") == "1"
+GEMINI_HEDGE_DELAY_MS = os.getenv("GEMINI_HEDGE_DELAY_MS")
+_DEFAULT_HEDGE_DELAY_MS = 1500.0
+_MIN_HEDGE_DELAY_MS = 100.0
+
+def make_client(base_url: Optional[str] = None) -> genai.Client:
+    """
+    Build the Gemini client. The async side shares one pooled httpx client, so requests
+    reuse keep-alive connections instead of paying a TLS handshake each time.
+    base_url (or GEMINI_BASE_URL) points it at a proxy or a local fake server.
+    """
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY environment variable is not set")
+    http_options = genai_types.HttpOptions(
+        base_url=base_url or os.getenv("GEMINI_BASE_URL") or None,
+        timeout=int(GEMINI_TIMEOUT_S * 1000),
+        httpx_async_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+            ),
+            timeout=GEMINI_TIMEOUT_S,
+        ),
+    )
+    return genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+
+# Built on first use (get_client), so importing this module needs no key and does no set-up
+client: Optional[genai.Client] = None
+_client_lock = threading.Lock()
+
+def get_client() -> genai.Client:
+    """The shared sync client, built on first call."""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = make_client()
+    return client
+
+# httpx pools its connections on the event loop that opened them, so an async client
+# must not outlive its loop: classify_calls() runs a fresh loop per call, and a pooled
+# connection from a closed loop fails with "Event loop is closed". Each loop gets its own
+# client (the server has one long-lived loop, so one pool); it goes when the loop does.
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, genai.Client]" = weakref.WeakKeyDictionary()
+_loop_clients_lock = threading.Lock()
+
+def _async_client() -> genai.Client:
+    loop = asyncio.get_running_loop()
+    with _loop_clients_lock:
+        loop_client = _loop_clients.get(loop)
+        if loop_client is None:
+            loop_client = _loop_clients[loop] = make_client()
+    return loop_client
+
+def warm_up() -> bool:
+    """
+    Build the clients before the first request: the sync one, and the async one for the
+    running event loop if called from it. False if no API key is configured.
+    """
+    if not GEMINI_API_KEY:
+        return False
+    get_client()
+    try:
+        _async_client()
+    except RuntimeError:
+        pass  # no running loop
+    return True
 
 # Candidate models to try (ordered). Update or reorder if you have other preferred models.
 CANDIDATE_MODELS = [
@@ -33,23 +116,46 @@ CANDIDATE_MODELS = [
     "chat-bison"         # Vertex-style fallback (if you're on Vertex), may or may not be present
 ]
 
+MODEL_ROUTER = ModelRouter(
+    CANDIDATE_MODELS,
+    failure_threshold=int(os.getenv("MODEL_FAILURE_THRESHOLD", "2")),
+    cooldown=float(os.getenv("MODEL_COOLDOWN_S", "60")),
+    not_found_cooldown=float(os.getenv("MODEL_NOT_FOUND_COOLDOWN_S", "3600")),
+)
+
+# Cache of model labels keyed by normalised transcript + caller history, so re-analysed calls
+# and repeated robocall scripts cost one model call. CLASSIFY_CACHE_SIZE=0 disables the
+# in-memory tier; CLASSIFY_CACHE_DB adds a persistent SQLite tier.
+CLASSIFY_CACHE = ResultCache(
+    maxsize=int(os.getenv("CLASSIFY_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("CLASSIFY_CACHE_TTL", str(24 * 3600))),
+    db_path=os.getenv("CLASSIFY_CACHE_DB") or None,
+)
+
 def list_available_models() -> List[str]:
     """Return a list of model names available to your client (for debugging)."""
     try:
-        models = client.models.list()
+        models = get_client().models.list()
         # models might be a list-like of objects with .name
         return [getattr(m, "name", str(m)) for m in models]
     except Exception as e:
         # Don't crash; return empty list on error
         return []
 
-def _build_prompt(transcript: str, total_logs: int, medium_flags: int, high_flags: int) -> str:
+def _script_line(script: Optional[ScriptMatch]) -> str:
+    if script is None:
+        return ""
+    return f"- Closest known scam script: {script.category} (similarity {script.similarity:.2f} of 1)\n"
+
+def _build_prompt(transcript: str, total_logs: int, medium_flags: int, high_flags: int,
+                  script: Optional[ScriptMatch] = None) -> str:
     return (
         "You are a classification assistant that MUST respond with exactly one character: 0, 1, or 2, and nothing else.\n\n"
         f"Input:\n- Transcript: \"\"\"{transcript}\"\"\"\n"
         f"- Total times this phone number has been logged: {total_logs}\n"
         f"- Times flagged as MEDIUM-likelihood calls: {medium_flags}\n"
-        f"- Times flagged as HIGH-likelihood calls: {high_flags}\n\n"
+        f"- Times flagged as HIGH-likelihood calls: {high_flags}\n"
+        f"{_script_line(script)}\n"
         "Scoring rules:\n0 = low likelihood of scam\n1 = medium likelihood of scam\n2 = high likelihood of scam\n\n"
         "Consider transcript indicators (urgent requests, money requests, verification codes, threats, "
         "requests for remote access, gift cards, etc.) and numeric history.  "
@@ -62,7 +168,18 @@ def _call_with_model(prompt: str, model: str) -> str:
     Raise the underlying exception to let the caller decide how to handle it.
     """
     # Different SDKs may return objects with different attributes.
-    response = client.models.generate_content(model=model, contents=prompt)
+    response = get_client().models.generate_content(model=model, contents=prompt)
+    return _response_text(response)
+
+async def _call_with_model_async(prompt: str, model: str) -> str:
+    """Async variant of _call_with_model with a hard per-call deadline (asyncio.TimeoutError)."""
+    response = await asyncio.wait_for(
+        _async_client().aio.models.generate_content(model=model, contents=prompt),
+        timeout=GEMINI_TIMEOUT_S,
+    )
+    return _response_text(response)
+
+def _response_text(response) -> str:
     # Try common ways to read text
     text = getattr(response, "text", None)
     if text:
@@ -88,17 +205,12 @@ def _extract_exact_label(text: str) -> Optional[str]:
     # Otherwise reject
     return None
 
-def _fallback_rule(transcript: str, total_logs: int, medium_flags: int, high_flags: int) -> str:
+def _fallback_rule(transcript: str, total_logs: int, medium_flags: int, high_flags: int,
+                   script: Optional[ScriptMatch] = None) -> str:
     """Deterministic fallback if LLM is unavailable or returns bad output."""
-    t = transcript.lower()
-    scam_keywords = [
-        "send money", "wire", "western union", "gift card", "social security",
-        "ssn", "account suspended", "verify your account", "press 1", "press 2",
-        "immediately", "unauthorized", "confirm your", "verification code",
-        "pay now", "bank transfer", "atm", "lottery", "congratulations you won",
-        "one-time code", "otp", "call back"
-    ]
-    keyword_hits = sum(1 for k in scam_keywords if k in t)
+    keyword_hits = extract_features(transcript).strong_hits
+    if script is not None:
+        keyword_hits += 1  # resembling a known scam script counts as a strong phrase
     high_ratio = high_flags / max(1, total_logs)
     med_ratio = medium_flags / max(1, total_logs)
 
@@ -109,38 +221,41 @@ def _fallback_rule(transcript: str, total_logs: int, medium_flags: int, high_fla
         return "1"
     return "0"
 
-def classify_call(
-    transcript: str,
-    total_logs: int,
-    medium_flags: int,
-    high_flags: int,
-    #candidate_models: List[str] = None,
-    #list_models_if_none_available: bool = False
-) -> str:
+def probe_model(model: str) -> None:
+    """Background health probe: raise unless the model answers with a valid label."""
+    raw = _call_with_model("Reply with exactly one character: 0", model=model)
+    if not _extract_exact_label(raw):
+        raise RuntimeError(f"invalid output: {raw!r}")
+
+def _classify_prompt(prompt: str) -> Optional[str]:
     """
-    Return exactly one character string: '0', '1', or '2'.
-    Attempts an ordered list of models. Falls back deterministically if needed.
+    Run a prompt through the candidate models until one returns an exact label.
+    Returns None if every model failed or returned invalid output.
     """
-    prompt = _build_prompt(transcript, total_logs, medium_flags, high_flags)
-    models_to_try = CANDIDATE_MODELS
-
+    if not GEMINI_API_KEY:
+        return None
     last_error = None
-    # Try each candidate model until one works and returns an exact label
-    for model_name in models_to_try:
+    # Try each candidate model until one works and returns an exact label.
+    # The router orders them by health/latency and skips models whose circuit is open.
+    for model_name in MODEL_ROUTER.candidates():
+        started = time.monotonic()
         try:
             raw = _call_with_model(prompt, model=model_name)
             label = _extract_exact_label(raw)
             if label:
+                MODEL_ROUTER.record_success(model_name, time.monotonic() - started)
                 return label
             # If model returned something but not exactly one char, try next model
             last_error = RuntimeError(f"Model {model_name} returned invalid output: {repr(raw)}")
+            MODEL_ROUTER.record_failure(model_name, str(last_error))
         except genai_errors.ClientError as ce:
-            # If model is not found, try next candidate. Save last_error for logging/final decision.
+            # A 404 means this key can't use the model at all; keep it out of rotation for longer
             last_error = ce
-            # If it is a 404 for model not found, continue; otherwise if it's a transient error we might retry next model.
+            MODEL_ROUTER.record_failure(model_name, str(ce), not_found=getattr(ce, "code", None) == 404)
             continue
         except Exception as e:
             last_error = e
+            MODEL_ROUTER.record_failure(model_name, str(e))
             continue
 
     # If we get here, all model attempts failed or returned invalid outputs.
@@ -150,8 +265,381 @@ def classify_call(
         # we don't print this to stdout because the user requested exactly one character output.
         # but we could optionally log to stderr or a file — for now we ignore printing.
         # (If you want to debug, run list_available_models() in an interactive session)
+    return None
+
+async def _attempt_async(prompt: str, model_name: str, parse=_extract_exact_label):
+    """
+    One async request with health bookkeeping. Returns parse(raw output), or None on any
+    failure; a falsy parse result counts as invalid output.
+    """
+    started = time.monotonic()
+    try:
+        raw = await _call_with_model_async(prompt, model=model_name)
+    except asyncio.TimeoutError:
+        MODEL_ROUTER.record_failure(model_name, f"timed out after {GEMINI_TIMEOUT_S}s")
+        return None
+    except genai_errors.ClientError as ce:
+        MODEL_ROUTER.record_failure(model_name, str(ce), not_found=getattr(ce, "code", None) == 404)
+        return None
+    except Exception as e:
+        MODEL_ROUTER.record_failure(model_name, str(e))
+        return None
+    parsed = parse(raw)
+    if parsed:
+        MODEL_ROUTER.record_success(model_name, time.monotonic() - started)
+        return parsed
+    MODEL_ROUTER.record_failure(model_name, f"returned invalid output: {raw!r}")
+    return None
+
+def _hedge_delay_s(model_name: str) -> float:
+    if GEMINI_HEDGE_DELAY_MS:
+        delay_ms = float(GEMINI_HEDGE_DELAY_MS)
+    else:
+        delay_ms = MODEL_ROUTER.p95_ms(model_name) or _DEFAULT_HEDGE_DELAY_MS
+    return max(_MIN_HEDGE_DELAY_MS, delay_ms) / 1000
+
+async def _classify_prompt_async(prompt: str, parse=_extract_exact_label):
+    """
+    Async _classify_prompt (parse as in _attempt_async). Models are tried in router order; a failure moves on to the
+    next model at once, and with hedging a slow model gets a second request racing it.
+    At most two requests are in flight. Returns None if every model failed.
+    """
+    if not GEMINI_API_KEY:
+        return None
+    candidates = MODEL_ROUTER.candidates()
+    next_index = 0
+    pending: set = set()
+
+    def launch() -> None:
+        nonlocal next_index
+        model_name = candidates[next_index]
+        next_index += 1
+        task = asyncio.create_task(_attempt_async(prompt, model_name, parse))
+        task.model_name = model_name
+        pending.add(task)
+
+    try:
+        while True:
+            if not pending:
+                if next_index >= len(candidates):
+                    return None
+                launch()
+            hedge = GEMINI_HEDGE and len(pending) == 1 and next_index < len(candidates)
+            timeout = _hedge_delay_s(next(iter(pending)).model_name) if hedge else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result():
+                    return task.result()
+            if not done:
+                # Hedge timer fired before the first model answered
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+def _normalize_transcript(transcript: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace so re-transcriptions of the same words match."""
+    t = re.sub(r"[^\w\s]", " ", transcript.lower())
+    return " ".join(t.split())
+
+def _cache_key(transcript: str, total_logs: int, medium_flags: int, high_flags: int) -> str:
+    payload = f"{_normalize_transcript(transcript)}|{total_logs}|{medium_flags}|{high_flags}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def classify_call(
+    transcript: str,
+    total_logs: int,
+    medium_flags: int,
+    high_flags: int,
+    #candidate_models: List[str] = None,
+    #list_models_if_none_available: bool = False
+) -> str:
+    """
+    Return exactly one character string: '0', '1', or '2'.
+    Attempts an ordered list of models. Falls back deterministically if needed.
+    Clear-cut calls are decided by the local pre-classifier without a model call, and so are
+    calls that closely follow a known scam script (script_index); a looser resemblance is
+    passed to the model in the prompt.
+    Model labels are cached; fallback labels are not, so an outage doesn't stick.
+    """
+    local = preclassify(transcript, total_logs, medium_flags, high_flags)
+    if local:
+        return local
+    script = nearest_script(transcript)
+    if script is not None and script.decides:
+        return script.label
+
+    key = _cache_key(transcript, total_logs, medium_flags, high_flags)
+    cached = CLASSIFY_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    prompt = _build_prompt(transcript, total_logs, medium_flags, high_flags, script)
+    label = _classify_prompt(prompt)
+    if label:
+        CLASSIFY_CACHE.set(key, label)
+        return label
     # Use deterministic fallback to guarantee a valid output
-    return _fallback_rule(transcript, total_logs, medium_flags, high_flags)
+    return _fallback_rule(transcript, total_logs, medium_flags, high_flags, script)
+
+async def classify_call_async(transcript: str, total_logs: int, medium_flags: int, high_flags: int) -> str:
+    """Async classify_call: same pre-classifier, cache and fallback, on the async client with hedging."""
+    local = preclassify(transcript, total_logs, medium_flags, high_flags)
+    if local:
+        return local
+    script = nearest_script(transcript)
+    if script is not None and script.decides:
+        return script.label
+
+    key = _cache_key(transcript, total_logs, medium_flags, high_flags)
+    cached = CLASSIFY_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    prompt = _build_prompt(transcript, total_logs, medium_flags, high_flags, script)
+    label = await _classify_prompt_async(prompt)
+    if label:
+        CLASSIFY_CACHE.set(key, label)
+        return label
+    return _fallback_rule(transcript, total_logs, medium_flags, high_flags, script)
+
+def cached_label(transcript: str, total_logs: int, medium_flags: int, high_flags: int) -> Optional[str]:
+    """The label classify_call would give without a model call (pre-classifier, script or cache), or None."""
+    local = preclassify(transcript, total_logs, medium_flags, high_flags)
+    if local:
+        return local
+    script = nearest_script(transcript)
+    if script is not None and script.decides:
+        return script.label
+    return CLASSIFY_CACHE.get(_cache_key(transcript, total_logs, medium_flags, high_flags))
+
+# ----------------------
+# Batch classification
+# ----------------------
+
+# Transcripts packed into one prompt, and packed prompts in flight at once
+CLASSIFY_BATCH_PACK = int(os.getenv("CLASSIFY_BATCH_PACK", "10"))
+CLASSIFY_BATCH_CONCURRENCY = int(os.getenv("CLASSIFY_BATCH_CONCURRENCY", "4"))
+
+_BATCH_LINE = re.compile(r"^\s*\[?(\d+)\]?\s*[:.)=-]\s*(\S+)\s*$")
+
+def _build_batch_prompt(items: List[dict]) -> str:
+    calls = "\n\n".join(
+        f"[{i}] Transcript: \"\"\"{item['transcript']}\"\"\"\n"
+        f"    Times logged: {item['total_logs']}, flagged MEDIUM: {item['medium_flags']}, flagged HIGH: {item['high_flags']}"
+        for i, item in enumerate(items, 1)
+    )
+    return (
+        "You are a classification assistant. Score each numbered phone call for scam likelihood.\n\n"
+        f"{calls}\n\n"
+        "Scoring rules:\n0 = low likelihood of scam\n1 = medium likelihood of scam\n2 = high likelihood of scam\n\n"
+        "Consider transcript indicators (urgent requests, money requests, verification codes, threats, "
+        "requests for remote access, gift cards, etc.) and numeric history.  "
+        f"Reply with exactly {len(items)} lines, one per call, in the form <number>: <label> "
+        "(for example \"1: 0\"), and nothing else."
+    )
+
+def _parse_batch_labels(raw: str, count: int) -> dict:
+    """Map call number → label for every well-formed line; each label must pass _extract_exact_label."""
+    labels = {}
+    for line in (raw or "").splitlines():
+        m = _BATCH_LINE.match(line)
+        if m and 1 <= int(m.group(1)) <= count:
+            label = _extract_exact_label(m.group(2))
+            if label:
+                labels[int(m.group(1))] = label
+    return labels
+
+def _batch_item(item) -> dict:
+    if isinstance(item, str):
+        item = {"transcript": item}
+    return {
+        "transcript": item.get("transcript") or "",
+        "total_logs": int(item.get("total_logs", 0)),
+        "medium_flags": int(item.get("medium_flags", 0)),
+        "high_flags": int(item.get("high_flags", 0)),
+    }
+
+async def classify_calls_async(
+    batch: List[dict],
+    pack_size: int = CLASSIFY_BATCH_PACK,
+    concurrency: int = CLASSIFY_BATCH_CONCURRENCY,
+) -> List[str]:
+    """
+    Classify many calls. Each item is a transcript string or a dict with transcript and
+    optional total_logs / medium_flags / high_flags. Returns labels in input order.
+
+    Clear-cut and cached items are answered locally; the rest are packed `pack_size` to a
+    prompt, with up to `concurrency` prompts in flight. Any item the model's reply doesn't
+    label validly is re-classified on its own (with the usual fallback).
+    """
+    items = [_batch_item(item) for item in batch]
+    labels: List[Optional[str]] = [None] * len(items)
+    todo = []
+    for i, item in enumerate(items):
+        args = (item["transcript"], item["total_logs"], item["medium_flags"], item["high_flags"])
+        labels[i] = cached_label(*args)
+        if labels[i] is None:
+            todo.append(i)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_pack(indexes: List[int]) -> None:
+        async with semaphore:
+            pack = [items[i] for i in indexes]
+            parsed = {}
+            if len(pack) > 1:
+                parsed = await _classify_prompt_async(
+                    _build_batch_prompt(pack), parse=lambda raw: _parse_batch_labels(raw, len(pack))
+                ) or {}
+            for n, i in enumerate(indexes, 1):
+                item = items[i]
+                args = (item["transcript"], item["total_logs"], item["medium_flags"], item["high_flags"])
+                if n in parsed:
+                    labels[i] = parsed[n]
+                    CLASSIFY_CACHE.set(_cache_key(*args), parsed[n])
+                else:
+                    labels[i] = await classify_call_async(*args)
+
+    size = max(1, pack_size)
+    await asyncio.gather(*(run_pack(todo[k:k + size]) for k in range(0, len(todo), size)))
+    return labels
+
+def classify_calls(batch: List[dict], pack_size: int = CLASSIFY_BATCH_PACK,
+                   concurrency: int = CLASSIFY_BATCH_CONCURRENCY) -> List[str]:
+    """Synchronous classify_calls_async (not for use inside a running event loop)."""
+    return asyncio.run(classify_calls_async(batch, pack_size, concurrency))
+
+# ----------------------
+# Live-call sessions
+# ----------------------
+
+# How much earlier call text an incremental prompt carries as context
+LIVE_CONTEXT_CHARS = int(os.getenv("LIVE_CONTEXT_CHARS", "1500"))
+# "incremental" (default) scores each new chunk against a bounded context window;
+# "full" re-sends the whole accumulated transcript on every chunk
+LIVE_CLASSIFY_MODE = os.getenv("LIVE_CLASSIFY_MODE", "incremental").lower()
+
+def _build_incremental_prompt(
+    context: str, new_text: str, risk_so_far: str, total_logs: int, medium_flags: int, high_flags: int,
+    script: Optional[ScriptMatch] = None,
+) -> str:
+    return (
+        "You are a classification assistant that MUST respond with exactly one character: 0, 1, or 2, and nothing else.\n\n"
+        "You are monitoring a phone call in progress.\n"
+        f"Input:\n- Earlier in the call (most recent part): \"\"\"{context or '(start of call)'}\"\"\"\n"
+        f"- Risk assessed so far: {risk_so_far}\n"
+        f"- New speech since the last assessment: \"\"\"{new_text}\"\"\"\n"
+        f"- Total times this phone number has been logged: {total_logs}\n"
+        f"- Times flagged as MEDIUM-likelihood calls: {medium_flags}\n"
+        f"- Times flagged as HIGH-likelihood calls: {high_flags}\n"
+        f"{_script_line(script)}\n"
+        "Scoring rules:\n0 = low likelihood of scam\n1 = medium likelihood of scam\n2 = high likelihood of scam\n\n"
+        "Score the call as it stands now, giving most weight to the new speech. "
+        "Consider transcript indicators (urgent requests, money requests, verification codes, threats, "
+        "requests for remote access, gift cards, etc.) and numeric history.  "
+        "CRUCIALLY: reply with EXACTLY one character (0 or 1 or 2) and nothing else."
+    )
+
+class LiveClassifierSession:
+    """
+    Chunk-by-chunk classifier for one live call.
+
+    Incremental mode keeps the last `context_chars` of earlier text plus the running risk
+    and scores only the new chunk against them, so prompt size (and model latency) stays
+    flat however long the call runs. That window is looked up among the known scam
+    scripts as classify_call does. The running risk never goes down during a call.
+    Full mode re-classifies the whole transcript on each chunk.
+    """
+
+    def __init__(self, total_logs: int, medium_flags: int, high_flags: int,
+                 mode: str = LIVE_CLASSIFY_MODE, context_chars: int = LIVE_CONTEXT_CHARS):
+        if mode not in ("incremental", "full"):
+            raise ValueError("mode must be 'incremental' or 'full'")
+        self.total_logs = total_logs
+        self.medium_flags = medium_flags
+        self.high_flags = high_flags
+        self.mode = mode
+        self.context_chars = context_chars
+        self.transcript = ""
+        self.risk: Optional[str] = None  # set by the first assessment
+
+    def _context(self) -> str:
+        if len(self.transcript) <= self.context_chars:
+            return self.transcript
+        tail = self.transcript[-self.context_chars:]
+        # Don't start the window mid-word
+        return tail.split(" ", 1)[-1]
+
+    def _unchanged(self) -> str:
+        """
+        Label for a chunk with no speech: nothing new was said, so the model isn't
+        asked. Before anything has been said the caller's history is all there is.
+        """
+        if self.risk is None:
+            self.risk = _fallback_rule("", self.total_logs, self.medium_flags, self.high_flags)
+        return self.risk
+
+    def add_chunk(self, text: str) -> str:
+        """Score a newly transcribed chunk and return the call's current label ('0'/'1'/'2')."""
+        text = (text or "").strip()
+        history = (self.total_logs, self.medium_flags, self.high_flags)
+
+        if not text:
+            return self._unchanged()
+
+        if self.mode == "full":
+            self.transcript = (self.transcript + " " + text).strip()
+            self.risk = classify_call(self.transcript, *history)
+            return self.risk
+
+        window = self._context() + " " + text
+        label = preclassify(window, *history)
+        script = None if label else nearest_script(window)
+        if script is not None and script.decides:
+            label = script.label
+        if not label:
+            prompt = _build_incremental_prompt(self._context(), text, self.risk or "none yet", *history, script)
+            label = _classify_prompt(prompt) or _fallback_rule(window, *history, script)
+        self.transcript = (self.transcript + " " + text).strip()
+        self.risk = max(self.risk or "0", label)
+        return self.risk
+
+    def peek(self, text: str) -> Optional[str]:
+        """
+        Local-only early read on interim text: '2' if the call so far plus `text` is
+        already clear-cut high risk, else None. Doesn't change the session.
+        """
+        text = (text or "").strip()
+        if not text:
+            return None
+        label = preclassify(self._context() + " " + text, self.total_logs, self.medium_flags, self.high_flags)
+        return label if label == "2" else None
+
+    async def add_chunk_async(self, text: str) -> str:
+        """add_chunk() on the async Gemini client, for use from the event loop."""
+        text = (text or "").strip()
+        history = (self.total_logs, self.medium_flags, self.high_flags)
+
+        if not text:
+            return self._unchanged()
+
+        if self.mode == "full":
+            self.transcript = (self.transcript + " " + text).strip()
+            self.risk = await classify_call_async(self.transcript, *history)
+            return self.risk
+
+        window = self._context() + " " + text
+        label = preclassify(window, *history)
+        script = None if label else nearest_script(window)
+        if script is not None and script.decides:
+            label = script.label
+        if not label:
+            prompt = _build_incremental_prompt(self._context(), text, self.risk or "none yet", *history, script)
+            label = await _classify_prompt_async(prompt) or _fallback_rule(window, *history, script)
+        self.transcript = (self.transcript + " " + text).strip()
+        self.risk = max(self.risk or "0", label)
+        return self.risk
 
 # ----------------------
 # Example run (main)
@@ -1,29 +1,424 @@
-import whisper
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
 from pathlib import Path
 
-MODEL = whisper.load_model("base")
+import asr_backends
+from artifact_store import get_store
+from audio_chunks import split_at_silence, stitch_transcripts
+from audio_decode import decode_wav_pcm16
+from vad import trim_silence
 
 BASE_DIR = Path(__file__).resolve().parent
 TMP_DIR = BASE_DIR / "tmp"
 
+# Transcription executor. Whisper is CPU-bound and blocking, so async callers hand
+# work to a bounded pool instead of running it on the event loop.
+#   TRANSCRIBE_EXECUTOR    "thread" (default) or "process"
+#   TRANSCRIBE_WORKERS     number of transcriptions that run in parallel
+#   TRANSCRIBE_QUEUE_SIZE  extra requests allowed to wait for a worker
+EXECUTOR_KIND = os.getenv("TRANSCRIBE_EXECUTOR", "thread").lower()
+MAX_WORKERS = max(1, int(os.getenv("TRANSCRIBE_WORKERS", str(min(4, os.cpu_count() or 1)))))
+MAX_QUEUE = max(0, int(os.getenv("TRANSCRIBE_QUEUE_SIZE", "16")))
+
+# Micro-batching. Clips that fit in one Whisper window (≤30 s: live chunks, short uploads)
+# from concurrent callers are collected for up to TRANSCRIBE_BATCH_WINDOW_MS and decoded
+# in one batched pass. 0 disables batching; only available with the thread executor and a
+# backend that decodes batches (the whisper ones).
+BATCH_WINDOW_MS = float(os.getenv("TRANSCRIBE_BATCH_WINDOW_MS", "0"))
+BATCH_MAX_SIZE = max(1, int(os.getenv("TRANSCRIBE_BATCH_MAX", "8")))
+WINDOW_SAMPLES = 30 * 16000  # one Whisper window (whisper.audio.N_SAMPLES)
+
+# Pieces of one long upload transcribed at the same time (see _transcribe_long)
+CHUNK_PARALLEL = max(1, int(os.getenv("TRANSCRIBE_CHUNK_PARALLEL", str(MAX_WORKERS))))
+
+# Inference backend (see asr_backends.py)
+#   TRANSCRIBE_BACKEND     "whisper" (default), "whisper-int8" or "faster-whisper"
+#   TRANSCRIBE_MODEL_SIZE  "tiny", "base" (default), "small", ... or a checkpoint path
+# The model (and torch) is loaded on first use or by warm_up(), not on import, so
+# importing this module stays cheap for tests, CLI tools and worker start-up.
+BACKEND = os.getenv("TRANSCRIBE_BACKEND", "whisper").lower()
+MODEL_SIZE = os.getenv("TRANSCRIBE_MODEL_SIZE", "base")
+
+MODEL = None
+_model_load_lock = threading.Lock()
+_model_load_s: float | None = None
+_warmed_up = threading.Event()
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+# Admission state: every accepted request counts as pending until it finishes
+_pending = 0
+_pending_lock = threading.Lock()
+
+# Whisper installs kv-cache hooks on the shared model while decoding, so two threads must
+# never decode on the same instance. Worker threads borrow a replica; replicas are only
+# created (by MODEL.replica()) when calls actually overlap.
+_idle_models: "queue.LifoQueue" = queue.LifoQueue()
+_model_count = 0
+_model_lock = threading.Lock()
+
+
+class TranscriptionQueueFull(RuntimeError):
+    """Raised when the admission queue is full. `depth` is the number of pending requests."""
+
+    def __init__(self, depth: int):
+        super().__init__(f"Transcription queue is full ({depth} pending)")
+        self.depth = depth
+
+
+def get_model():
+    """The transcription backend, loaded on first call. Concurrent first callers wait for one load."""
+    global MODEL, _model_count, _model_load_s
+    if MODEL is None:
+        with _model_load_lock:
+            if MODEL is None:
+                started = time.perf_counter()
+                model = asr_backends.load_backend(BACKEND, MODEL_SIZE, workers=MAX_WORKERS)
+                _model_load_s = time.perf_counter() - started
+                with _model_lock:
+                    _model_count += 1
+                _idle_models.put(model)
+                MODEL = model
+    return MODEL
+
+
+def _warm_up_worker() -> None:
+    get_model()
+
+
+def warm_up() -> None:
+    """
+    Load the model now instead of on the first request (blocking; call it off the
+    event loop). With the process executor every worker loads its own: each is
+    sent a load, though a fast worker may take two and leave another cold.
+    """
+    if EXECUTOR_KIND == "process":
+        for future in [_get_executor().submit(_warm_up_worker) for _ in range(MAX_WORKERS)]:
+            future.result()
+    else:
+        get_model()
+    _warmed_up.set()
+
+
+def is_ready() -> bool:
+    """True once warm_up() has finished or the model was loaded by a request."""
+    return _warmed_up.is_set() or MODEL is not None
+
+
+def model_stats() -> dict:
+    return {
+        "backend": BACKEND,
+        "model_size": MODEL_SIZE,
+        "loaded": MODEL is not None,
+        "load_seconds": round(_model_load_s, 2) if _model_load_s is not None else None,
+        "ready": is_ready(),
+    }
+
+
+@contextmanager
+def _borrow_model():
+    global _model_count
+    template = get_model()
+    try:
+        model = _idle_models.get_nowait()
+    except queue.Empty:
+        with _model_lock:
+            # One replica per pool worker, plus one for the batch scheduler
+            can_grow = _model_count < MAX_WORKERS + 1
+            if can_grow:
+                _model_count += 1
+        model = template.replica() if can_grow else _idle_models.get()
+    try:
+        yield model
+    finally:
+        _idle_models.put(model)
+
+
+def load_audio_file(file_path: str) -> np.ndarray:
+    """16 kHz mono float32 samples: 16 kHz PCM16 WAV is decoded in memory, anything else by ffmpeg."""
+    if file_path.lower().endswith(".wav"):
+        audio = decode_wav_pcm16(Path(file_path).read_bytes())
+        if audio is not None:
+            return audio
+    import whisper
+    return whisper.load_audio(file_path)
+
+
 def transcribe_file(file_path: str) -> str:
-    """Transcribe an audio file given its absolute path."""
-    result = MODEL.transcribe(file_path)
-    return result["text"].strip()
+    """Transcribe an audio file given its absolute path. Non-speech is cut out first (see vad.py)."""
+    speech = trim_silence(load_audio_file(file_path))
+    return transcribe_audio(speech) if len(speech) else ""
+
+
+def transcribe_audio(audio: np.ndarray) -> str:
+    """Transcribe 16 kHz mono float32 samples."""
+    with _borrow_model() as model:
+        return model.transcribe(audio)
+
+
+def legacy_audio(call_id: str) -> Optional[Path]:
+    """Audio placed in the flat tmp/ directory by hand (e.g. the samples), which the artifact store doesn't index."""
+    # .wav first: uploads are stored as 16 kHz PCM WAV unless there was no ffmpeg to decode them
+    for ext in (".wav", ".m4a", ".mp3", ".ogg", ".aac", ".flac", ".webm"):
+        candidate = TMP_DIR / f"{call_id}{ext}"
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _find_audio(call_id: str) -> Path:
+    try:
+        return get_store().local_path(call_id)
+    except FileNotFoundError:
+        path = legacy_audio(call_id)
+    if path is None:
+        raise FileNotFoundError(f"No audio file found for call_id: {call_id}")
+    return path
+
+
+def load_call_audio(call_id: str) -> np.ndarray:
+    """A call's audio as 16 kHz mono float32 samples."""
+    return load_audio_file(str(_find_audio(call_id)))
 
 
 def transcribe(call_id: str) -> str:
     """
-    Takes a call_id, finds the matching audio file in tmp/,
+    Takes a call_id, finds its audio in the artifact store (or tmp/),
     transcribes it with Whisper, and returns the text.
     """
-    for ext in (".m4a", ".mp3", ".wav", ".ogg"):
-        candidate = TMP_DIR / f"{call_id}{ext}"
-        if candidate.exists():
-            result = MODEL.transcribe(str(candidate))
-            return result["text"].strip()
+    return transcribe_file(str(_find_audio(call_id)))
+
+
+# ----------------------
+# Batch scheduler
+# ----------------------
+
+class _BatchScheduler:
+    """Collects short clips for up to `window_s` and decodes them in one batched pass."""
+
+    def __init__(self, window_s: float, max_size: int):
+        self.window_s = window_s
+        self.max_size = max_size
+        self._queue: "queue.Queue[tuple[np.ndarray, Future, float]]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._latencies_ms: deque = deque(maxlen=1000)
+
+    def submit(self, audio: np.ndarray) -> Future:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="whisper-batch", daemon=True)
+                self._thread.start()
+        future: Future = Future()
+        self._queue.put((audio, future, time.monotonic()))
+        return future
 
-    raise FileNotFoundError(f"No audio file found for call_id: {call_id}")
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window_s
+            while len(batch) < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch: list) -> None:
+        try:
+            with _borrow_model() as model:
+                texts = model.transcribe_batch([audio for audio, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finally:
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+
+        done = time.monotonic()
+        for (_, future, submitted), text in zip(batch, texts):
+            with self._lock:
+                self._latencies_ms.append((done - submitted) * 1000)
+            future.set_result(text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = dict(sorted(self._batch_sizes.items()))
+            latencies = sorted(self._latencies_ms)
+
+        def pct(p: float):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else None
+
+        return {
+            "window_ms": self.window_s * 1000,
+            "max_batch": self.max_size,
+            "batches": sum(sizes.values()),
+            "items": sum(size * n for size, n in sizes.items()),
+            "batch_size_histogram": sizes,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "max": pct(1.0)},
+        }
+
+
+_batcher = (
+    _BatchScheduler(BATCH_WINDOW_MS / 1000, BATCH_MAX_SIZE)
+    if BATCH_WINDOW_MS > 0 and EXECUTOR_KIND == "thread" and asr_backends.supports_batch(BACKEND) else None
+)
+
+
+def batch_stats() -> dict:
+    """Batch-size distribution and per-item latency of the batch scheduler (empty if disabled)."""
+    return _batcher.stats() if _batcher is not None else {"enabled": False}
+
+
+# ----------------------
+# Async API
+# ----------------------
+
+def _get_executor() -> Executor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if EXECUTOR_KIND == "process":
+                # spawn, not fork: forking a process that already holds torch threads can deadlock.
+                # Each worker imports this module and loads its own copy of the model on first use.
+                _executor = ProcessPoolExecutor(
+                    max_workers=MAX_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="whisper")
+        return _executor
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Stop the worker pool (called on app shutdown). A new pool is created on next use."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+
+
+def queue_stats() -> dict:
+    """Snapshot of the admission queue for health/monitoring endpoints."""
+    with _pending_lock:
+        pending = _pending
+    return {
+        "executor": EXECUTOR_KIND,
+        "workers": MAX_WORKERS,
+        "capacity": MAX_WORKERS + MAX_QUEUE,
+        "running": min(pending, MAX_WORKERS),
+        "queued": max(0, pending - MAX_WORKERS),
+    }
+
+
+class AdmissionSlot:
+    """An admitted request's place in the queue, held until released (or its `with` block exits)."""
+
+    def __init__(self):
+        self._held = True
+
+    def release(self) -> None:
+        global _pending
+        with _pending_lock:
+            if self._held:
+                self._held = False
+                _pending -= 1
+
+    def __enter__(self) -> "AdmissionSlot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def reserve_slot() -> AdmissionSlot:
+    """
+    Admit a request or raise TranscriptionQueueFull. Callers that queue the work for
+    later (analysis jobs) reserve up front, so a full queue is refused while the
+    client is still there to retry, and hand the slot to transcribe_async.
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= MAX_WORKERS + MAX_QUEUE:
+            raise TranscriptionQueueFull(_pending)
+        _pending += 1
+    return AdmissionSlot()
+
+
+async def _run_in_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+async def _transcribe_samples(audio: np.ndarray) -> str:
+    if _batcher is not None and len(audio) <= WINDOW_SAMPLES:
+        return await asyncio.wrap_future(_batcher.submit(audio))
+    return await _run_in_pool(transcribe_audio, audio)
+
+
+async def transcribe_audio_async(audio: np.ndarray) -> str:
+    """Awaitable transcribe_audio(): batched when short enough, otherwise run on the worker pool."""
+    with reserve_slot():
+        return await _transcribe_samples(audio)
+
+
+async def _transcribe_long(audio: np.ndarray) -> str:
+    """
+    Long audio is cut at pauses into window-sized pieces (see audio_chunks.py) that
+    are transcribed concurrently on the pool, so wall-clock time falls with
+    TRANSCRIBE_WORKERS. Use the process executor to spread them over cores.
+
+    The request holds one admission slot, so at most TRANSCRIBE_CHUNK_PARALLEL of its
+    pieces are on the pool at once: a long upload can't queue dozens of pieces
+    ahead of live chunks.
+    """
+    spans = split_at_silence(audio)
+    if len(spans) == 1:
+        return await _transcribe_samples(audio)
+    in_flight = asyncio.Semaphore(CHUNK_PARALLEL)
+
+    async def piece(start: int, end: int) -> str:
+        async with in_flight:
+            return await _transcribe_samples(audio[start:end])
+
+    texts = await asyncio.gather(*(piece(start, end) for start, end in spans))
+    return stitch_transcripts(texts)
+
+
+async def transcribe_file_async(file_path: str, slot: Optional[AdmissionSlot] = None) -> str:
+    """Awaitable transcribe_file(): runs on the worker pool so the event loop keeps serving."""
+    with slot or reserve_slot():
+        audio = await _run_in_pool(load_audio_file, file_path)
+        # VAD runs in this process (not a pool worker) so its saved-seconds counters add up
+        speech = await asyncio.to_thread(trim_silence, audio)
+        return await _transcribe_long(speech) if len(speech) else ""
+
+
+async def transcribe_async(call_id: str, slot: Optional[AdmissionSlot] = None) -> str:
+    """
+    Awaitable transcribe(): runs on the worker pool so the event loop keeps serving.
+    `slot` is an admission already reserved for this request (see reserve_slot); it is released here.
+    """
+    # The store may have to fetch the audio back from object storage
+    path = await asyncio.to_thread(_find_audio, call_id)
+    return await transcribe_file_async(str(path), slot)
 
 
 if __name__ == "__main__":
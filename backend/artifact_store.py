@@ -0,0 +1,338 @@
+# backend/artifact_store.py
+"""
+Storage for uploaded call audio.
+
+Every upload's artifact (see ingest.py) is recorded in a SQLite index keyed by
+call_id - path, format, duration, size, created/last-used time - so finding a
+call's audio is one primary-key lookup instead of a directory scan. Files live
+under ARTIFACT_DIR in two levels of shard directories (ab/cd/<call_id>.wav,
+from a hash of the call_id), so no directory grows past a few hundred entries.
+
+A background sweeper (every ARTIFACT_SWEEP_INTERVAL_S) keeps disk use bounded:
+  ARTIFACT_TTL_S        artifacts older than this are deleted
+  ARTIFACT_MAX_MB       above this many MB on local disk, the least recently
+                        used are deleted (or, with an object store, just their
+                        local copies)
+
+With ARTIFACT_S3_ENDPOINT set, artifacts are also uploaded to an S3-compatible
+object store (MinIO or similar; ARTIFACT_S3_BUCKET, _ACCESS_KEY, _SECRET_KEY,
+_REGION). The local file is then only a cache: it can be evicted, and is
+fetched back when the call is analysed.
+
+Files put in the legacy flat backend/tmp by hand (the samples) are not indexed;
+TranscriptionEngine still finds those by name.
+"""
+
+import hashlib
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+BASE_DIR = Path(__file__).resolve().parent
+ARTIFACT_DIR = Path(os.getenv("ARTIFACT_DIR", str(BASE_DIR / "var" / "artifacts")))
+ARTIFACT_DB = Path(os.getenv("ARTIFACT_DB", str(BASE_DIR / "var" / "artifacts.sqlite3")))
+ARTIFACT_TTL_S = float(os.getenv("ARTIFACT_TTL_S", str(7 * 24 * 3600)))
+ARTIFACT_MAX_MB = float(os.getenv("ARTIFACT_MAX_MB", "2048"))
+ARTIFACT_SWEEP_INTERVAL_S = float(os.getenv("ARTIFACT_SWEEP_INTERVAL_S", "300"))
+
+ARTIFACT_S3_ENDPOINT = os.getenv("ARTIFACT_S3_ENDPOINT")  # e.g. http://localhost:9000
+ARTIFACT_S3_BUCKET = os.getenv("ARTIFACT_S3_BUCKET", "scamscan-calls")
+ARTIFACT_S3_ACCESS_KEY = os.getenv("ARTIFACT_S3_ACCESS_KEY", "")
+ARTIFACT_S3_SECRET_KEY = os.getenv("ARTIFACT_S3_SECRET_KEY", "")
+ARTIFACT_S3_REGION = os.getenv("ARTIFACT_S3_REGION", "us-east-1")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    call_id     TEXT PRIMARY KEY,
+    key         TEXT NOT NULL,
+    format      TEXT NOT NULL,
+    duration_s  REAL NOT NULL,
+    size        INTEGER NOT NULL,
+    local       INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    sha256      TEXT,
+    pcm_sha256  TEXT
+);
+CREATE INDEX IF NOT EXISTS artifacts_created ON artifacts (created_at);
+CREATE INDEX IF NOT EXISTS artifacts_lru ON artifacts (local, accessed_at);
+"""
+
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+class S3Blobs:
+    """Minimal S3 client (path-style PUT/GET/DELETE, SigV4) for MinIO and other S3-compatible stores."""
+
+    def __init__(self, endpoint: str, bucket: str, access_key: str, secret_key: str,
+                 region: str = "us-east-1", timeout: float = 30.0):
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self._host = urlsplit(self.endpoint).netloc
+        self._http = httpx.Client(timeout=timeout)
+
+    def put(self, key: str, path: Path) -> None:
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            while block := f.read(1024 * 1024):
+                digest.update(block)
+        with path.open("rb") as f:
+            self._request("PUT", key, digest.hexdigest(), content=f)
+
+    def get(self, key: str, dest: Path) -> None:
+        """Download `key` to `dest`; FileNotFoundError if the store doesn't have it."""
+        part = dest.with_name(dest.name + ".part")
+        with self._http.stream("GET", self._url(key), headers=self._sign("GET", key, _EMPTY_SHA256)) as r:
+            if r.status_code == 404:
+                raise FileNotFoundError(f"{key} is not in bucket {self.bucket}")
+            r.raise_for_status()
+            with part.open("wb") as f:
+                for block in r.iter_bytes():
+                    f.write(block)
+        part.replace(dest)
+
+    def delete(self, key: str) -> None:
+        self._request("DELETE", key, _EMPTY_SHA256)
+
+    def _url(self, key: str) -> str:
+        return f"{self.endpoint}{self._path(key)}"
+
+    def _path(self, key: str) -> str:
+        return quote(f"/{self.bucket}/{key}", safe="/-_.~")
+
+    def _request(self, method: str, key: str, payload_sha256: str, content=None) -> None:
+        r = self._http.request(method, self._url(key), headers=self._sign(method, key, payload_sha256),
+                               content=content)
+        r.raise_for_status()
+
+    def _sign(self, method: str, key: str, payload_sha256: str) -> dict:
+        # AWS Signature Version 4, header-based
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        headers = {"host": self._host, "x-amz-content-sha256": payload_sha256, "x-amz-date": amz_date}
+        signed = ";".join(headers)
+        canonical = "\n".join([
+            method, self._path(key), "",
+            "".join(f"{name}:{value}\n" for name, value in headers.items()),
+            signed, payload_sha256,
+        ])
+        to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+        signing_key = f"AWS4{self.secret_key}".encode()
+        for part in (amz_date[:8], self.region, "s3", "aws4_request"):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(signing_key, to_sign.encode(), hashlib.sha256).hexdigest()
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, SignedHeaders={signed}, Signature={signature}"
+        )
+        del headers["host"]  # httpx sends it
+        return headers
+
+
+class ArtifactStore:
+    """Index + sharded files (+ optional object store) for call audio. Thread-safe."""
+
+    def __init__(self, root: Path, db_path: Path, remote: Optional[S3Blobs] = None,
+                 ttl_s: float = ARTIFACT_TTL_S, max_bytes: float = ARTIFACT_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.remote = remote
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        root.mkdir(parents=True, exist_ok=True)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._evicted = {"expired": 0, "over_size": 0, "uncached": 0}
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+
+    @staticmethod
+    def key_for(call_id: str, fmt: str) -> str:
+        shard = hashlib.sha1(call_id.encode()).hexdigest()
+        return f"{shard[:2]}/{shard[2:4]}/{call_id}.{fmt}"
+
+    def shard_dir(self, call_id: str) -> Path:
+        """Directory an upload for `call_id` should be written to (created if needed)."""
+        directory = (self.root / self.key_for(call_id, "x")).parent
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def put(self, call_id: str, path: Path, duration_s: float,
+            sha256: Optional[str] = None, pcm_sha256: Optional[str] = None) -> dict:
+        """
+        Index a file written under shard_dir(call_id), uploading it to the object store if there is one.
+        sha256/pcm_sha256 are the digests of the upload and its decoded PCM (see content_index.py).
+        """
+        fmt = path.suffix.lstrip(".")
+        key = self.key_for(call_id, fmt)
+        if self.root / key != path:
+            raise ValueError(f"{path} is not in the shard directory for {call_id}")
+        if self.remote is not None:
+            self.remote.put(key, path)
+        now = time.time()
+        row = (call_id, key, fmt, duration_s, path.stat().st_size, 1, now, now, sha256, pcm_sha256)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        return self._entry(row)
+
+    def get(self, call_id: str) -> Optional[dict]:
+        """Index entry for `call_id`, or None. Marks it as recently used."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT * FROM artifacts WHERE call_id = ?", (call_id,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE artifacts SET accessed_at = ? WHERE call_id = ?", (time.time(), call_id))
+        return self._entry(row) if row else None
+
+    def local_path(self, call_id: str) -> Path:
+        """Path of the call's audio on local disk, fetched from the object store if it was evicted."""
+        entry = self.get(call_id)
+        if entry is None:
+            raise FileNotFoundError(f"No artifact for call_id: {call_id}")
+        path = self.root / entry["key"]
+        if path.exists():
+            return path
+        if self.remote is None:
+            raise FileNotFoundError(f"Artifact for {call_id} is missing from {self.root}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.remote.get(entry["key"], path)
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE artifacts SET local = 1 WHERE call_id = ?", (call_id,))
+        return path
+
+    def delete(self, call_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT key FROM artifacts WHERE call_id = ?", (call_id,)).fetchone()
+        if row is None:
+            return False
+        self._remove(call_id, row[0])
+        return True
+
+    def sweep(self, now: Optional[float] = None) -> dict:
+        """Delete expired artifacts, then evict least recently used ones until local disk use is under the cap."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = self._conn.execute(
+                "SELECT call_id, key FROM artifacts WHERE created_at < ?", (now - self.ttl_s,)
+            ).fetchall()
+        for call_id, key in expired:
+            self._remove(call_id, key)
+
+        over_size = uncached = 0
+        with self._lock:
+            (local_bytes,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE local = 1").fetchone()
+            lru = self._conn.execute(
+                "SELECT call_id, key, size FROM artifacts WHERE local = 1 ORDER BY accessed_at"
+            ).fetchall() if local_bytes > self.max_bytes else []
+        for call_id, key, size in lru:
+            if local_bytes <= self.max_bytes:
+                break
+            if self.remote is not None:
+                # Still in the object store: only the local copy goes
+                (self.root / key).unlink(missing_ok=True)
+                with self._lock, self._conn:
+                    self._conn.execute("UPDATE artifacts SET local = 0 WHERE call_id = ?", (call_id,))
+                uncached += 1
+            else:
+                self._remove(call_id, key)
+                over_size += 1
+            local_bytes -= size
+
+        with self._lock:
+            self._evicted["expired"] += len(expired)
+            self._evicted["over_size"] += over_size
+            self._evicted["uncached"] += uncached
+        return {"expired": len(expired), "over_size": over_size, "uncached": uncached}
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total, local = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(size * local), 0) FROM artifacts"
+            ).fetchone()
+            evicted = dict(self._evicted)
+        return {
+            "artifacts": count,
+            "bytes": total,
+            "local_bytes": local,
+            "max_local_bytes": int(self.max_bytes),
+            "object_store": self.remote is not None,
+            "evicted": evicted,
+        }
+
+    def start_sweeper(self, interval: float = ARTIFACT_SWEEP_INTERVAL_S) -> None:
+        if self._sweeper is not None:
+            return
+        self._stop_sweeper.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval,), name="artifact-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop_sweeper.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def _sweep_loop(self, interval: float) -> None:
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[artifacts] sweep failed: {e}")
+            if self._stop_sweeper.wait(interval):
+                return
+
+    def _remove(self, call_id: str, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+        if self.remote is not None:
+            try:
+                self.remote.delete(key)
+            except httpx.HTTPError as e:
+                print(f"[artifacts] could not delete {key} from the object store: {e}")
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM artifacts WHERE call_id = ?", (call_id,))
+
+    @staticmethod
+    def _entry(row) -> dict:
+        call_id, key, fmt, duration_s, size, local, created_at, accessed_at, sha256, pcm_sha256 = row
+        return {
+            "call_id": call_id, "key": key, "format": fmt, "duration_s": duration_s, "size": size,
+            "local": bool(local), "created_at": created_at, "accessed_at": accessed_at,
+            "sha256": sha256, "pcm_sha256": pcm_sha256,
+        }
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ArtifactStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            remote = None
+            if ARTIFACT_S3_ENDPOINT:
+                remote = S3Blobs(ARTIFACT_S3_ENDPOINT, ARTIFACT_S3_BUCKET, ARTIFACT_S3_ACCESS_KEY,
+                                 ARTIFACT_S3_SECRET_KEY, ARTIFACT_S3_REGION)
+            _store = ArtifactStore(ARTIFACT_DIR, ARTIFACT_DB, remote)
+        return _store
+
+
+def start_sweeper() -> None:
+    get_store().start_sweeper()
+
+
+def stop_sweeper() -> None:
+    with _store_lock:
+        store = _store
+    if store is not None:
+        store.stop_sweeper()
@@ -0,0 +1,144 @@
+# backend/asr_backends.py
+"""
+Speech-to-text backends behind TranscriptionEngine.
+
+All of them take 16 kHz mono float32 samples and return text, so the engine's
+transcribe/transcribe_file API doesn't change with the backend:
+
+  whisper         openai-whisper on PyTorch, fp32 on CPU (the original path)
+  whisper-int8    the same model with its Linear layers dynamically quantized
+                  to int8 - smaller and faster on CPU, no extra dependency
+  faster-whisper  CTranslate2 through the faster-whisper package (optional:
+                  pip install faster-whisper); FASTER_WHISPER_COMPUTE_TYPE
+                  picks the precision, int8 by default
+
+Model size ("tiny", "base", "small", ...) is passed to load_backend; weights are
+downloaded on first use. torch and whisper are imported by the backends that
+need them, when a model is loaded, so importing this module costs nothing.
+"""
+
+import copy
+import os
+
+import numpy as np
+
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+
+
+class WhisperBackend:
+    """openai-whisper. Decoding installs kv-cache hooks on the model, so each thread needs its own replica."""
+
+    name = "whisper"
+    supports_batch = True
+
+    def __init__(self, model):
+        self.model = model
+
+    @classmethod
+    def load(cls, size: str, workers: int = 1) -> "WhisperBackend":
+        import whisper
+        return cls(whisper.load_model(size))
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.model.transcribe(audio)["text"].strip()
+
+    def transcribe_batch(self, clips: list[np.ndarray]) -> list[str]:
+        """Decode clips of at most 30 s in one batched pass."""
+        import torch
+        import whisper
+
+        # Every clip is padded to one 30 s window, so the mels stack into one encoder batch
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=self.model.dims.n_mels)
+            for audio in clips
+        ]).to(self.model.device)
+        options = whisper.DecodingOptions(fp16=self.model.device.type == "cuda")
+        return [result.text.strip() for result in self.model.decode(mel, options)]
+
+    def replica(self) -> "WhisperBackend":
+        return type(self)(copy.deepcopy(self.model))
+
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """openai-whisper with int8 weights in every Linear layer (activations quantized on the fly). CPU only."""
+
+    name = "whisper-int8"
+
+    @classmethod
+    def load(cls, size: str, workers: int = 1) -> "QuantizedWhisperBackend":
+        import whisper
+        return cls(quantize(whisper.load_model(size, device="cpu")))
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.model.transcribe(audio, fp16=False)["text"].strip()
+
+
+def quantize(model):
+    """Dynamically quantize a Whisper model's Linear layers to int8, in place."""
+    import torch
+
+    _plain_linears(model)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _plain_linears(module) -> None:
+    # Whisper uses its own Linear subclass (it casts weights to the input dtype for fp16),
+    # which quantize_dynamic doesn't recognise. On CPU in fp32 a plain nn.Linear is the same.
+    import torch
+    import whisper
+
+    for name, child in module.named_children():
+        if isinstance(child, whisper.model.Linear):
+            linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            linear.load_state_dict(child.state_dict())
+            setattr(module, name, linear)
+        else:
+            _plain_linears(child)
+
+
+class FasterWhisperBackend:
+    """
+    CTranslate2 via faster-whisper. One model serves concurrent calls itself
+    (up to `workers` at once), so replicas share it.
+    """
+
+    name = "faster-whisper"
+    supports_batch = False
+
+    def __init__(self, model):
+        self.model = model
+
+    @classmethod
+    def load(cls, size: str, workers: int = 1) -> "FasterWhisperBackend":
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError(
+                "TRANSCRIBE_BACKEND=faster-whisper needs the faster-whisper package (pip install faster-whisper)"
+            ) from None
+        return cls(WhisperModel(size, device="cpu", compute_type=FASTER_WHISPER_COMPUTE_TYPE,
+                                num_workers=workers))
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        # Greedy decoding, as openai-whisper's transcribe() does by default
+        segments, _ = self.model.transcribe(audio, beam_size=1)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def replica(self) -> "FasterWhisperBackend":
+        return self
+
+
+BACKENDS = {
+    backend.name: backend for backend in (WhisperBackend, QuantizedWhisperBackend, FasterWhisperBackend)
+}
+
+
+def supports_batch(name: str) -> bool:
+    return name in BACKENDS and BACKENDS[name].supports_batch
+
+
+def load_backend(name: str, size: str, workers: int = 1):
+    """Load backend `name` with model `size`. `workers` is how many calls may run on it at once."""
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown TRANSCRIBE_BACKEND: {name!r} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[name].load(size, workers)
@@ -0,0 +1,73 @@
+# backend/audio_chunks.py
+"""
+Splitting long recordings for parallel transcription, and stitching the text back.
+
+A long upload is cut into pieces that each fit one Whisper window, so they can
+be decoded side by side on the worker pool (or together by the batch
+scheduler) instead of in one sequential pass:
+
+  TRANSCRIBE_CHUNK_S          target piece length; 0 disables splitting
+  TRANSCRIBE_CHUNK_SEARCH_S   each cut goes at the quietest frame in this many
+                              seconds before the target, so it falls in a pause
+                              rather than mid-word
+  TRANSCRIBE_CHUNK_OVERLAP_S  audio shared by neighbouring pieces, in case a
+                              word straddles the cut anyway; words transcribed
+                              twice are removed when stitching
+
+Pieces are at most TRANSCRIBE_CHUNK_S + TRANSCRIBE_CHUNK_OVERLAP_S long; keep
+that within Whisper's 30 s window.
+"""
+
+import os
+
+import numpy as np
+
+from streaming_asr import dedupe_overlap
+from vad import frame_features
+
+SAMPLE_RATE = 16000
+
+TRANSCRIBE_CHUNK_S = float(os.getenv("TRANSCRIBE_CHUNK_S", "28"))
+TRANSCRIBE_CHUNK_SEARCH_S = float(os.getenv("TRANSCRIBE_CHUNK_SEARCH_S", "8"))
+TRANSCRIBE_CHUNK_OVERLAP_S = float(os.getenv("TRANSCRIBE_CHUNK_OVERLAP_S", "1.0"))
+
+_FRAME_MS = 30
+
+
+def split_at_silence(audio: np.ndarray, chunk_s: float = TRANSCRIBE_CHUNK_S,
+                     search_s: float = TRANSCRIBE_CHUNK_SEARCH_S, overlap_s: float = TRANSCRIBE_CHUNK_OVERLAP_S,
+                     sample_rate: int = SAMPLE_RATE) -> list[tuple[int, int]]:
+    """[start, end) sample ranges covering `audio`, in order. One range if it's short enough as is."""
+    chunk = int(sample_rate * chunk_s)
+    half_overlap = int(sample_rate * overlap_s) // 2
+    if chunk <= 0 or len(audio) <= chunk + 2 * half_overlap:
+        return [(0, len(audio))]
+
+    frame = int(sample_rate * _FRAME_MS / 1000)
+    search = max(frame, min(chunk, int(sample_rate * search_s)))
+    rms, _ = frame_features(audio, frame)
+
+    cuts = []
+    pos = 0
+    while len(audio) - pos > chunk:
+        lo, hi = (pos + chunk - search) // frame, (pos + chunk) // frame
+        lo = max(lo, pos // frame + 1)  # always move forward, even with search_s >= chunk_s
+        # Latest of equally quiet frames, so pieces stay long when there's no pause at all
+        quietest = hi - 1 - int(np.argmin(rms[lo:hi][::-1]))
+        pos = quietest * frame + frame // 2
+        cuts.append(pos)
+
+    bounds = [0, *cuts, len(audio)]
+    return [(max(0, a - half_overlap), min(len(audio), b + half_overlap)) for a, b in zip(bounds, bounds[1:])]
+
+
+def stitch_transcripts(texts: list[str]) -> str:
+    """Join per-piece transcripts in order, dropping words repeated across each overlap."""
+    out = ""
+    for text in texts:
+        text = text.strip()
+        if out:
+            text = dedupe_overlap(out, text)
+        if text:
+            out = f"{out} {text}".strip()
+    return out
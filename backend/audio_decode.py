@@ -0,0 +1,81 @@
+# backend/audio_decode.py
+"""
+In-memory decoding of the WAV chunks the Android app streams.
+
+AudioStreamManager sends 16 kHz mono PCM16 WAV, which is exactly what Whisper
+wants, so there is no need to write it to disk and spawn ffmpeg to decode it.
+Anything else returns None and callers fall back to the ffmpeg path.
+"""
+
+import struct
+from typing import Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # Whisper's native rate
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def decode_wav_pcm16(data: bytes) -> Optional[np.ndarray]:
+    """
+    Return float32 samples in [-1, 1) for a 16 kHz mono PCM16 WAV, or None if the
+    bytes are not a WAV in that exact format.
+    """
+    span = wav_pcm16_data(data)
+    if span is None:
+        return None
+    start, size = span
+    # Streaming writers may leave the size unset; trust the bytes we have
+    available = len(data) - start
+    if size is None or size > available:
+        size = available
+    return decode_pcm16(memoryview(data)[start:start + size])
+
+
+def wav_pcm16_data(data) -> Optional[tuple[int, Optional[int]]]:
+    """
+    (offset, size) of the samples in a 16 kHz mono PCM16 WAV, or None if `data` is
+    not one or ends before the data chunk starts. size is None when the writer left
+    it unset (0 or 0xFFFFFFFF). Only the header has to be present, so this works on
+    the first bytes of an upload.
+    """
+    buf = memoryview(data)
+    if len(buf) < 12 or buf[0:4] != b"RIFF" or buf[8:12] != b"WAVE":
+        return None
+
+    fmt_ok = False
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = bytes(buf[pos:pos + 4])
+        (chunk_size,) = struct.unpack_from("<I", buf, pos + 4)
+        body = pos + 8
+
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or body + 16 > len(buf):
+                return None
+            audio_format, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", buf, body)
+            fmt_ok = (
+                audio_format in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE)
+                and channels == 1 and rate == SAMPLE_RATE and bits == 16
+            )
+            if not fmt_ok:
+                return None
+        elif chunk_id == b"data":
+            if not fmt_ok:
+                return None
+            return body, (None if chunk_size in (0, 0xFFFFFFFF) else chunk_size)
+
+        # Chunks are word-aligned
+        pos = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def decode_pcm16(data) -> np.ndarray:
+    """Float32 samples for headerless 16 kHz mono PCM16 (the live socket's streaming frames)."""
+    buf = memoryview(data)
+    # View the payload in place (no copy); the float conversion is the only allocation
+    samples = np.frombuffer(buf, dtype="<i2", count=len(buf) // 2)
+    return np.multiply(samples, np.float32(1 / 32768), dtype=np.float32)
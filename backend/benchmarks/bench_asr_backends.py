@@ -0,0 +1,144 @@
+# backend/benchmarks/bench_asr_backends.py
+"""
+Real-time factor, memory and word error rate of each transcription backend
+(see asr_backends.py) on a fixed local corpus.
+
+The corpus is the sample recordings in backend/tmp, or the files given. The
+reference transcript for x.m4a is x.txt beside it; files without one are scored
+against the output of --reference (a larger fp32 model), so WER there measures
+how much a faster backend drifts from it rather than absolute accuracy.
+
+Each backend runs in its own process, so "peak MB" is that process's maximum
+resident set size: the model plus decoding, on top of the interpreter and
+torch, which are the same for every backend. RTF is decoding time over
+audio duration, after one warm-up clip; below 1 is faster than real time.
+
+Needs ffmpeg for the .m4a samples, the Whisper weights (downloaded on first
+use) and, for faster-whisper, that package.
+
+Usage:
+  python benchmarks/bench_asr_backends.py
+  python benchmarks/bench_asr_backends.py --backends whisper whisper-int8 --sizes tiny base small
+  python benchmarks/bench_asr_backends.py --reference whisper:small tmp/Highrisk.m4a tmp/MedRisk.m4a
+"""
+
+import argparse
+import json
+import re
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SAMPLE_RATE = 16000
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """(substitutions + deletions + insertions) / reference words, ignoring case and punctuation."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def _words(text: str) -> list[str]:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _load_audio(path: str):
+    # As TranscriptionEngine.load_audio_file; importing the engine would load a second model
+    import whisper
+    from audio_decode import decode_wav_pcm16
+
+    audio = decode_wav_pcm16(Path(path).read_bytes()) if path.lower().endswith(".wav") else None
+    return audio if audio is not None else whisper.load_audio(path)
+
+
+def _measure(backend: str, size: str, files: list[str]) -> dict:
+    """Runs in the child process: load one backend, transcribe every file, report timings."""
+    import asr_backends
+
+    started = time.perf_counter()
+    model = asr_backends.load_backend(backend, size)
+    load_s = time.perf_counter() - started
+    load_mb = _peak_rss_mb()
+
+    clips = [_load_audio(f) for f in files]
+    model.transcribe(clips[0][:SAMPLE_RATE * 5])  # warm-up
+
+    texts, decode_s = [], 0.0
+    for clip in clips:
+        started = time.perf_counter()
+        texts.append(model.transcribe(clip))
+        decode_s += time.perf_counter() - started
+    audio_s = sum(len(c) for c in clips) / SAMPLE_RATE
+    return {
+        "load_s": load_s, "load_mb": load_mb, "peak_mb": _peak_rss_mb(),
+        "audio_s": audio_s, "decode_s": decode_s, "texts": texts,
+    }
+
+
+def _run(spec: str, files: list[Path]) -> dict:
+    proc = subprocess.run([sys.executable, __file__, "--measure", spec, *map(str, files)],
+                          cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=Path, help="audio files (default: backend/tmp/*)")
+    parser.add_argument("--backends", nargs="+", default=["whisper", "whisper-int8", "faster-whisper"])
+    parser.add_argument("--sizes", nargs="+", default=["tiny", "base"])
+    parser.add_argument("--reference", default="whisper:small",
+                        help="backend:size whose output scores files without a .txt reference")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        backend, _, size = args.measure.partition(":")
+        print(json.dumps(_measure(backend, size, [str(f) for f in args.files])))
+        return
+
+    files = args.files or sorted(p for p in (BACKEND_DIR / "tmp").iterdir()
+                                 if p.suffix.lower() in (".wav", ".m4a", ".mp3", ".ogg"))
+    files = [f.resolve() for f in files]
+    references = {f: f.with_suffix(".txt").read_text() for f in files if f.with_suffix(".txt").exists()}
+    if len(references) < len(files):
+        print(f"{len(files) - len(references)} of {len(files)} files have no .txt; scoring them against {args.reference}")
+        reference_run = _run(args.reference, files)
+        if "error" in reference_run:
+            raise SystemExit(f"reference {args.reference}: {reference_run['error']}")
+        for f, text in zip(files, reference_run["texts"]):
+            references.setdefault(f, text)
+
+    print(f"{'backend':<24} {'load s':>7} {'RTF':>7} {'load MB':>8} {'peak MB':>8} {'WER':>7}")
+    for backend in args.backends:
+        for size in args.sizes:
+            spec = f"{backend}:{size}"
+            result = _run(spec, files)
+            if "error" in result:
+                print(f"{spec:<24} {result['error']}")
+                continue
+            errors = [word_error_rate(references[f], text) for f, text in zip(files, result["texts"])]
+            print(f"{spec:<24} {result['load_s']:>7.1f} {result['decode_s'] / result['audio_s']:>7.3f} "
+                  f"{result['load_mb']:>8.0f} {result['peak_mb']:>8.0f} {sum(errors) / len(errors):>7.1%}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_chunked_transcription.py
+"""
+Wall-clock time of one long upload: a single sequential Whisper pass vs the
+chunked path (split at pauses, pieces transcribed in parallel, stitched).
+
+The sample recordings in backend/tmp are short, so they are decoded, trimmed of
+silence and concatenated (cycling through them) into one recording of
+--minutes. The chunked path runs on the process executor with each worker count
+in --workers. Word agreement with the single pass shows what stitching costs
+in accuracy.
+
+Needs ffmpeg for the .m4a samples and the Whisper weights (downloaded on first use).
+
+Usage:
+  python benchmarks/bench_chunked_transcription.py
+  python benchmarks/bench_chunked_transcription.py --minutes 30 --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import difflib
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import TranscriptionEngine
+from audio_chunks import split_at_silence
+from vad import trim_silence
+
+SAMPLE_RATE = 16000
+
+
+def _long_recording(paths: list[Path], minutes: float) -> np.ndarray:
+    clips = [trim_silence(TranscriptionEngine.load_audio_file(str(p))) for p in paths]
+    clips = [c for c in clips if len(c)]
+    if not clips:
+        raise SystemExit("no speech found in the sample files")
+    target = int(minutes * 60 * SAMPLE_RATE)
+    gap = np.zeros(SAMPLE_RATE, dtype=np.float32)  # a pause between recordings
+    parts, total, i = [], 0, 0
+    while total < target:
+        parts += [clips[i % len(clips)], gap]
+        total += len(clips[i % len(clips)]) + len(gap)
+        i += 1
+    return np.concatenate(parts)[:target]
+
+
+def _use_pool(workers: int) -> None:
+    TranscriptionEngine.shutdown_executor()
+    TranscriptionEngine.EXECUTOR_KIND = "process"
+    TranscriptionEngine.MAX_WORKERS = workers
+    TranscriptionEngine.CHUNK_PARALLEL = workers
+
+
+async def _warm_up(workers: int) -> None:
+    # Start every worker and load its model before timing
+    clip = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    await asyncio.gather(*(TranscriptionEngine._run_in_pool(TranscriptionEngine.transcribe_audio, clip)
+                           for _ in range(workers)))
+
+
+def _agreement(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a.lower().split(), b.lower().split()).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=Path, help="audio files (default: backend/tmp/*)")
+    parser.add_argument("--minutes", type=float, default=10.0, help="length of the synthetic long recording")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="process pool sizes")
+    args = parser.parse_args()
+
+    files = args.files or sorted(p for p in TranscriptionEngine.TMP_DIR.iterdir()
+                                 if p.suffix.lower() in (".wav", ".m4a", ".mp3", ".ogg"))
+    audio = _long_recording(files, args.minutes)
+    pieces = len(split_at_silence(audio))
+    print(f"{len(files)} sample files -> {len(audio) / SAMPLE_RATE / 60:.1f} min of speech, {pieces} pieces")
+
+    started = time.perf_counter()
+    baseline = TranscriptionEngine.transcribe_audio(audio)
+    single_s = time.perf_counter() - started
+    print(f"{'single pass':<18} {single_s:>8.1f} s")
+
+    for workers in args.workers:
+        _use_pool(workers)
+        asyncio.run(_warm_up(workers))
+        started = time.perf_counter()
+        text = asyncio.run(TranscriptionEngine._transcribe_long(audio))
+        elapsed = time.perf_counter() - started
+        print(f"chunked x{workers:<9} {elapsed:>8.1f} s  speed-up {single_s / elapsed:>4.1f}x  "
+              f"word agreement {_agreement(baseline, text):.1%}")
+    TranscriptionEngine.shutdown_executor()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# backend/benchmarks/bench_live_classify.py
+"""
+Per-chunk classification latency at minute 1 vs minute 20 of a live call,
+for the incremental session and the whole-transcript path.
+
+By default the model is simulated: latency = --base-ms + --per-kchar-ms per
+1000 prompt characters, which is how prompt length shows up in Gemini latency.
+Pass --live to call the real Gemini API instead (needs GEMINI_API_KEY).
+
+Usage:
+  python benchmarks/bench_live_classify.py
+  python benchmarks/bench_live_classify.py --live --minutes 1 20
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+
+import ScamAnalysisEngine
+from ScamAnalysisEngine import LiveClassifierSession
+
+CHUNK_SECONDS = 10  # matches AudioStreamManager.CHUNK_SECONDS
+# ~10 s of speech
+CHUNK_TEXT = (
+    "Hello, this is Michael from the account security team at your bank. We noticed some "
+    "activity on your card this morning and just need to confirm a couple of details with you."
+)
+
+
+def _simulated_model(base_ms: float, per_kchar_ms: float):
+    def call(prompt: str, model: str) -> str:
+        time.sleep((base_ms + per_kchar_ms * len(prompt) / 1000) / 1000)
+        return "1"
+    return call
+
+
+def _run(mode: str, minutes: list[int]) -> dict[int, tuple[float, int]]:
+    """Feed chunks until the last requested minute; return {minute: (latency_ms, prompt_chars)}."""
+    prompt_sizes = []
+    real_classify = ScamAnalysisEngine._classify_prompt
+
+    def measuring_classify(prompt):
+        prompt_sizes.append(len(prompt))
+        return real_classify(prompt)
+
+    session = LiveClassifierSession(0, 0, 0, mode=mode)
+    wanted = {m * 60 // CHUNK_SECONDS: m for m in minutes}
+    results = {}
+    with patch("ScamAnalysisEngine._classify_prompt", measuring_classify):
+        for chunk in range(1, max(wanted) + 1):
+            started = time.perf_counter()
+            session.add_chunk(CHUNK_TEXT)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if chunk in wanted:
+                results[wanted[chunk]] = (elapsed_ms, prompt_sizes[-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--live", action="store_true", help="call Gemini instead of the simulated model")
+    parser.add_argument("--base-ms", type=float, default=300.0)
+    parser.add_argument("--per-kchar-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    model = None if args.live else _simulated_model(args.base_ms, args.per_kchar_ms)
+    print(f"{'mode':<12} {'minute':>6} {'prompt chars':>13} {'latency ms':>11}")
+    for mode in ("incremental", "full"):
+        if model is None:
+            results = _run(mode, args.minutes)
+        else:
+            with patch("ScamAnalysisEngine._call_with_model", model):
+                results = _run(mode, args.minutes)
+        for minute, (latency_ms, chars) in sorted(results.items()):
+            print(f"{mode:<12} {minute:>6} {chars:>13} {latency_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_report_gas.py
+"""
+Gas per report: one submitReport transaction per report vs submitReports batches.
+
+Deploys contracts/ScamRegistry.sol on an in-process eth-tester chain (no
+network) and measures receipt gasUsed. The contract is compiled with py-solc-x
+(solc 0.8.20, as scripts/compile_contract.py does) unless --bytecode points at
+an existing build, e.g. backend/bytecode/ScamRegistry.bin.
+
+Needs: pip install "eth-tester[py-evm]" py-solc-x
+
+Usage:
+  python benchmarks/bench_report_gas.py
+  python benchmarks/bench_report_gas.py --reports 200 --sizes 1 10 50
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from web3 import Web3, EthereumTesterProvider
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+ABI_PATH = ROOT / "backend" / "abi" / "ScamRegistry.json"
+SOURCE_PATH = ROOT / "contracts" / "ScamRegistry.sol"
+
+
+def _bytecode(path) -> str:
+    if path:
+        return Path(path).read_text().strip()
+    from solcx import compile_standard, install_solc
+    install_solc("0.8.20")
+    compiled = compile_standard({
+        "language": "Solidity",
+        "sources": {"ScamRegistry.sol": {"content": SOURCE_PATH.read_text()}},
+        "settings": {"outputSelection": {"*": {"*": ["evm.bytecode"]}}},
+    }, solc_version="0.8.20")
+    return compiled["contracts"]["ScamRegistry.sol"]["ScamRegistry"]["evm"]["bytecode"]["object"]
+
+
+def _deploy(w3, bytecode: str):
+    abi = json.loads(ABI_PATH.read_text())
+    reporter = w3.eth.accounts[0]
+    tx = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(reporter).transact({"from": reporter})
+    address = w3.eth.get_transaction_receipt(tx).contractAddress
+    return w3.eth.contract(address=address, abi=abi), reporter
+
+
+def _gas_used(w3, tx_hash) -> int:
+    return w3.eth.get_transaction_receipt(tx_hash).gasUsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=100, help="reports submitted per configuration")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 20, 50], help="batch sizes")
+    parser.add_argument("--bytecode", help="use this compiled bytecode instead of compiling the source")
+    args = parser.parse_args()
+
+    bytecode = _bytecode(args.bytecode)
+
+    # Fresh hashes pay for new storage slots; repeat callers only update them
+    for label, repeat in (("new callers", False), ("repeat callers", True)):
+        w3 = Web3(EthereumTesterProvider())
+        contract, reporter = _deploy(w3, bytecode)
+        pool = [os.urandom(32) for _ in range(args.reports)]
+        if repeat:
+            contract.functions.submitReports(pool, [0] * len(pool)).transact({"from": reporter, "gas": 30_000_000})
+
+        single = sum(
+            _gas_used(w3, contract.functions.submitReport(h, 2).transact({"from": reporter}))
+            for h in (pool if repeat else [os.urandom(32) for _ in range(args.reports)])
+        )
+        print(f"{label}:")
+        print(f"  submitReport x{args.reports:<6}  {single / args.reports:>9.0f} gas/report")
+
+        for size in args.sizes:
+            hashes = pool if repeat else [os.urandom(32) for _ in range(args.reports)]
+            total = 0
+            for start in range(0, len(hashes), size):
+                chunk = hashes[start:start + size]
+                tx = contract.functions.submitReports(chunk, [2] * len(chunk)).transact(
+                    {"from": reporter, "gas": 30_000_000}
+                )
+                total += _gas_used(w3, tx)
+            saving = 1 - total / single
+            print(f"  submitReports[{size:>3}]      {total / args.reports:>9.0f} gas/report  (saves {saving:.0%})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_startup.py
+"""
+Start-up cost of the backend: how long `import uploadCall` takes, and how much
+of the first request goes on loading models.
+
+Each run is a fresh process (nothing cached in memory) that imports the app,
+optionally runs the start-up warm-up, then times
+  model ready   getting a transcription model to decode on (loading it, and
+                torch, if nothing has yet) - the cold-start part of a request
+  first/second  transcribing a short clip twice; the difference is what the
+                first caller pays on top of a warm request
+
+To compare with an older checkout (e.g. before models were loaded lazily), point
+--tree at its backend directory. Needs the Whisper weights (downloaded on
+first use); TRANSCRIBE_MODEL_SIZE may be a local checkpoint path instead.
+
+Usage:
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --runs 5 --tree /path/to/old/checkout/backend
+  python benchmarks/bench_startup.py --no-transcribe
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in the child with the tree under test on sys.path. Only uses names that
+# exist both before and after lazy loading.
+_CHILD = r"""
+import json, os, sys, time
+warm, transcribe = sys.argv[1] == "1", sys.argv[2] == "1"
+out = {}
+t = time.perf_counter()
+import uploadCall
+out["import_s"] = time.perf_counter() - t
+import TranscriptionEngine as te
+if warm and hasattr(te, "warm_up"):
+    t = time.perf_counter()
+    te.warm_up()
+    import ScamAnalysisEngine
+    ScamAnalysisEngine.warm_up()
+    out["warm_up_s"] = time.perf_counter() - t
+t = time.perf_counter()
+with te._borrow_model():
+    pass
+out["model_ready_s"] = time.perf_counter() - t
+if transcribe:
+    import numpy as np
+    clip = (0.3 * np.sin(2 * np.pi * 220 * np.arange(16000 * 2) / 16000)).astype(np.float32)
+    for key in ("first_s", "second_s"):
+        t = time.perf_counter()
+        te.transcribe_audio(clip)
+        out[key] = time.perf_counter() - t
+print(json.dumps(out))
+"""
+
+
+def _run_once(tree: Path, warm: bool, transcribe: bool) -> dict:
+    env = {**os.environ, "PYTHONPATH": str(tree), "WARM_UP": "0"}
+    env.setdefault("GEMINI_API_KEY", "bench-key")  # older trees refuse to import without one
+    proc = subprocess.run([sys.executable, "-c", _CHILD, str(int(warm)), str(int(transcribe))],
+                          cwd=tree, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr.strip().splitlines()[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tree", type=Path, default=BACKEND_DIR, help="backend directory to measure")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-transcribe", action="store_true", help="skip the first/second clip timings")
+    args = parser.parse_args()
+
+    print(f"{args.tree.resolve()}, median of {args.runs} runs (s)")
+    print(f"{'':<12} {'import':>8} {'warm-up':>8} {'model ready':>12} {'first':>8} {'second':>8}")
+    for warm in (False, True):
+        runs = [_run_once(args.tree.resolve(), warm, not args.no_transcribe) for _ in range(args.runs)]
+
+        def median(key: str) -> str:
+            values = [r[key] for r in runs if key in r]
+            return f"{statistics.median(values):.2f}" if values else "-"
+
+        print(f"{'warm-up' if warm else 'cold':<12} {median('import_s'):>8} {median('warm_up_s'):>8} "
+              f"{median('model_ready_s'):>12} {median('first_s'):>8} {median('second_s'):>8}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# backend/benchmarks/preclassifier_report.py
+"""
+How much the local pre-classifier short-circuits, and how often it agrees.
+
+Runs local_scorer.preclassify over a labelled JSONL set (one object per line with
+transcript, total_logs, medium_flags, high_flags, label) and reports the fraction
+of calls decided locally, their agreement with the labels, and — with --llm — their
+agreement with Gemini on the same items (needs GEMINI_API_KEY).
+
+Usage:
+  python benchmarks/preclassifier_report.py
+  python benchmarks/preclassifier_report.py --data my_labels.jsonl --llm
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from local_scorer import preclassify
+
+DEFAULT_DATA = Path(__file__).resolve().parent / "data" / "labelled_transcripts.jsonl"
+
+
+def _llm_label(item: dict) -> str:
+    # Imported lazily so the local-only report doesn't need an API key
+    import ScamAnalysisEngine as engine
+    prompt = engine._build_prompt(item["transcript"], item["total_logs"], item["medium_flags"], item["high_flags"])
+    return engine._classify_prompt(prompt) or "?"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA)
+    parser.add_argument("--llm", action="store_true", help="also compare local decisions with Gemini")
+    args = parser.parse_args()
+    if args.llm and not os.getenv("GEMINI_API_KEY"):
+        parser.error("--llm needs GEMINI_API_KEY")
+
+    with args.data.open() as f:
+        items = [json.loads(line) for line in f if line.strip()]
+
+    decided = agree_label = agree_llm = 0
+    elapsed = 0.0
+    rows = []
+    for item in items:
+        started = time.perf_counter()
+        local = preclassify(item["transcript"], item["total_logs"], item["medium_flags"], item["high_flags"])
+        elapsed += time.perf_counter() - started
+        if local is None:
+            continue
+        decided += 1
+        agree_label += local == item["label"]
+        llm = _llm_label(item) if args.llm else None
+        agree_llm += llm == local
+        rows.append((local, item["label"], llm, item["transcript"]))
+
+    print(f"items:                 {len(items)}")
+    print(f"short-circuited:       {decided} ({decided / max(1, len(items)):.0%})")
+    print(f"mean local latency:    {elapsed / max(1, len(items)) * 1e6:.1f} µs")
+    if decided:
+        print(f"agreement with labels: {agree_label}/{decided} ({agree_label / decided:.0%})")
+        if args.llm:
+            print(f"agreement with LLM:    {agree_llm}/{decided} ({agree_llm / decided:.0%})")
+    print()
+    for local, label, llm, transcript in rows:
+        marker = " " if local == label else "!"
+        llm_col = f" llm={llm}" if llm is not None else ""
+        print(f"{marker} local={local} label={label}{llm_col}  {transcript[:70]}")
+
+
+if __name__ == "__main__":
+    main()
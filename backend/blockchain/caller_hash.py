@@ -0,0 +1,62 @@
+# backend/blockchain/caller_hash.py
+"""
+Phone number normalisation and caller hashing, without Web3.
+
+The registry keys everything by keccak256(normalised E.164 number). Hashing is
+pure, so it's done with eth_hash directly and memoised in a bounded LRU: the
+same number is looked up, reported and shown on the live socket within one
+call, and popular scam numbers recur all day.
+
+  PHONE_HASH_CACHE_SIZE  numbers remembered (default 65536)
+"""
+
+import os
+import re
+from functools import lru_cache
+
+from eth_hash.auto import keccak
+
+PHONE_HASH_CACHE_SIZE = int(os.getenv("PHONE_HASH_CACHE_SIZE", "65536"))
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+@lru_cache(maxsize=PHONE_HASH_CACHE_SIZE)
+def normalize_phone(phone_number: str) -> str:
+    """Normalize to E.164 format (best-effort, no external library)."""
+    digits = _NON_DIGITS.sub("", phone_number)
+    if len(digits) == 10:
+        return f'+1{digits}'
+    if len(digits) >= 11:
+        return f'+{digits}'
+    return phone_number if phone_number.startswith('+') else f'+{phone_number}'
+
+
+@lru_cache(maxsize=PHONE_HASH_CACHE_SIZE)
+def hash_phone(phone_number: str) -> bytes:
+    """keccak256 of the normalised number, as stored on-chain (bytes32)."""
+    return keccak(normalize_phone(phone_number).encode("utf-8"))
+
+
+def hash_phones(phone_numbers) -> list[bytes]:
+    """hash_phone for a whole list (imports, batch lookups); each distinct number is hashed once."""
+    seen: dict[str, bytes] = {}
+    out = []
+    for number in phone_numbers:
+        h = seen.get(number)
+        if h is None:
+            h = seen[number] = hash_phone(number)
+        out.append(h)
+    return out
+
+
+def cache_stats() -> dict:
+    info = hash_phone.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else None,
+    }
@@ -0,0 +1,316 @@
+# backend/blockchain/registry_indexer.py
+"""
+Local mirror of the ScamRegistry contract, built from its ScamReported events.
+
+A background thread pulls logs in bulk eth_getLogs ranges from the last
+checkpointed block and folds them into a SQLite table of per-hash totals, so
+get_caller_stats can answer with a primary-key lookup instead of an eth_call.
+
+Reorgs: the hashes of the last `reorg_depth` indexed blocks, and the events
+applied in them, are kept. Each sync first checks that the checkpoint block is
+still canonical; if not, it walks back to the common ancestor, undoes the
+events applied after it and re-indexes from there. A reorg deeper than the
+window rebuilds the mirror from the start block.
+
+Catch-up: the checkpoint is persisted, so after downtime the next sync simply
+continues from it in batches of `batch_size` blocks. If the RPC provider
+rejects a range as too large (or as returning too many results) the batch is
+halved, and it doubles back towards `batch_size` after a run of successful
+requests. Any other error - a reset connection, a timeout - ends the sync, and
+the background loop retries with an increasing delay.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+# Phrases and JSON-RPC codes providers use when an eth_getLogs range or result set is too big
+_RANGE_ERROR_PHRASES = ("range", "too many", "too large", "more than", "limit", "exceed", "10000 results")
+_RANGE_ERROR_CODES = {-32005, -32602}
+_GROW_AFTER = 5  # successful requests before a halved batch doubles again
+_MAX_BACKOFF_S = 300.0
+
+
+def _is_range_error(exc: Exception) -> bool:
+    """True if a get_logs error says the block range or result set was too large."""
+    detail = exc.args[0] if exc.args and isinstance(exc.args[0], dict) else {}
+    if detail.get("code") in _RANGE_ERROR_CODES:
+        return True
+    message = str(detail.get("message") or exc).lower()
+    return any(phrase in message for phrase in _RANGE_ERROR_PHRASES)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS caller_stats (
+    caller_hash  BLOB PRIMARY KEY,
+    total        INTEGER NOT NULL,
+    high         INTEGER NOT NULL,
+    medium       INTEGER NOT NULL,
+    last_updated INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recent_blocks (
+    number INTEGER PRIMARY KEY,
+    hash   BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recent_events (
+    block_number INTEGER NOT NULL,
+    log_index    INTEGER NOT NULL,
+    caller_hash  BLOB NOT NULL,
+    risk_level   INTEGER NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class RegistryMirror:
+    """SQLite table of per-caller-hash totals plus the bookkeeping needed to undo reorged blocks."""
+
+    def __init__(self, db_path: str = ":memory:"):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+
+    def get(self, caller_hash: bytes) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT total, high, medium, last_updated FROM caller_stats WHERE caller_hash = ?",
+                (bytes(caller_hash),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"total_reports": row[0], "high_risk_reports": row[1],
+                "medium_risk_reports": row[2], "last_updated": row[3]}
+
+    def checkpoint(self) -> Optional[int]:
+        """Last fully indexed block, or None before the first sync."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'checkpoint'").fetchone()
+        return row[0] if row else None
+
+    def block_hash(self, number: int) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT hash FROM recent_blocks WHERE number = ?", (number,)).fetchone()
+        return row[0] if row else None
+
+    def apply_range(self, events: list[dict], block_hashes: dict[int, bytes], checkpoint: int,
+                    keep_from: int) -> None:
+        """
+        Fold events into the totals and advance the checkpoint in one transaction.
+        events are dicts with block_number, log_index, caller_hash, risk_level, timestamp.
+        Reorg bookkeeping is only kept for blocks >= keep_from.
+        """
+        with self._lock, self._db:
+            for ev in events:
+                high, medium = ev["risk_level"] == 2, ev["risk_level"] == 1
+                self._db.execute(
+                    "INSERT INTO caller_stats (caller_hash, total, high, medium, last_updated) VALUES (?, 1, ?, ?, ?) "
+                    "ON CONFLICT(caller_hash) DO UPDATE SET total = total + 1, high = high + excluded.high, "
+                    "medium = medium + excluded.medium, last_updated = MAX(last_updated, excluded.last_updated)",
+                    (bytes(ev["caller_hash"]), int(high), int(medium), ev["timestamp"]),
+                )
+                if ev["block_number"] >= keep_from:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO recent_events VALUES (?, ?, ?, ?)",
+                        (ev["block_number"], ev["log_index"], bytes(ev["caller_hash"]), ev["risk_level"]),
+                    )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO recent_blocks VALUES (?, ?)",
+                [(n, bytes(h)) for n, h in block_hashes.items() if n >= keep_from],
+            )
+            self._db.execute("DELETE FROM recent_blocks WHERE number < ?", (keep_from,))
+            self._db.execute("DELETE FROM recent_events WHERE block_number < ?", (keep_from,))
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('checkpoint', ?)", (checkpoint,))
+
+    def rollback_to(self, block_number: int) -> int:
+        """Undo every event after block_number and move the checkpoint back. Returns events undone."""
+        with self._lock, self._db:
+            undone = self._db.execute(
+                "SELECT caller_hash, risk_level FROM recent_events WHERE block_number > ?", (block_number,)
+            ).fetchall()
+            for caller_hash, risk_level in undone:
+                self._db.execute(
+                    "UPDATE caller_stats SET total = total - 1, high = high - ?, medium = medium - ? "
+                    "WHERE caller_hash = ?",
+                    (int(risk_level == 2), int(risk_level == 1), caller_hash),
+                )
+            self._db.execute("DELETE FROM caller_stats WHERE total <= 0")
+            self._db.execute("DELETE FROM recent_events WHERE block_number > ?", (block_number,))
+            self._db.execute("DELETE FROM recent_blocks WHERE number > ?", (block_number,))
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('checkpoint', ?)", (block_number,))
+        return len(undone)
+
+    def reset(self) -> None:
+        with self._lock, self._db:
+            for table in ("caller_stats", "recent_blocks", "recent_events", "meta"):
+                self._db.execute(f"DELETE FROM {table}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            callers = self._db.execute("SELECT COUNT(*) FROM caller_stats").fetchone()[0]
+        return {"callers": callers, "checkpoint": self.checkpoint()}
+
+
+class RegistryIndexer:
+    """
+    Follows ScamReported logs of one contract into a RegistryMirror.
+
+    start_block  first block to index (the contract's deployment block)
+    batch_size   blocks per eth_getLogs request
+    reorg_depth  how many recent blocks may still be replaced by a reorg
+    """
+
+    def __init__(self, w3, contract, mirror: RegistryMirror, start_block: int = 0,
+                 batch_size: int = 2000, reorg_depth: int = 12):
+        self.w3 = w3
+        self.contract = contract
+        self.mirror = mirror
+        self.start_block = start_block
+        self.batch_size = batch_size
+        self.max_batch_size = batch_size
+        self.reorg_depth = reorg_depth
+        self._good_requests = 0
+        self._event = contract.events.ScamReported()
+        self._topic = self._event.topic
+        self._head: Optional[int] = None
+        self._last_sync_at: Optional[float] = None
+        self._reorgs = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def lag(self) -> Optional[int]:
+        """Blocks between the chain head seen at the last sync and the checkpoint."""
+        checkpoint = self.mirror.checkpoint()
+        if self._head is None or checkpoint is None:
+            return None
+        return self._head - checkpoint
+
+    def is_fresh(self, max_lag: int, max_age: float) -> bool:
+        """True if the mirror is close enough to the head, and recently enough synced, to answer lookups."""
+        lag = self.lag()
+        return (lag is not None and lag <= max_lag
+                and self._last_sync_at is not None and time.time() - self._last_sync_at <= max_age)
+
+    def sync_once(self) -> int:
+        """Index everything up to the current head. Returns the number of events applied."""
+        head = self.w3.eth.block_number
+        self._head = head
+        self._handle_reorg()
+
+        checkpoint = self.mirror.checkpoint()
+        from_block = self.start_block if checkpoint is None else checkpoint + 1
+        applied = 0
+        while from_block <= head:
+            to_block = min(head, from_block + self.batch_size - 1)
+            try:
+                logs = self.w3.eth.get_logs({
+                    "address": self.contract.address,
+                    "topics": [self._topic],
+                    "fromBlock": from_block,
+                    "toBlock": to_block,
+                })
+            except Exception as exc:
+                # Providers cap the range or result size of eth_getLogs; retry with a smaller range.
+                # Anything else (connection reset, timeout) is left to the caller's retry.
+                if to_block == from_block or not _is_range_error(exc):
+                    raise
+                self.batch_size = max(1, self.batch_size // 2)
+                self._good_requests = 0
+                continue
+            self._good_requests += 1
+            if self._good_requests >= _GROW_AFTER and self.batch_size < self.max_batch_size:
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+                self._good_requests = 0
+
+            events = [self._decode(log) for log in logs]
+            keep_from = head - self.reorg_depth + 1
+            hashes = {
+                n: self.w3.eth.get_block(n)["hash"]
+                for n in range(max(from_block, keep_from), to_block + 1)
+            }
+            self.mirror.apply_range(events, hashes, to_block, keep_from)
+            applied += len(events)
+            from_block = to_block + 1
+
+        self._last_sync_at = time.time()
+        return applied
+
+    def _decode(self, log) -> dict:
+        args = self._event.process_log(log)["args"]
+        return {
+            "block_number": log["blockNumber"],
+            "log_index": log["logIndex"],
+            "caller_hash": args["callerHash"],
+            "risk_level": args["riskLevel"],
+            "timestamp": args["timestamp"],
+        }
+
+    def _handle_reorg(self) -> None:
+        checkpoint = self.mirror.checkpoint()
+        if checkpoint is None or self.mirror.block_hash(checkpoint) is None:
+            return
+        # Walk back through the remembered blocks to the newest one still on the canonical chain
+        number = checkpoint
+        while number >= self.start_block:
+            stored = self.mirror.block_hash(number)
+            if stored is None:
+                break
+            if number <= self._head and bytes(self.w3.eth.get_block(number)["hash"]) == stored:
+                break
+            number -= 1
+
+        if number == checkpoint:
+            return
+        self._reorgs += 1
+        if self.mirror.block_hash(number) is None:
+            # Diverged past the window we can undo: start over
+            self.mirror.reset()
+        else:
+            self.mirror.rollback_to(number)
+
+    def stats(self) -> dict:
+        return {
+            **self.mirror.stats(),
+            "head": self._head,
+            "lag_blocks": self.lag(),
+            "last_sync_at": self._last_sync_at,
+            "reorgs": self._reorgs,
+            "batch_size": self.batch_size,
+        }
+
+    # ----------------------
+    # Background following
+    # ----------------------
+
+    def start(self, interval: float = 15.0) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="registry-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self, interval: float) -> None:
+        failures = 0
+        while True:
+            try:
+                self.sync_once()
+                failures = 0
+            except Exception:
+                failures += 1  # RPC hiccup: keep the last good mirror and retry, backing off
+            delay = max(interval, min(_MAX_BACKOFF_S, interval * 2 ** min(failures, 10)))
+            if self._stop.wait(delay):
+                return
@@ -0,0 +1,277 @@
+# backend/blockchain/report_queue.py
+"""
+Durable, non-blocking queue for on-chain report submission.
+
+analyse_call enqueues a report (one local SQLite insert) and returns; a
+background worker signs and broadcasts transactions in order. Each report moves
+through:
+
+  pending  ->  signed (raw tx and hash stored)  ->  sent
+                                                 \\->  failed (after max_attempts)
+
+The signed raw transaction is written to disk before it is broadcast, so after
+a crash the same transaction is re-broadcast rather than signed again, and a
+report is never submitted twice.
+
+Coalescing: with batch_max > 1 the worker waits until batch_max reports are
+queued or the oldest has waited batch_window seconds, then sends them all in
+one submitReports transaction. Reports in a batch share a tx_hash; the raw
+transaction is stored once, on the batch's first row.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Protocol
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    caller_hash BLOB NOT NULL,
+    risk_level  INTEGER NOT NULL,
+    status      TEXT NOT NULL,
+    tx_hash     TEXT,
+    raw_tx      TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    last_error  TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_status ON reports (status, id);
+CREATE INDEX IF NOT EXISTS reports_tx ON reports (tx_hash);
+"""
+
+# Broadcast errors meaning our nonce was already consumed by another transaction
+_NONCE_TAKEN = ("nonce too low", "replacement transaction underpriced", "already been used")
+
+
+class ReportSender(Protocol):
+    def sign(self, caller_hash: bytes, risk_level: int) -> tuple[str, str]:
+        """Build and sign a submitReport transaction. Returns (tx_hash, raw_tx) as hex."""
+
+    def sign_batch(self, caller_hashes: list[bytes], risk_levels: list[int]) -> tuple[str, str]:
+        """Build and sign one submitReports transaction for several reports."""
+
+    def broadcast(self, raw_tx: str) -> str:
+        """Send a signed transaction. Returns its hash."""
+
+    def is_known(self, tx_hash: str) -> bool:
+        """True if the node already has this transaction (pending or mined)."""
+
+    def reset_nonce(self) -> None:
+        """Forget the locally tracked nonce so the next one is read from the chain."""
+
+    def supports_batch(self) -> bool:
+        """False if the deployed contract has no submitReports, so reports must go one per transaction."""
+
+
+class ReportQueue:
+    """
+    db_path       SQLite file holding queued reports (":memory:" for tests)
+    sender        signs and broadcasts transactions (see ReportSender)
+    max_attempts  tries per transaction before its reports are marked failed
+    batch_max     most reports coalesced into one transaction (1 disables batching)
+    batch_window  seconds the oldest queued report may wait for a batch to fill
+    """
+
+    def __init__(self, db_path: str, sender: ReportSender, max_attempts: int = 5, poll_interval: float = 1.0,
+                 batch_max: int = 1, batch_window: float = 0.0):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.sender = sender
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.batch_max = max(1, batch_max)
+        self.batch_window = batch_window
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._transactions = 0
+
+    def enqueue(self, caller_hash: bytes, risk_level: int) -> int:
+        now = time.time()
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "INSERT INTO reports (caller_hash, risk_level, status, created_at, updated_at) "
+                "VALUES (?, ?, 'pending', ?, ?)",
+                (bytes(caller_hash), risk_level, now, now),
+            )
+        self._wake.set()
+        return cur.lastrowid
+
+    def get(self, report_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, tx_hash, attempts, last_error, created_at, updated_at FROM reports WHERE id = ?",
+                (report_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "status", "tx_hash", "attempts", "last_error", "created_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM reports GROUP BY status").fetchall())
+        stats = {status: counts.get(status, 0) for status in ("pending", "signed", "sent", "failed")}
+        stats["transactions"] = self._transactions
+        return stats
+
+    # ----------------------
+    # Worker
+    # ----------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="report-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def drain(self, flush: bool = False) -> int:
+        """
+        Send queued reports until the queue is empty, a transaction needs a retry, or
+        (unless flush) the next batch is still filling. Returns reports sent.
+        """
+        sent = 0
+        while not self._stop.is_set():
+            batch = self._next_batch(flush)
+            if batch is None:
+                return sent
+            ok = self._process(batch)
+            if not ok:
+                return sent
+            sent += sum(self.get(row[0])["status"] == "sent" for row in batch)
+        return sent
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.drain()
+            self._wake.wait(self._next_wakeup())
+            self._wake.clear()
+
+    def _next_wakeup(self) -> float:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT attempts, created_at FROM reports WHERE status IN ('pending', 'signed') ORDER BY id LIMIT 1"
+            ).fetchone()
+        if row is None:
+            return self.poll_interval
+        attempts, created_at = row
+        if attempts:
+            return min(60.0, 2.0 ** attempts)
+        # A batch is filling: come back when its window closes
+        return max(0.0, min(self.poll_interval, created_at + self.batch_window - time.time()))
+
+    def _next_batch(self, flush: bool) -> Optional[list[tuple]]:
+        # Strictly in id order: a transaction waiting for a retry holds back later ones,
+        # which would otherwise sit behind its nonce anyway
+        columns = "id, caller_hash, risk_level, status, tx_hash, raw_tx, attempts, created_at"
+        with self._lock:
+            first = self._db.execute(
+                f"SELECT {columns} FROM reports WHERE status IN ('pending', 'signed') ORDER BY id LIMIT 1"
+            ).fetchone()
+            if first is None:
+                return None
+            if first[3] == "signed":
+                return self._db.execute(
+                    f"SELECT {columns} FROM reports WHERE tx_hash = ? AND status = 'signed' ORDER BY id",
+                    (first[4],),
+                ).fetchall()
+        if self.batch_max == 1 or not self._batching_supported():
+            return [first]
+        with self._lock:
+            batch = self._db.execute(
+                f"SELECT {columns} FROM reports WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (self.batch_max,),
+            ).fetchall()
+        window_open = time.time() < first[7] + self.batch_window
+        if len(batch) < self.batch_max and window_open and not flush and not first[6]:
+            return None
+        return batch
+
+    def _batching_supported(self) -> bool:
+        try:
+            return self.sender.supports_batch()
+        except Exception:
+            return False  # can't tell (RPC down): single reports are always safe
+
+    def _update(self, ids: list[int], **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._db:
+            self._db.executemany(
+                f"UPDATE reports SET {assignments} WHERE id = ?",
+                [(*fields.values(), report_id) for report_id in ids],
+            )
+
+    def _mark_signed(self, ids: list[int], tx_hash: str, raw_tx: str) -> None:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE reports SET status = 'signed', tx_hash = ?, raw_tx = ?, updated_at = ? WHERE id = ?",
+                [(tx_hash, raw_tx if i == 0 else None, now, report_id) for i, report_id in enumerate(ids)],
+            )
+
+    def _process(self, batch: list[tuple]) -> bool:
+        """Advance one transaction's worth of reports. Returns False if it has to be retried later."""
+        ids = [row[0] for row in batch]
+        _, _, _, status, tx_hash, _, attempts, _ = batch[0]
+        raw_tx = next((row[5] for row in batch if row[5]), None)
+
+        if status == "pending":
+            try:
+                if len(batch) == 1:
+                    tx_hash, raw_tx = self.sender.sign(batch[0][1], batch[0][2])
+                else:
+                    tx_hash, raw_tx = self.sender.sign_batch([row[1] for row in batch], [row[2] for row in batch])
+            except Exception as e:
+                self.sender.reset_nonce()
+                return self._failed_attempt(ids, attempts, e)
+            self._mark_signed(ids, tx_hash, raw_tx)
+
+        try:
+            self.sender.broadcast(raw_tx)
+        except Exception as e:
+            if self._safe_is_known(tx_hash):
+                pass
+            elif any(marker in str(e).lower() for marker in _NONCE_TAKEN):
+                # Another transaction used this nonce: sign the reports again with a fresh one
+                self.sender.reset_nonce()
+                self._update(ids, status="pending", tx_hash=None, raw_tx=None)
+                return True
+            else:
+                return self._failed_attempt(ids, attempts, e)
+
+        self._transactions += 1
+        self._update(ids, status="sent", raw_tx=None, last_error=None)
+        return True
+
+    def _safe_is_known(self, tx_hash: str) -> bool:
+        try:
+            return self.sender.is_known(tx_hash)
+        except Exception:
+            return False
+
+    def _failed_attempt(self, ids: list[int], attempts: int, error: Exception) -> bool:
+        attempts += 1
+        if attempts >= self.max_attempts:
+            # Give up; a signed-but-unsent transaction would leave a nonce gap, so drop it too
+            self.sender.reset_nonce()
+            self._update(ids, status="failed", attempts=attempts, last_error=str(error), raw_tx=None)
+            return True
+        self._update(ids, attempts=attempts, last_error=str(error))
+        return False
@@ -1,11 +1,19 @@
 import os
-import re
 import json
+import time
+import threading
+from collections import deque
 from pathlib import Path
+from typing import Optional
 from web3 import Web3
+from web3.exceptions import ContractLogicError, TransactionNotFound
 from eth_account import Account
 from dotenv import load_dotenv
 
+from result_cache import ResultCache
+from blockchain import caller_hash as _caller_hash
+from blockchain.caller_hash import normalize_phone, hash_phone, hash_phones  # noqa: F401 (re-exported)
+
 load_dotenv()
 
 RPC_URL = os.getenv("RPC_URL")
@@ -15,6 +23,44 @@ CHAIN_ID = int(os.getenv("CHAIN_ID", "0"))
 
 _RISK_INT = {"Low": 0, "Medium": 1, "High": 2}
 
+# Caller-stats cache, keyed by the keccak caller hash. Numbers with no reports are
+# cached for a shorter time so a first report shows up quickly.
+CALLER_STATS_CACHE_SIZE = int(os.getenv("CALLER_STATS_CACHE_SIZE", "10000"))
+CALLER_STATS_CACHE_TTL = float(os.getenv("CALLER_STATS_CACHE_TTL", "300"))
+CALLER_STATS_NEGATIVE_TTL = float(os.getenv("CALLER_STATS_NEGATIVE_TTL", "60"))
+
+CALLER_STATS_CACHE = ResultCache(maxsize=CALLER_STATS_CACHE_SIZE, ttl=CALLER_STATS_CACHE_TTL)
+
+# Optional event-indexed mirror of the contract (see registry_indexer.py). When it
+# is enabled and caught up, lookups are answered locally instead of via eth_call.
+REGISTRY_MIRROR = os.getenv("REGISTRY_MIRROR", "0") == "1"
+REGISTRY_MIRROR_DB = os.getenv(
+    "REGISTRY_MIRROR_DB", str(Path(__file__).resolve().parent.parent / "var" / "registry_mirror.sqlite3")
+)
+REGISTRY_START_BLOCK = int(os.getenv("REGISTRY_START_BLOCK", "0"))
+REGISTRY_LOG_BATCH = int(os.getenv("REGISTRY_LOG_BATCH", "2000"))
+REGISTRY_REORG_DEPTH = int(os.getenv("REGISTRY_REORG_DEPTH", "12"))
+REGISTRY_POLL_INTERVAL_S = float(os.getenv("REGISTRY_POLL_INTERVAL_S", "15"))
+REGISTRY_MAX_LAG = int(os.getenv("REGISTRY_MAX_LAG", "5"))
+
+_indexer = None
+_mirror_answers = 0
+
+# Report submission queue (see report_queue.py)
+REPORT_QUEUE_DB = os.getenv(
+    "REPORT_QUEUE_DB", str(Path(__file__).resolve().parent.parent / "var" / "reports.sqlite3")
+)
+REPORT_MAX_ATTEMPTS = int(os.getenv("REPORT_MAX_ATTEMPTS", "5"))
+REPORT_GAS_LIMIT = int(os.getenv("REPORT_GAS_LIMIT", "0"))   # 0 = estimate once and cache
+# Coalesce queued reports into one submitReports transaction: up to REPORT_BATCH_MAX
+# reports, waiting at most REPORT_BATCH_WINDOW_S for a batch to fill
+REPORT_BATCH_MAX = int(os.getenv("REPORT_BATCH_MAX", "20"))
+REPORT_BATCH_WINDOW_S = float(os.getenv("REPORT_BATCH_WINDOW_S", "2"))
+
+_rpc_latencies_ms: deque = deque(maxlen=500)
+_rpc_errors = 0
+_rpc_lock = threading.Lock()
+
 # Load ABI relative to this file so it works regardless of cwd
 _ABI_PATH = Path(__file__).resolve().parent.parent / "abi" / "ScamRegistry.json"
 
@@ -50,56 +96,307 @@ def _get_web3():
     return _w3, _contract, _account
 
 
-def normalize_phone(phone_number: str) -> str:
-    """Normalize to E.164 format (best-effort, no external library)."""
-    digits = re.sub(r'\D', '', phone_number)
-    if len(digits) == 10:
-        return f'+1{digits}'
-    if len(digits) >= 11:
-        return f'+{digits}'
-    return phone_number if phone_number.startswith('+') else f'+{phone_number}'
+def _empty_stats() -> dict:
+    return {"total_reports": 0, "high_risk_reports": 0, "medium_risk_reports": 0}
 
 
-def hash_phone(phone_number: str) -> bytes:
-    w3, _, _ = _get_web3()
-    normalized = normalize_phone(phone_number)
-    return w3.keccak(text=normalized)
+def _record_rpc(started: float, ok: bool) -> None:
+    global _rpc_errors
+    with _rpc_lock:
+        _rpc_latencies_ms.append((time.perf_counter() - started) * 1000)
+        if not ok:
+            _rpc_errors += 1
 
 
 def get_caller_stats(phone_number: str) -> dict:
+    caller_hash = hash_phone(phone_number)
+    mirrored = _mirror_lookup(caller_hash)
+    if mirrored is not None:
+        return mirrored
+
+    key = caller_hash.hex()
+    cached = CALLER_STATS_CACHE.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    started = time.perf_counter()
     try:
         _, contract, _ = _get_web3()
-        caller_hash = hash_phone(phone_number)
         total, high, medium = contract.functions.getReport(caller_hash).call()
-        return {"total_reports": total, "high_risk_reports": high, "medium_risk_reports": medium}
     except Exception:
-        return {"total_reports": 0, "high_risk_reports": 0, "medium_risk_reports": 0}
+        # Not cached: an RPC outage shouldn't pin callers to zero reports
+        _record_rpc(started, ok=False)
+        return _empty_stats()
+    _record_rpc(started, ok=True)
 
+    stats = {"total_reports": total, "high_risk_reports": high, "medium_risk_reports": medium}
+    CALLER_STATS_CACHE.set(key, stats, ttl=CALLER_STATS_NEGATIVE_TTL if total == 0 else None)
+    return dict(stats)
 
-def submit_caller_report(phone_number: str, risk_level) -> str:
-    """risk_level can be int (0/1/2) or string ('Low'/'Medium'/'High')."""
-    w3, contract, account = _get_web3()
 
+def _mirror_lookup(caller_hash: bytes):
+    global _mirror_answers
+    indexer = _indexer
+    if indexer is None or not indexer.is_fresh(REGISTRY_MAX_LAG, max_age=max(60.0, 4 * REGISTRY_POLL_INTERVAL_S)):
+        return None
+    row = indexer.mirror.get(caller_hash)
+    with _rpc_lock:  # lookups run in to_thread workers
+        _mirror_answers += 1
+    if row is None:
+        return _empty_stats()
+    return {k: row[k] for k in ("total_reports", "high_risk_reports", "medium_risk_reports")}
+
+
+def start_registry_indexer():
+    """Start following ScamReported events into the local mirror (no-op unless REGISTRY_MIRROR=1)."""
+    global _indexer
+    if not REGISTRY_MIRROR or _indexer is not None:
+        return _indexer
+    from blockchain.registry_indexer import RegistryIndexer, RegistryMirror
+    w3, contract, _ = _get_web3()
+    _indexer = RegistryIndexer(
+        w3, contract, RegistryMirror(REGISTRY_MIRROR_DB), start_block=REGISTRY_START_BLOCK,
+        batch_size=REGISTRY_LOG_BATCH, reorg_depth=REGISTRY_REORG_DEPTH,
+    )
+    _indexer.start(REGISTRY_POLL_INTERVAL_S)
+    return _indexer
+
+
+def stop_registry_indexer() -> None:
+    global _indexer
+    if _indexer is not None:
+        _indexer.stop()
+        _indexer = None
+
+
+def get_callers_stats(phone_numbers: list[str]) -> list[dict]:
+    """
+    get_caller_stats for many numbers: answers from the mirror or cache where possible
+    and fetches the rest with one getReports call.
+    """
+    hashes = hash_phones(phone_numbers)
+    results: list[Optional[dict]] = []
+    missing: dict[bytes, list[int]] = {}
+    for i, caller_hash in enumerate(hashes):
+        found = _mirror_lookup(caller_hash)
+        if found is None:
+            cached = CALLER_STATS_CACHE.get(caller_hash.hex())
+            found = dict(cached) if cached is not None else None
+        results.append(found)
+        if found is None:
+            missing.setdefault(caller_hash, []).append(i)
+
+    if missing:
+        unique = list(missing)
+        started = time.perf_counter()
+        try:
+            _, contract, _ = _get_web3()
+            totals, highs, mediums = contract.functions.getReports(unique).call()
+        except Exception:
+            _record_rpc(started, ok=False)
+            totals = highs = mediums = None
+        else:
+            _record_rpc(started, ok=True)
+        for j, caller_hash in enumerate(unique):
+            if totals is None:
+                stats = _empty_stats()
+            else:
+                stats = {"total_reports": totals[j], "high_risk_reports": highs[j], "medium_risk_reports": mediums[j]}
+                CALLER_STATS_CACHE.set(caller_hash.hex(), stats,
+                                       ttl=CALLER_STATS_NEGATIVE_TTL if totals[j] == 0 else None)
+            for i in missing[caller_hash]:
+                results[i] = dict(stats)
+    return results
+
+
+def _apply_own_report(caller_hash: bytes, risk_int: int) -> None:
+    """Fold a report we just sent into the cached stats so our own view is current."""
+    key = caller_hash.hex()
+    cached = CALLER_STATS_CACHE.get(key)
+    if cached is None:
+        return
+    updated = dict(cached)
+    updated["total_reports"] += 1
+    if risk_int == 2:
+        updated["high_risk_reports"] += 1
+    elif risk_int == 1:
+        updated["medium_risk_reports"] += 1
+    CALLER_STATS_CACHE.set(key, updated)
+
+
+def caller_stats_metrics() -> dict:
+    """Cache hit/miss counters and getReport RPC latency."""
+    with _rpc_lock:
+        ordered = sorted(_rpc_latencies_ms)
+        errors = _rpc_errors
+        answers = _mirror_answers
+    rpc = {"calls": len(ordered), "errors": errors, "latency_ms": None}
+    if ordered:
+        rpc["latency_ms"] = {
+            "mean": round(sum(ordered) / len(ordered), 2),
+            "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 2),
+            "max": round(ordered[-1], 2),
+        }
+    mirror = dict(_indexer.stats(), answers=answers) if _indexer is not None else None
+    return {"cache": CALLER_STATS_CACHE.stats(), "rpc": rpc, "mirror": mirror, "hashing": _caller_hash.cache_stats()}
+
+
+def _risk_int(risk_level) -> int:
     if isinstance(risk_level, str):
         risk_int = _RISK_INT.get(risk_level, 0)
     else:
         risk_int = int(risk_level)
-
     if risk_int not in (0, 1, 2):
         raise ValueError("risk_level must be 0/1/2 or Low/Medium/High")
+    return risk_int
+
+
+class _ChainSender:
+    """
+    Signs and broadcasts submitReport(s) transactions with a locally tracked nonce
+    and cached gas limits, so a transaction costs one RPC round trip (the send).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nonce: Optional[int] = None
+        self._gas_limit: Optional[int] = REPORT_GAS_LIMIT or None
+        self._batch_gas: dict[int, int] = {}
+        self._supports_batch: Optional[bool] = None
 
+    def _next_nonce(self, w3, address) -> int:
+        with self._lock:
+            if self._nonce is None:
+                self._nonce = w3.eth.get_transaction_count(address, "pending")
+            nonce = self._nonce
+            self._nonce += 1
+            return nonce
+
+    def reset_nonce(self) -> None:
+        with self._lock:
+            self._nonce = None
+
+    def _gas(self, contract, account) -> int:
+        if self._gas_limit is None:
+            # submitReport costs the same for every call except that a first report for a
+            # hash writes fresh storage slots; estimate that worst case on a random hash
+            estimate = contract.functions.submitReport(os.urandom(32), 2).estimate_gas({"from": account.address})
+            self._gas_limit = int(estimate * 1.2)
+        return self._gas_limit
+
+    def _batch_gas_for(self, contract, account, size: int) -> int:
+        if size not in self._batch_gas:
+            hashes = [os.urandom(32) for _ in range(size)]
+            estimate = contract.functions.submitReports(hashes, [2] * size).estimate_gas({"from": account.address})
+            self._batch_gas[size] = int(estimate * 1.2)
+        return self._batch_gas[size]
+
+    def supports_batch(self) -> bool:
+        """Whether the deployed registry has submitReports (contracts deployed before it don't)."""
+        if self._supports_batch is None:
+            _, contract, account = _get_web3()
+            try:
+                contract.functions.submitReports([], []).call({"from": account.address})
+                self._supports_batch = True
+            except ContractLogicError:
+                self._supports_batch = False
+        return self._supports_batch
+
+    def _sign(self, w3, account, fn, gas: int) -> tuple[str, str]:
+        tx = fn.build_transaction({
+            "from": account.address,
+            "nonce": self._next_nonce(w3, account.address),
+            "chainId": CHAIN_ID,
+            "gas": gas,
+            "gasPrice": w3.to_wei("1", "gwei"),
+        })
+        signed_tx = account.sign_transaction(tx)
+        return w3.to_hex(signed_tx.hash), w3.to_hex(signed_tx.raw_transaction)
+
+    def sign(self, caller_hash: bytes, risk_level: int) -> tuple[str, str]:
+        w3, contract, account = _get_web3()
+        fn = contract.functions.submitReport(caller_hash, risk_level)
+        return self._sign(w3, account, fn, self._gas(contract, account))
+
+    def sign_batch(self, caller_hashes: list[bytes], risk_levels: list[int]) -> tuple[str, str]:
+        w3, contract, account = _get_web3()
+        fn = contract.functions.submitReports(list(caller_hashes), list(risk_levels))
+        return self._sign(w3, account, fn, self._batch_gas_for(contract, account, len(caller_hashes)))
+
+    def broadcast(self, raw_tx: str) -> str:
+        w3, _, _ = _get_web3()
+        return w3.to_hex(w3.eth.send_raw_transaction(raw_tx))
+
+    def is_known(self, tx_hash: str) -> bool:
+        w3, _, _ = _get_web3()
+        try:
+            w3.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            return False
+        return True
+
+
+_sender = _ChainSender()
+_report_queue = None
+_report_queue_lock = threading.Lock()
+
+
+def submit_caller_report(phone_number: str, risk_level) -> str:
+    """risk_level can be int (0/1/2) or string ('Low'/'Medium'/'High')."""
+    risk_int = _risk_int(risk_level)
     caller_hash = hash_phone(phone_number)
+    _, raw_tx = _sender.sign(caller_hash, risk_int)
+    try:
+        tx_hash = _sender.broadcast(raw_tx)
+    except Exception:
+        _sender.reset_nonce()
+        raise
+    _apply_own_report(caller_hash, risk_int)
+    return tx_hash
 
-    gas_estimate = contract.functions.submitReport(caller_hash, risk_int).estimate_gas(
-        {"from": account.address}
-    )
-    tx = contract.functions.submitReport(caller_hash, risk_int).build_transaction({
-        "from": account.address,
-        "nonce": w3.eth.get_transaction_count(account.address),
-        "chainId": CHAIN_ID,
-        "gas": int(gas_estimate * 1.2),
-        "gasPrice": w3.to_wei("1", "gwei"),
-    })
-    signed_tx = account.sign_transaction(tx)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return w3.to_hex(tx_hash)
+
+def _get_report_queue():
+    global _report_queue
+    with _report_queue_lock:
+        if _report_queue is None:
+            from blockchain.report_queue import ReportQueue
+            _report_queue = ReportQueue(
+                REPORT_QUEUE_DB, _sender, max_attempts=REPORT_MAX_ATTEMPTS,
+                batch_max=REPORT_BATCH_MAX, batch_window=REPORT_BATCH_WINDOW_S,
+            )
+            _report_queue.start()
+        return _report_queue
+
+
+def queue_caller_report(phone_number: str, risk_level) -> int:
+    """
+    Queue a report for background submission and return its id straight away.
+    The report is on disk before this returns, so it survives a restart.
+    """
+    risk_int = _risk_int(risk_level)
+    caller_hash = hash_phone(phone_number)
+    report_id = _get_report_queue().enqueue(caller_hash, risk_int)
+    _apply_own_report(caller_hash, risk_int)
+    return report_id
+
+
+def report_status(report_id: int) -> Optional[dict]:
+    return _get_report_queue().get(report_id)
+
+
+def report_queue_stats() -> dict:
+    """Queued reports by status."""
+    return _get_report_queue().stats()
+
+
+def start_report_queue() -> None:
+    """Start the submission worker (also resumes reports left over from a previous run)."""
+    _get_report_queue()
+
+
+def stop_report_queue() -> None:
+    global _report_queue
+    with _report_queue_lock:
+        if _report_queue is not None:
+            _report_queue.stop()
+            _report_queue = None
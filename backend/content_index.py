@@ -0,0 +1,80 @@
+# backend/content_index.py
+"""
+Content-addressed transcripts: a recording that was uploaded before isn't transcribed again.
+
+The same voicemail or robocall is uploaded by many people. Uploads are hashed
+while they stream in - the bytes, and the decoded 16 kHz PCM (ingest.py) - and
+the artifact store keeps both digests with the artifact. Once a call has been
+transcribed, its transcript is kept here under each digest, so a later upload
+with identical bytes, or one that decodes to identical samples (the same audio
+in another container), reuses it. Its label usually needs no model call either:
+the transcript is word for word the same, so the pre-classifier or the
+classification cache already has it.
+
+  CONTENT_INDEX_SIZE   entries kept in memory
+  CONTENT_INDEX_TTL_S  how long a transcript is kept
+  CONTENT_INDEX_DB     SQLite file for the persistent tier ("" for memory only)
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from result_cache import ResultCache
+
+BASE_DIR = Path(__file__).resolve().parent
+
+_transcripts = ResultCache(
+    maxsize=int(os.getenv("CONTENT_INDEX_SIZE", "4096")),
+    ttl=float(os.getenv("CONTENT_INDEX_TTL_S", str(30 * 24 * 3600))),
+    db_path=os.getenv("CONTENT_INDEX_DB", str(BASE_DIR / "var" / "content_index.sqlite3")) or None,
+)
+
+_lock = threading.Lock()
+_avoided = {"transcriptions": 0, "audio_seconds": 0.0, "classifications": 0}
+
+
+def _keys(artifact: dict) -> list[str]:
+    # PCM first: it also matches the same audio uploaded in a different container
+    keys = []
+    if artifact.get("pcm_sha256"):
+        keys.append(f"pcm:{artifact['pcm_sha256']}")
+    if artifact.get("sha256"):
+        keys.append(f"bytes:{artifact['sha256']}")
+    return keys
+
+
+def lookup(artifact: dict) -> Optional[str]:
+    """Transcript of an earlier upload with the same content as this artifact (see artifact_store), or None."""
+    for key in _keys(artifact):
+        hit = _transcripts.get(key)
+        if hit is not None:
+            return hit["transcript"]
+    return None
+
+
+def remember(artifact: dict, transcript: str) -> None:
+    for key in _keys(artifact):
+        _transcripts.set(key, {"transcript": transcript})
+
+
+def record_reuse(artifact: dict, classified: bool) -> None:
+    """Count a call answered from the index: its transcription, and its classification if that needed no model."""
+    with _lock:
+        _avoided["transcriptions"] += 1
+        _avoided["audio_seconds"] += artifact.get("duration_s") or 0.0
+        _avoided["classifications"] += int(classified)
+
+
+def clear() -> None:
+    _transcripts.clear()
+    with _lock:
+        _avoided.update(transcriptions=0, audio_seconds=0.0, classifications=0)
+
+
+def stats() -> dict:
+    """Index occupancy, and the Whisper and Gemini work repeated uploads didn't cost."""
+    with _lock:
+        avoided = {**_avoided, "audio_seconds": round(_avoided["audio_seconds"], 1)}
+    return {"index": _transcripts.stats(), "avoided": avoided}
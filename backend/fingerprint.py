@@ -0,0 +1,344 @@
+# backend/fingerprint.py
+"""
+Audio fingerprints of known scam recordings.
+
+Robocall campaigns play the same recording to thousands of people, and it
+reaches us re-encoded (phone codecs, m4a/mp3) and at different volumes, so the
+bytes and even the samples differ (content_index.py only catches exact
+copies). A landmark fingerprint survives that:
+
+  1. the log-mel spectrogram Whisper uses (80 bands, 10 ms frames). It is
+     log-scaled and clamped relative to its own maximum, so a volume change
+     doesn't move anything
+  2. landmarks: spectral peaks, the loudest points in their neighbourhood of
+     time and frequency - what survives noise and lossy codecs
+  3. each peak is paired with a few that follow it shortly after; a pair's
+     (band, band, time gap) is a hash that doesn't depend on where in the
+     recording it happens
+
+Known recordings' hashes go in an inverted index (sorted arrays, looked up with
+a binary search; persisted in SQLite). A query counts, per known recording, the
+hashes that line up at one time offset: a re-encoded or partial copy shares
+many, unrelated audio almost none at a consistent offset. The confidence is that
+count over the number of hashes in the shorter of query and recording.
+
+  FINGERPRINT_DB              SQLite file of known recordings ("" for memory only)
+  FINGERPRINT_MIN_CONFIDENCE  confidence at which a match is reported as one
+  FINGERPRINT_MIN_ALIGNED     ... and the fewest aligned hashes it needs
+  FINGERPRINT_WINDOW_S        an upload is matched on windows this long ...
+  FINGERPRINT_WINDOWS         ... at most this many, spread from its start to its end
+
+Add recordings with `python fingerprint.py add NAME FILE...`.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent
+FINGERPRINT_DB = os.getenv("FINGERPRINT_DB", str(BASE_DIR / "var" / "fingerprints.sqlite3"))
+FINGERPRINT_MIN_CONFIDENCE = float(os.getenv("FINGERPRINT_MIN_CONFIDENCE", "0.2"))
+FINGERPRINT_MIN_ALIGNED = int(os.getenv("FINGERPRINT_MIN_ALIGNED", "25"))
+FINGERPRINT_WINDOW_S = float(os.getenv("FINGERPRINT_WINDOW_S", "20"))
+FINGERPRINT_WINDOWS = int(os.getenv("FINGERPRINT_WINDOWS", "3"))
+
+FRAMES_PER_S = 100       # Whisper's mel hop: 160 samples at 16 kHz
+_PEAK_BANDS = 3          # a peak is the maximum of +-3 mel bands...
+_PEAK_FRAMES = 5         # ... and +-50 ms around it,
+_PEAK_RANGE = 0.5        # within 20 dB (Whisper's scale: 1.0 = 40 dB) ...
+_LOUDNESS_FRAMES = 50    # ... of the loudest bin in the surrounding second
+_PEAKS_PER_S = 30        # at most this many peaks per second, the loudest
+_FAN_OUT = 10            # pairs per peak
+_PAIR_MAX_FRAMES = 100   # paired peaks are at most 1 s apart ...
+_PAIR_MAX_BANDS = 24     # ... and this many bands
+_LOOKAHEAD = 40          # peaks scanned for pairs
+_SLACK_FRAMES = 1        # offset jitter (frames) tolerated when aligning
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id         INTEGER PRIMARY KEY,
+    name       TEXT NOT NULL,
+    duration_s REAL NOT NULL,
+    added_at   REAL NOT NULL,
+    hashes     BLOB NOT NULL,
+    times      BLOB NOT NULL
+);
+"""
+
+
+class Match(NamedTuple):
+    recording_id: int
+    name: str
+    confidence: float  # 0-1, see the module docstring
+    aligned: int       # hashes that line up
+    offset_s: float    # where in the known recording the query starts
+
+    def is_strong(self) -> bool:
+        return self.confidence >= FINGERPRINT_MIN_CONFIDENCE and self.aligned >= FINGERPRINT_MIN_ALIGNED
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "confidence": round(self.confidence, 3), "aligned": self.aligned,
+                "offset_s": round(self.offset_s, 2)}
+
+
+def log_mel(audio: np.ndarray) -> np.ndarray:
+    """Whisper's log-mel spectrogram of 16 kHz mono float32 samples, (80, frames)."""
+    import whisper  # lazy: pulls in torch, see TranscriptionEngine
+    return whisper.log_mel_spectrogram(np.ascontiguousarray(audio, dtype=np.float32)).numpy()
+
+
+def _sliding_max(x: np.ndarray, radius: int, axis: int) -> np.ndarray:
+    pad = [(0, 0)] * x.ndim
+    pad[axis] = (radius, radius)
+    windows = np.lib.stride_tricks.sliding_window_view(np.pad(x, pad, mode="edge"), 2 * radius + 1, axis=axis)
+    return windows.max(axis=-1)
+
+
+def _peaks(mel: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(frames, bands) of the spectral peaks, ordered by time then band."""
+    local_max = _sliding_max(_sliding_max(mel, _PEAK_BANDS, 0), _PEAK_FRAMES, 1)
+    # Quiet bins are the first to drown in noise or codec artefacts; Whisper's
+    # floor (everything 80 dB under the maximum) is flat, so never a peak
+    loudness = _sliding_max(mel.max(axis=0, keepdims=True), _LOUDNESS_FRAMES, 1)
+    bands, frames = np.nonzero((mel == local_max) & (mel > loudness - _PEAK_RANGE) & (mel > mel.min() + 0.05))
+    if len(frames) == 0:
+        return frames, bands
+    # Keep the loudest per second, so dense passages don't flood the index
+    strength = mel[bands, frames]
+    second = frames // FRAMES_PER_S
+    order = np.lexsort((-strength, second))
+    rank = np.arange(len(order)) - np.searchsorted(second[order], second[order])
+    keep = order[rank < _PEAKS_PER_S]
+    keep = keep[np.lexsort((bands[keep], frames[keep]))]
+    return frames[keep], bands[keep]
+
+
+def fingerprint(audio: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Landmark hashes of 16 kHz mono samples, and the frame each one starts at."""
+    if len(audio) < 400:  # shorter than one STFT window
+        return np.empty(0, np.uint32), np.empty(0, np.int32)
+    frames, bands = _peaks(log_mel(audio))
+    hashes, times = [], []
+    taken = np.zeros(len(frames), dtype=np.int32)
+    for k in range(1, _LOOKAHEAD + 1):
+        if k >= len(frames):
+            break
+        dt = frames[k:] - frames[:-k]
+        df = bands[k:] - bands[:-k]
+        pair = (dt >= 1) & (dt <= _PAIR_MAX_FRAMES) & (np.abs(df) <= _PAIR_MAX_BANDS) & (taken[:-k] < _FAN_OUT)
+        anchors = np.nonzero(pair)[0]
+        taken[anchors] += 1
+        # band (7 bits) | paired band (7 bits) | gap in frames (7 bits)
+        hashes.append((bands[anchors] << 14) | (bands[anchors + k] << 7) | dt[anchors])
+        times.append(frames[anchors])
+    if not hashes:
+        return np.empty(0, np.uint32), np.empty(0, np.int32)
+    return np.concatenate(hashes).astype(np.uint32), np.concatenate(times).astype(np.int32)
+
+
+class FingerprintIndex:
+    """Inverted index from landmark hash to (recording, frame). Thread-safe."""
+
+    def __init__(self, db_path: Optional[str] = FINGERPRINT_DB):
+        self._lock = threading.Lock()
+        self._names: dict[int, str] = {}
+        self._sizes: dict[int, int] = {}
+        self._hashes = np.empty(0, np.uint32)  # sorted; _recs and _times in the same order
+        self._recs = np.empty(0, np.int32)
+        self._times = np.empty(0, np.int32)
+        self._stats = {"queries": 0, "matches": 0}
+        self._db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+            rows = self._db.execute("SELECT id, name, hashes, times FROM recordings").fetchall()
+            self._extend([(rid, name, np.frombuffer(h, np.uint32), np.frombuffer(t, np.int32))
+                          for rid, name, h, t in rows])
+
+    @property
+    def empty(self) -> bool:
+        return not self._names
+
+    def add(self, name: str, audio: np.ndarray) -> int:
+        """Index a known scam recording (16 kHz mono samples); returns its id."""
+        hashes, times = fingerprint(audio)
+        with self._lock:
+            if self._db is not None:
+                with self._db:
+                    rid = self._db.execute(
+                        "INSERT INTO recordings (name, duration_s, added_at, hashes, times) VALUES (?, ?, ?, ?, ?)",
+                        (name, len(audio) / 16000, time.time(), hashes.tobytes(), times.tobytes()),
+                    ).lastrowid
+            else:
+                rid = max(self._names, default=0) + 1
+        self._extend([(rid, name, hashes, times)])
+        return rid
+
+    def remove(self, recording_id: int) -> bool:
+        with self._lock:
+            if recording_id not in self._names:
+                return False
+            keep = self._recs != recording_id
+            self._hashes, self._recs, self._times = self._hashes[keep], self._recs[keep], self._times[keep]
+            del self._names[recording_id], self._sizes[recording_id]
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM recordings WHERE id = ?", (recording_id,))
+        return True
+
+    def match(self, audio: np.ndarray) -> Optional[Match]:
+        """The known recording `audio` lines up with best, or None if it shares no hashes with any."""
+        if self.empty:
+            return None
+        q_hashes, q_times = fingerprint(audio)
+        match = self.match_hashes(q_hashes, q_times)
+        with self._lock:
+            self._stats["queries"] += 1
+            self._stats["matches"] += int(match is not None and match.is_strong())
+        return match
+
+    def match_hashes(self, q_hashes: np.ndarray, q_times: np.ndarray) -> Optional[Match]:
+        with self._lock:
+            hashes, recs, times = self._hashes, self._recs, self._times
+            names, sizes = dict(self._names), dict(self._sizes)
+        if len(q_hashes) == 0 or len(hashes) == 0:
+            return None
+
+        # Every (recording, frame) posting for every query hash, without a Python loop
+        lo = np.searchsorted(hashes, q_hashes, side="left")
+        hi = np.searchsorted(hashes, q_hashes, side="right")
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return None
+        starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        postings = starts + np.arange(total)
+        offsets = times[postings].astype(np.int64) - np.repeat(q_times, counts)
+
+        # Votes per (recording, offset), plus the neighbouring offsets for codec/resampling jitter
+        keys = recs[postings].astype(np.int64) << 32 | (offsets + (1 << 31))
+        keys, votes = np.unique(keys, return_counts=True)
+        window = votes.copy()
+        for shift in range(1, _SLACK_FRAMES + 1):
+            for neighbour in (keys - shift, keys + shift):
+                at = np.searchsorted(keys, neighbour)
+                found = at < len(keys)
+                found[found] = keys[at[found]] == neighbour[found]
+                window[found] += votes[at[found]]
+        best = int(np.argmax(window))
+        rid = int(keys[best] >> 32)
+        offset = int(keys[best] & 0xFFFFFFFF) - (1 << 31)
+        aligned = int(window[best])
+        confidence = min(1.0, aligned / min(len(q_hashes), sizes[rid]))
+        return Match(rid, names[rid], confidence, aligned, offset / FRAMES_PER_S)
+
+    def recordings(self) -> list[dict]:
+        with self._lock:
+            return [{"id": rid, "name": name, "hashes": self._sizes[rid]} for rid, name in self._names.items()]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"recordings": len(self._names), "hashes": len(self._hashes), **self._stats}
+
+    def _extend(self, recordings: list) -> None:
+        with self._lock:
+            parts_h, parts_r, parts_t = [self._hashes], [self._recs], [self._times]
+            for rid, name, hashes, times in recordings:
+                self._names[rid] = name
+                self._sizes[rid] = len(hashes)
+                parts_h.append(hashes)
+                parts_r.append(np.full(len(hashes), rid, np.int32))
+                parts_t.append(times)
+            hashes = np.concatenate(parts_h)
+            order = np.argsort(hashes, kind="stable")
+            self._hashes = hashes[order]
+            self._recs = np.concatenate(parts_r)[order]
+            self._times = np.concatenate(parts_t)[order]
+
+
+_index: Optional[FingerprintIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> FingerprintIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FingerprintIndex()
+        return _index
+
+
+def windows(audio: np.ndarray) -> list[np.ndarray]:
+    """Up to FINGERPRINT_WINDOWS slices of FINGERPRINT_WINDOW_S, the first at the start and the last at the end.
+
+    A partial copy lines up within any few seconds of it, so a 30 minute upload
+    costs no more to match than a minute of it.
+    """
+    size = int(FINGERPRINT_WINDOW_S * 16000)
+    if len(audio) <= size or FINGERPRINT_WINDOWS <= 1:
+        return [audio[:size]]
+    starts = np.linspace(0, len(audio) - size, FINGERPRINT_WINDOWS).astype(int)
+    return [audio[start:start + size] for start in dict.fromkeys(starts)]
+
+
+def best_match(audio: np.ndarray, index: Optional[FingerprintIndex] = None) -> Optional[Match]:
+    """The best match over the windows of `audio`, strong or not, or None."""
+    index = index or get_index()
+    best = None
+    for window in windows(audio):
+        match = index.match(window)
+        if match is not None and (best is None or match.confidence > best.confidence):
+            best = match
+            if match.is_strong():
+                break
+    return best
+
+
+def match_known_scam(audio: np.ndarray) -> Optional[Match]:
+    """A strong match of `audio` against the known scam recordings, or None. Free while the index is empty."""
+    index = get_index()
+    if index.empty:
+        return None
+    match = best_match(audio, index)
+    return match if match is not None and match.is_strong() else None
+
+
+def stats() -> dict:
+    return get_index().stats()
+
+
+if __name__ == "__main__":
+    import argparse
+    from TranscriptionEngine import load_audio_file  # also decodes what the app doesn't upload (mp3, m4a, ...)
+
+    parser = argparse.ArgumentParser(description="Manage the index of known scam recordings.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="fingerprint recordings into the index")
+    add.add_argument("name")
+    add.add_argument("files", nargs="+")
+    query = sub.add_parser("match", help="best match for a recording")
+    query.add_argument("file")
+    sub.add_parser("list")
+    remove = sub.add_parser("remove")
+    remove.add_argument("id", type=int)
+    args = parser.parse_args()
+
+    index = get_index()
+    if args.command == "add":
+        for path in args.files:
+            print(f"{path}: id {index.add(args.name, load_audio_file(path))}")
+    elif args.command == "match":
+        match = best_match(load_audio_file(args.file), index)
+        print(match.to_dict() | {"strong": match.is_strong()} if match else "no match")
+    elif args.command == "list":
+        for rec in index.recordings():
+            print(f"{rec['id']:>5}  {rec['hashes']:>7} hashes  {rec['name']}")
+    else:
+        sys.exit(0 if index.remove(args.id) else 1)
@@ -0,0 +1,264 @@
+# backend/ingest.py
+"""
+Upload ingestion: audio is decoded while it is still arriving.
+
+What an upload is comes from its first bytes, not its filename:
+
+  16 kHz mono PCM16 WAV  what the Android app records: the samples are copied
+                         straight into the artifact, no decoder involved
+  other WAV, MP3, AAC,   piped chunk by chunk into one ffmpeg process, which
+  Ogg, FLAC, WebM        downmixes and resamples to 16 kHz mono as they arrive
+  MP4 / M4A              spooled to disk and decoded the moment the upload
+                         ends: ffmpeg can't read MP4 from a pipe when the index
+                         (moov atom) is at the end, which is where phones put it
+
+Either way the upload becomes one artifact, <call_id>.wav in 16 kHz mono PCM16
+(a quarter of the size of float32 samples), which TranscriptionEngine reads in
+memory without a second decode. If ffmpeg (FFMPEG_BIN) isn't installed, other
+formats are stored as uploaded and decoded at analysis time, as before.
+"""
+
+import asyncio
+import hashlib
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Optional
+
+from audio_decode import SAMPLE_RATE, wav_pcm16_data
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+_SNIFF_BYTES = 64 * 1024  # a WAV header must fit in this to take the native path
+_WAV_HEADER_BYTES = 44
+
+
+class UnsupportedAudio(ValueError):
+    """The upload looked like audio but couldn't be decoded."""
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Container format from a file's first bytes: wav, m4a, ogg, flac, webm, mp3, aac; None if not audio."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[4:8] == b"ftyp":
+        return "m4a"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"\x1a\x45\xdf\xa3":  # EBML: WebM / Matroska
+        return "webm"
+    if head[:3] == b"ID3":
+        return "mp3"
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        # MPEG frame sync; layer bits 00 mark an ADTS (AAC) stream instead
+        return "aac" if head[1] & 0x06 == 0 else "mp3"
+    return None
+
+
+def _wav_header(data_size: int) -> bytes:
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16,
+        b"data", data_size,
+    )
+
+
+def _ffmpeg_args(source: str) -> list[str]:
+    return [
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-i", source,
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+
+
+class _ArtifactWriter:
+    """16 kHz mono PCM16 WAV written as samples arrive; the header's sizes are filled in on close."""
+
+    def __init__(self, path: Path):
+        self._file = path.open("wb")
+        self._file.write(_wav_header(0))
+        self.size = 0
+        self.digest = hashlib.sha256()  # of the samples, so re-encodings of the same audio match
+
+    def write(self, pcm) -> None:
+        self._file.write(pcm)
+        self.digest.update(pcm)
+        self.size += len(pcm)
+
+    def close(self) -> int:
+        """Finish the file; returns the number of samples."""
+        if self._file.closed:
+            return self.size // 2
+        if self.size % 2:
+            self.size -= 1
+            self._file.truncate(_WAV_HEADER_BYTES + self.size)
+        self._file.seek(0)
+        self._file.write(_wav_header(self.size))
+        self._file.close()
+        return self.size // 2
+
+
+class UploadDecoder:
+    """
+    Turns one upload into its artifact. Call feed() with each chunk as it is
+    received, then finish(); on any error, abort() removes what was written.
+    """
+
+    def __init__(self, directory: Path, call_id: str, fmt: str):
+        self.fmt = fmt
+        self.path = directory / f"{call_id}.wav"
+        self.mode: Optional[str] = None  # "native", "pipe", "spooled" or "raw" (stored as uploaded)
+        self.samples = 0
+        self._raw_path = directory / f"{call_id}.{fmt}"
+        self._head = bytearray()
+        self._writer: Optional[_ArtifactWriter] = None
+        self._raw = None
+        self._skip = 0                          # native: header bytes still to drop
+        self._remaining: Optional[int] = None   # native: sample bytes still expected, if the header says
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._pump: Optional[asyncio.Task] = None
+        self._stderr: Optional[asyncio.Task] = None
+        self._broken = False
+
+    @property
+    def duration_s(self) -> float:
+        return self.samples / SAMPLE_RATE
+
+    @property
+    def pcm_sha256(self) -> Optional[str]:
+        """Digest of the decoded samples once finished; None if the upload was stored undecoded."""
+        return self._writer.digest.hexdigest() if self._writer is not None else None
+
+    async def feed(self, chunk: bytes) -> None:
+        if self.mode is None:
+            self._head += chunk
+            if len(self._head) >= _SNIFF_BYTES:
+                await self._start()
+            return
+        await self._write(chunk)
+
+    async def finish(self) -> Path:
+        """Complete the artifact and return its path. Raises UnsupportedAudio if ffmpeg rejects the data."""
+        if self.mode is None:
+            await self._start()
+        if self.mode == "native":
+            self.samples = self._writer.close()
+        elif self.mode == "pipe":
+            await self._finish_pipe()
+        else:
+            self._raw.close()
+            if self.fmt == "m4a" and await self._spawn(str(self._raw_path)):
+                self.mode = "spooled"
+                await self._finish_pipe()
+                self._raw_path.unlink()
+        _record(self.mode, self.samples)
+        return self.path if self._writer is not None else self._raw_path
+
+    async def abort(self) -> None:
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+            await self._proc.wait()
+        for task in (self._pump, self._stderr):
+            if task is not None:
+                task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._raw is not None:
+            self._raw.close()
+        for path in (self.path, self._raw_path):
+            path.unlink(missing_ok=True)
+
+    async def _start(self) -> None:
+        head = bytes(self._head)
+        self._head = bytearray()
+        span = wav_pcm16_data(head) if self.fmt == "wav" else None
+        if span is not None:
+            self.mode = "native"
+            self._skip, self._remaining = span
+            self._writer = _ArtifactWriter(self.path)
+        elif self.fmt != "m4a" and await self._spawn("pipe:0"):
+            self.mode = "pipe"
+        else:
+            self.mode = "raw"
+            self._raw = self._raw_path.open("wb")
+        await self._write(head)
+
+    async def _spawn(self, source: str) -> bool:
+        """Start ffmpeg decoding `source` into the artifact; False if ffmpeg isn't installed."""
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                *_ffmpeg_args(source),
+                stdin=asyncio.subprocess.PIPE if source == "pipe:0" else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            return False
+        self._writer = _ArtifactWriter(self.path)
+        self._pump = asyncio.create_task(self._pump_output())
+        self._stderr = asyncio.create_task(self._proc.stderr.read())
+        return True
+
+    async def _pump_output(self) -> None:
+        # Drain ffmpeg's output as it comes, or it blocks once the pipe buffer fills
+        while data := await self._proc.stdout.read(64 * 1024):
+            self._writer.write(data)
+
+    async def _write(self, chunk: bytes) -> None:
+        if self.mode == "native":
+            view = memoryview(chunk)
+            if self._skip:
+                dropped = min(self._skip, len(view))
+                view, self._skip = view[dropped:], self._skip - dropped
+            if self._remaining is not None:
+                # Anything after the data chunk (LIST, id3, ...) is not audio
+                view = view[:self._remaining]
+                self._remaining -= len(view)
+            self._writer.write(view)
+        elif self.mode == "pipe":
+            if self._broken:
+                return
+            try:
+                self._proc.stdin.write(chunk)
+                await self._proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                self._broken = True  # ffmpeg gave up; finish() reports why
+        else:
+            self._raw.write(chunk)
+
+    async def _finish_pipe(self) -> None:
+        if self._proc.stdin is not None:
+            self._proc.stdin.close()
+        await self._proc.wait()
+        await self._pump
+        errors = (await self._stderr).decode(errors="replace").strip()
+        self.samples = self._writer.close()
+        if self._proc.returncode != 0:
+            await self.abort()
+            _record("failed", 0)
+            raise UnsupportedAudio(errors.splitlines()[-1] if errors else f"ffmpeg exited with {self._proc.returncode}")
+
+
+# ----------------------
+# Metrics
+# ----------------------
+
+_lock = threading.Lock()
+_uploads: dict[str, int] = {}
+_audio_samples = 0
+
+
+def _record(mode: str, samples: int) -> None:
+    global _audio_samples
+    with _lock:
+        _uploads[mode] = _uploads.get(mode, 0) + 1
+        _audio_samples += samples
+
+
+def stats() -> dict:
+    """Uploads by how they were handled (see UploadDecoder.mode; "failed" = rejected by ffmpeg) and audio ingested."""
+    with _lock:
+        return {"uploads": dict(_uploads), "audio_seconds": round(_audio_samples / SAMPLE_RATE, 1)}
@@ -0,0 +1,342 @@
+# backend/jobs.py
+"""
+Background analysis jobs.
+
+POST /api/calls/{call_id}/analyse enqueues a job and returns its id; the
+pipeline (transcribing → classifying → reporting) runs as a background task.
+Clients poll GET /api/jobs/{job_id} or stream GET /api/jobs/{job_id}/events (SSE).
+
+Job state lives in a pluggable store, selected with JOB_STORE:
+  memory  (default) — process-local dict, lost on restart
+  sqlite  — JOB_DB_PATH (default backend/var/jobs.sqlite3), survives restarts
+
+With the sqlite store several workers can share one file, so every job records
+the worker running it (owner) and a heartbeat refreshed every JOB_HEARTBEAT_S.
+A queued/running job is only failed as interrupted once its owner is gone: no
+heartbeat for JOB_STALE_S, or (same host) its process has exited. Finished jobs
+are deleted JOB_TTL_S after they finish.
+"""
+
+import asyncio
+import json
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+JOB_STORE = os.getenv("JOB_STORE", "memory").lower()
+JOB_DB_PATH = Path(os.getenv("JOB_DB_PATH", str(BASE_DIR / "var" / "jobs.sqlite3")))
+
+JOB_HEARTBEAT_S = float(os.getenv("JOB_HEARTBEAT_S", "10"))
+JOB_STALE_S = float(os.getenv("JOB_STALE_S", "60"))
+JOB_TTL_S = float(os.getenv("JOB_TTL_S", str(24 * 3600)))
+
+TERMINAL_STATUSES = {"done", "failed"}
+_POLL_INTERVAL = 1.0  # seconds between store re-reads while streaming events
+_PURGE_INTERVAL = 60.0  # seconds between sweeps for expired finished jobs
+
+
+def _now() -> float:
+    return time.time()
+
+
+# ----------------------
+# Stores
+# ----------------------
+
+class MemoryJobStore:
+    """Process-local job store."""
+
+    def __init__(self):
+        self._jobs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def put(self, job: dict) -> None:
+        with self._lock:
+            self._jobs[job["job_id"]] = json.loads(json.dumps(job))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def unfinished(self) -> list[dict]:
+        with self._lock:
+            return [dict(j) for j in self._jobs.values() if j["status"] not in TERMINAL_STATUSES]
+
+    def purge(self, finished_before: float) -> int:
+        """Delete finished jobs last updated before `finished_before`. Returns how many."""
+        with self._lock:
+            expired = [job_id for job_id, j in self._jobs.items()
+                       if j["status"] in TERMINAL_STATUSES and j["updated_at"] < finished_before]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SqliteJobStore:
+    """Job store backed by a local SQLite file, so results survive a worker restart."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY, status TEXT NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+
+    def put(self, job: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, data, updated_at) VALUES (?, ?, ?, ?)",
+                (job["job_id"], job["status"], json.dumps(job), job["updated_at"]),
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def unfinished(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM jobs WHERE status NOT IN ('done', 'failed')"
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def purge(self, finished_before: float) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (finished_before,)
+            )
+        return cur.rowcount
+
+
+def make_store():
+    if JOB_STORE == "sqlite":
+        return SqliteJobStore(JOB_DB_PATH)
+    if JOB_STORE == "memory":
+        return MemoryJobStore()
+    raise RuntimeError(f"Unknown JOB_STORE: {JOB_STORE!r} (expected 'memory' or 'sqlite')")
+
+
+# ----------------------
+# Runner
+# ----------------------
+
+class JobFailed(Exception):
+    """A job finished as failed; carries the HTTP status and detail recorded on it."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class JobContext:
+    """Handed to the pipeline so it can report which stage it is in."""
+
+    def __init__(self, runner: "JobRunner", job_id: str):
+        self._runner = runner
+        self.job_id = job_id
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record start/finish time of a pipeline stage (transcribing, classifying, reporting)."""
+        started = _now()
+        self._runner._update(self.job_id, stage=name, stages={name: {"started_at": started}})
+        try:
+            yield
+        finally:
+            finished = _now()
+            self._runner._update(self.job_id, stages={name: {
+                "started_at": started,
+                "finished_at": finished,
+                "duration_ms": round((finished - started) * 1000, 1),
+            }})
+
+
+class JobRunner:
+    """Creates jobs, runs their pipelines as asyncio tasks and notifies SSE subscribers."""
+
+    def __init__(self, store=None):
+        self.store = store or make_store()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._changed: dict[str, asyncio.Event] = {}
+        self._last_purge = 0.0
+        # Jobs left queued/running by a worker that died; don't leave their clients polling forever.
+        # Jobs of sibling workers sharing the store are still heartbeating and are left alone.
+        for job in self.store.unfinished():
+            self._fail_if_orphaned(job)
+        self._purge_expired()
+
+    def submit(self, call_id: str, pipeline: Callable[[JobContext], Awaitable[dict]]) -> dict:
+        """Create a job and start its pipeline in the background. Must be called from the event loop."""
+        job_id = secrets.token_hex(16)
+        now = _now()
+        job = {
+            "job_id": job_id,
+            "call_id": call_id,
+            "status": "queued",
+            "stage": None,
+            "stages": {},
+            "result": None,
+            "error": None,
+            "error_status": None,
+            "created_at": now,
+            "updated_at": now,
+            "owner": self.owner,
+            "heartbeat_at": now,
+        }
+        self.store.put(job)
+        self._purge_expired()
+        task = asyncio.get_running_loop().create_task(self._run(job_id, pipeline))
+        # Failures are recorded on the job; mark the exception retrieved so asyncio doesn't warn
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._tasks[job_id] = task
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_id)
+        return self._fail_if_orphaned(job) if job is not None else None
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> dict:
+        """
+        Await a job's result. Raises the pipeline's exception if this process is running it,
+        JobFailed if it had already failed, and asyncio.TimeoutError after `timeout` seconds.
+        Cancelling the wait (a client disconnecting) leaves the job running.
+        """
+        task = self._tasks.get(job_id)
+        if task is not None:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        await asyncio.wait_for(self._finished(job_id), timeout)
+        job = self.get(job_id)
+        if job is None:
+            raise JobFailed(404, "Job not found.")
+        if job["status"] == "failed":
+            raise JobFailed(job["error_status"] or 500, job["error"])
+        return job["result"]
+
+    async def _finished(self, job_id: str) -> None:
+        async for _ in self.events(job_id):
+            pass
+
+    async def events(self, job_id: str, heartbeat: float = 15.0):
+        """
+        Yield job snapshots whenever the job changes, until it reaches a terminal state.
+        Yields None after `heartbeat` seconds without a change so streams can send keep-alives.
+        """
+        last_seen = None
+        idle = 0.0
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            if job["updated_at"] != last_seen:
+                last_seen = job["updated_at"]
+                idle = 0.0
+                yield job
+            elif idle >= heartbeat:
+                idle = 0.0
+                yield None
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            event = self._changed.setdefault(job_id, asyncio.Event())
+            started = time.monotonic()
+            try:
+                # Short timeout also picks up jobs owned by another worker process (sqlite store)
+                await asyncio.wait_for(event.wait(), timeout=_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            idle += time.monotonic() - started
+
+    def _fail_if_orphaned(self, job: dict) -> dict:
+        """Mark an unfinished job failed if the worker that owns it is gone; returns the job."""
+        if job["status"] in TERMINAL_STATUSES or job.get("owner") == self.owner:
+            return job
+        if not self._owner_gone(job):
+            return job
+        job.update(status="failed", stage=None, error="Interrupted: the worker running this job stopped",
+                   error_status=503, updated_at=_now())
+        self.store.put(job)
+        return job
+
+    @staticmethod
+    def _owner_gone(job: dict) -> bool:
+        # Jobs from before owners were recorded only have updated_at to go on
+        if _now() - (job.get("heartbeat_at") or job["updated_at"]) > JOB_STALE_S:
+            return True
+        host, _, rest = (job.get("owner") or "").partition(":")
+        pid = rest.partition(":")[0]
+        if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass  # exists, but not ours to signal
+        return False
+
+    def _purge_expired(self) -> None:
+        now = _now()
+        if now - self._last_purge < _PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        self.store.purge(now - JOB_TTL_S)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_S)
+            job = self.store.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                return
+            # Not a change clients care about, so updated_at (and the SSE stream) stays put
+            job["heartbeat_at"] = _now()
+            self.store.put(job)
+
+    async def _run(self, job_id: str, pipeline: Callable[[JobContext], Awaitable[dict]]) -> dict:
+        self._update(job_id, status="running")
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job_id))
+        try:
+            result = await pipeline(JobContext(self, job_id))
+        except asyncio.CancelledError:
+            # Only shutdown cancels a job (waiters are shielded); don't leave it "running" under our owner
+            self._update(job_id, status="failed", stage=None, error="Cancelled: the worker is shutting down",
+                         error_status=503)
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+            self._update(job_id, status="failed", stage=None, error=detail,
+                         error_status=getattr(e, "status_code", 500))
+            raise
+        else:
+            self._update(job_id, status="done", stage=None, result=result)
+            return result
+        finally:
+            heartbeat.cancel()
+            self._tasks.pop(job_id, None)
+
+    def _update(self, job_id: str, stages: Optional[dict] = None, **fields) -> None:
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        if stages:
+            job["stages"].update(stages)
+        job["updated_at"] = job["heartbeat_at"] = _now()
+        self.store.put(job)
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
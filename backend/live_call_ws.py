@@ -2,20 +2,43 @@
 """
 WebSocket endpoint for live call scam detection.
 
-Flow:
+Flow (mode=chunk, the default):
   Android sends binary WAV chunks every ~10 seconds
-  → backend transcribes each chunk with Whisper
+  → backend decodes the PCM in memory and cuts out non-speech (vad.py)
+  → transcribes what's left with Whisper; a chunk with no speech skips Whisper
+    and the classifier and repeats the current assessment
   → accumulates transcript
-  → classifies with Gemini
+  → classifies the new chunk against the call so far with Gemini
   → sends back JSON result after each chunk
+A chunk that matches a known scam recording (fingerprint.py) is High straight
+away, and so is every chunk after it: the rest of the call is neither
+transcribed nor classified.
+
+Flow (mode=stream):
+  client sends small 16 kHz mono PCM16 frames (~500 ms, raw or WAV-wrapped)
+  → StreamSegmenter cuts utterances at pauses (voice activity)
+  → "partial" messages re-transcribe the utterance in progress about once a second,
+    flagged High straight away if the local scorer is already sure
+  → a "final" message per finished utterance, classified like a chunk; the last
+    ~10 s of finished utterances are also matched against known scam recordings,
+    and once they match the rest of the stream is neither transcribed nor classified
+  The client may send the text message "end" to finalise the last utterance.
 """
 
+import asyncio
 import os
 import tempfile
+from typing import Optional
+
+import numpy as np
 from fastapi import WebSocket, WebSocketDisconnect
 
-from TranscriptionEngine import transcribe_file
-from ScamAnalysisEngine import classify_call
+from TranscriptionEngine import transcribe_audio_async, transcribe_file_async, TranscriptionQueueFull
+from audio_decode import decode_wav_pcm16, decode_pcm16
+from ScamAnalysisEngine import LiveClassifierSession
+from streaming_asr import StreamSegmenter, dedupe_overlap
+import fingerprint
+import vad
 from blockchain.scam_registry import get_caller_stats
 
 _RISK_LABEL = {0: "Low", 1: "Medium", 2: "High"}
@@ -27,7 +50,118 @@ _RISK_ADVICE = {
 }
 
 
-async def live_call_ws(websocket: WebSocket, phone_number: str = ""):
+async def _transcribe_via_file(audio_bytes: bytes) -> str:
+    """Fallback for chunks that aren't 16 kHz mono PCM16: write a temp file and let ffmpeg decode it."""
+    tmp_fd, tmp_path = tempfile.mkstemp(suffix=".wav")
+    try:
+        with os.fdopen(tmp_fd, "wb") as f:
+            f.write(audio_bytes)
+        return await transcribe_file_async(tmp_path)
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def _risk_fields(risk_int: int) -> dict:
+    return {
+        "risk_level": _RISK_LABEL[risk_int],
+        "scam_score": _RISK_SCORE[risk_int],
+        "advice":     _RISK_ADVICE[risk_int],
+    }
+
+
+_MATCH_WINDOW = 10 * 16000  # stream mode matches the last 10 s of finished utterances
+
+
+async def _match_known_scam(audio: np.ndarray) -> Optional[dict]:
+    """Strong fingerprint match of `audio` against known scam recordings, or None (at no cost while there are none)."""
+    if len(audio) == 0 or fingerprint.get_index().empty:
+        return None
+    match = await asyncio.to_thread(fingerprint.match_known_scam, audio)
+    return match.to_dict() if match is not None else None
+
+
+def _decode_frame(data: bytes):
+    """Streaming frames are raw PCM16, or WAV-wrapped PCM16; None if neither."""
+    if data[:4] == b"RIFF":
+        return decode_wav_pcm16(data)
+    return decode_pcm16(data[:len(data) - len(data) % 2])
+
+
+async def _stream_loop(websocket: WebSocket, session: LiveClassifierSession) -> None:
+    segmenter = StreamSegmenter()
+    try:
+        await _stream_segments(websocket, session, segmenter)
+    finally:
+        consumed = segmenter.consumed_samples
+        if consumed:
+            vad.record(consumed, consumed - segmenter.skipped_samples)
+
+
+async def _stream_segments(websocket: WebSocket, session: LiveClassifierSession, segmenter: StreamSegmenter) -> None:
+    transcript = ""
+    last_final = ""
+    recent = np.empty(0, dtype=np.float32)  # finished utterances, for fingerprinting
+    matched = None
+
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+
+        if message.get("bytes") is not None:
+            samples = _decode_frame(message["bytes"])
+            if samples is None:
+                await websocket.send_json({"type": "error", "error": "stream mode expects 16 kHz mono PCM16 frames"})
+                continue
+            segments = segmenter.push(samples)
+        elif (message.get("text") or "").strip().lower() == "end":
+            final = segmenter.flush()
+            segments = [final] if final is not None else []
+        else:
+            continue
+
+        for i, seg in enumerate(segments):
+            # A partial already superseded by later audio in the same frame isn't worth decoding
+            if seg.kind == "partial" and i < len(segments) - 1:
+                continue
+            if seg.kind == "final" and matched is None:
+                recent = np.concatenate([recent, seg.audio])[-_MATCH_WINDOW:]
+                matched = await _match_known_scam(recent)
+            if matched is not None:
+                # A known recording: finals repeat the verdict untranscribed, partials aren't sent
+                if seg.kind == "final":
+                    await websocket.send_json({"type": "final", "segment": seg.index, "start": seg.start,
+                                               "end": seg.end, "text": "", "transcript": transcript,
+                                               "fingerprint": matched, **_risk_fields(2)})
+                continue
+            try:
+                text = (await transcribe_audio_async(seg.audio)).strip()
+            except TranscriptionQueueFull as e:
+                if seg.kind == "final":
+                    await websocket.send_json({"type": "error", "error": "busy", "segment": seg.index,
+                                               "queue_depth": e.depth})
+                continue
+
+            reply = {"type": seg.kind, "segment": seg.index, "start": seg.start, "end": seg.end}
+            if seg.kind == "partial":
+                reply["text"] = text
+                if session.peek(text) == "2":
+                    reply.update(_risk_fields(2))
+            else:
+                if seg.overlap:
+                    text = dedupe_overlap(last_final, text)
+                last_final = text or last_final
+                if text:
+                    transcript = (transcript + " " + text).strip()
+                risk_int = int(await session.add_chunk_async(text))
+                reply.update({"text": text, "transcript": transcript, **_risk_fields(risk_int)})
+            await websocket.send_json(reply)
+
+
+async def live_call_ws(websocket: WebSocket, phone_number: str = "", mode: str = "chunk"):
     """
     Accept a WebSocket connection from the Android app.
     Expects binary messages containing raw WAV audio chunks.
@@ -39,56 +173,72 @@ async def live_call_ws(websocket: WebSocket, phone_number: str = ""):
           "scam_score": <float 0–1>,
           "advice": "<string>"
         }
+    With mode=stream, expects small PCM16 frames and replies with "partial" and
+    "final" messages instead (see the module docstring).
     """
     await websocket.accept()
 
     accumulated_transcript = ""
     chunk_index = 0
+    matched = None  # fingerprint match: the call is a known scam recording
+    detector = vad.VoiceActivityDetector()  # one per call, so the noise floor carries across chunks
 
     # Pull blockchain history once at connection start (if phone number supplied)
     if phone_number:
         try:
-            stats = get_caller_stats(phone_number)
+            # Blocking RPC: keep it off the event loop
+            stats = await asyncio.to_thread(get_caller_stats, phone_number)
         except Exception:
             stats = {"total_reports": 0, "high_risk_reports": 0, "medium_risk_reports": 0}
     else:
         stats = {"total_reports": 0, "high_risk_reports": 0, "medium_risk_reports": 0}
 
+    session = LiveClassifierSession(
+        stats["total_reports"],
+        stats["medium_risk_reports"],
+        stats["high_risk_reports"],
+    )
+
     try:
+        if mode == "stream":
+            await _stream_loop(websocket, session)
+            return
+
         while True:
             audio_bytes = await websocket.receive_bytes()
             chunk_index += 1
 
-            # Write chunk to a temp WAV file so Whisper can read it
-            tmp_fd, tmp_path = tempfile.mkstemp(suffix=".wav")
-            try:
-                with os.fdopen(tmp_fd, "wb") as f:
-                    f.write(audio_bytes)
+            audio = decode_wav_pcm16(audio_bytes)
+            if audio is not None and matched is None:
+                matched = await _match_known_scam(audio)
+            if matched is not None:
+                # A known recording: the verdict can't change, so no more Whisper or Gemini for this call
+                await websocket.send_json({"chunk": chunk_index, "transcript": accumulated_transcript,
+                                           "fingerprint": matched, **_risk_fields(2)})
+                continue
 
-                chunk_text = transcribe_file(tmp_path)
-            finally:
-                try:
-                    os.unlink(tmp_path)
-                except OSError:
-                    pass
+            try:
+                if audio is not None:
+                    # 16 kHz mono PCM16 straight from the app: hand samples to Whisper, no disk/ffmpeg
+                    speech = vad.trim_silence(audio, detector)
+                    chunk_text = await transcribe_audio_async(speech) if len(speech) else ""
+                else:
+                    chunk_text = await _transcribe_via_file(audio_bytes)
+            except TranscriptionQueueFull as e:
+                # Server is saturated: drop this chunk and tell the client, keep the socket open
+                await websocket.send_json({"chunk": chunk_index, "error": "busy", "queue_depth": e.depth})
+                continue
 
             if chunk_text:
                 accumulated_transcript = (accumulated_transcript + " " + chunk_text).strip()
 
-            # Classify the accumulated transcript so far
-            risk_int = int(classify_call(
-                accumulated_transcript or "(silence)",
-                stats["total_reports"],
-                stats["medium_risk_reports"],
-                stats["high_risk_reports"],
-            ))
+            # Score the new chunk against the call so far (no model call if nothing was said)
+            risk_int = int(await session.add_chunk_async(chunk_text))
 
             await websocket.send_json({
                 "chunk":       chunk_index,
                 "transcript":  accumulated_transcript,
-                "risk_level":  _RISK_LABEL[risk_int],
-                "scam_score":  _RISK_SCORE[risk_int],
-                "advice":      _RISK_ADVICE[risk_int],
+                **_risk_fields(risk_int),
             })
 
     except WebSocketDisconnect:
@@ -0,0 +1,101 @@
+# backend/local_scorer.py
+"""
+Fast local pre-classifier.
+
+Scores a transcript with weighted scam phrases (compiled into one regex, so a
+transcript is scanned once) plus the caller's on-chain history. Clear-cut scams
+get a confident '2' without a model round trip; everything else returns None and
+goes to Gemini.
+
+There is deliberately no local '0': a phrase list can't tell a benign call from
+a scam that avoids its phrases ("grandma, I'm in jail and need bail", "your
+computer has a virus, install this"), so missing keywords are no evidence of
+safety.
+
+Thresholds (env):
+  PRECLASSIFY                    1 to enable (default), 0 to always ask the model
+  PRECLASSIFY_HIGH_SCORE         phrase score at or above which the call is '2'
+  PRECLASSIFY_HISTORY_MIN_LOGS   reports needed before history alone can decide
+  PRECLASSIFY_HISTORY_HIGH_RATIO high/total report ratio at which history alone is '2'
+"""
+
+import os
+import re
+import threading
+from typing import NamedTuple, Optional
+
+PRECLASSIFY = os.getenv("PRECLASSIFY", "1") == "1"
+HIGH_SCORE = float(os.getenv("PRECLASSIFY_HIGH_SCORE", "4.0"))
+HISTORY_MIN_LOGS = int(os.getenv("PRECLASSIFY_HISTORY_MIN_LOGS", "5"))
+HISTORY_HIGH_RATIO = float(os.getenv("PRECLASSIFY_HISTORY_HIGH_RATIO", "0.5"))
+
+# Strong indicators. These are also the keywords the deterministic fallback counts.
+STRONG_PHRASES = {
+    "gift card": 2.0, "western union": 2.0, "social security": 2.0, "ssn": 2.0,
+    "verification code": 2.0, "one-time code": 2.0, "otp": 2.0, "remote access": 2.0,
+    "anydesk": 2.0, "teamviewer": 2.0, "bitcoin": 2.0, "arrest warrant": 2.0,
+    "account suspended": 2.0, "send money": 1.5, "bank transfer": 1.5, "lottery": 1.5,
+    "congratulations you won": 1.5, "you have won": 1.5, "unauthorized": 1.5,
+    "verify your account": 1.5, "pay now": 1.5, "confirm your": 1.5, "legal action": 1.5,
+    "wire": 1.0, "atm": 1.0, "press 1": 1.0, "press 2": 1.0, "immediately": 1.0,
+    "call back": 1.0, "act now": 1.0, "final notice": 1.0,
+}
+# Weak indicators: common in legitimate calls too. They can't decide a call on their
+# own, but any of them makes a transcript ambiguous enough to ask the model.
+WEAK_PHRASES = {
+    "bank": 0.5, "account": 0.5, "card": 0.5, "payment": 0.5, "fraud": 0.5,
+    "security": 0.5, "verify": 0.5, "password": 0.5, "pin": 0.5, "credit": 0.5,
+    "police": 0.5, "tax": 0.5, "irs": 0.5, "urgent": 0.5, "refund": 0.5, "prize": 0.5,
+}
+_WEIGHTS = {**WEAK_PHRASES, **STRONG_PHRASES}
+
+# One alternation, longest phrases first so "social security" wins over "security"
+_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(p) for p in sorted(_WEIGHTS, key=len, reverse=True)) + r")s?\b"
+)
+
+_stats = {"calls": 0, "short_circuit_high": 0}
+_stats_lock = threading.Lock()
+
+
+class Features(NamedTuple):
+    score: float         # summed weight of distinct matched phrases
+    strong_hits: int     # distinct strong phrases matched
+    weak_hits: int       # distinct weak phrases matched
+
+
+def extract_features(transcript: str) -> Features:
+    matched = set(_PATTERN.findall(transcript.lower()))
+    strong = sum(1 for m in matched if m in STRONG_PHRASES)
+    return Features(
+        score=sum(_WEIGHTS[m] for m in matched),
+        strong_hits=strong,
+        weak_hits=len(matched) - strong,
+    )
+
+
+def preclassify(transcript: str, total_logs: int, medium_flags: int, high_flags: int) -> Optional[str]:
+    """Return '2' when the call is clearly a scam, or None to defer to the model."""
+    if not PRECLASSIFY:
+        return None
+    features = extract_features(transcript)
+    high_ratio = high_flags / max(1, total_logs)
+
+    if features.score >= HIGH_SCORE or (total_logs >= HISTORY_MIN_LOGS and high_ratio >= HISTORY_HIGH_RATIO):
+        label = "2"
+    else:
+        label = None
+
+    with _stats_lock:
+        _stats["calls"] += 1
+        if label == "2":
+            _stats["short_circuit_high"] += 1
+    return label
+
+
+def stats() -> dict:
+    """Counters of how many calls were decided locally."""
+    with _stats_lock:
+        s = dict(_stats)
+    s["short_circuit_fraction"] = round(s["short_circuit_high"] / s["calls"], 4) if s["calls"] else None
+    return s
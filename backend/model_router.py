@@ -0,0 +1,169 @@
+# backend/model_router.py
+"""
+Health-aware routing across the candidate Gemini models.
+
+Instead of walking CANDIDATE_MODELS in order on every call, the router keeps
+per-model health and latency:
+  - the fastest healthy model is tried first (the last one that worked has
+    measured latency, so it naturally leads);
+  - a model that fails repeatedly, or reports 404, trips a circuit breaker and
+    is skipped until its cooldown expires;
+  - a background thread re-probes tripped models once their cooldown is up.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+
+class _ModelHealth:
+    def __init__(self, name: str, index: int):
+        self.name = name
+        self.index = index              # position in the configured list, used as a tie-breaker
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0           # circuit is open (model skipped) until this time
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self.ewma_ms: Optional[float] = None
+        self.latencies_ms: deque = deque(maxlen=200)
+
+    def p95_ms(self) -> Optional[float]:
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class ModelRouter:
+    """
+    failure_threshold   consecutive failures that open a model's circuit
+    cooldown            seconds a circuit stays open after ordinary failures
+    not_found_cooldown  seconds a circuit stays open after a 404 (model not available to this key)
+    """
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, models: list[str], failure_threshold: int = 2,
+                 cooldown: float = 60.0, not_found_cooldown: float = 3600.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.not_found_cooldown = not_found_cooldown
+        self._models = {name: _ModelHealth(name, i) for i, name in enumerate(models)}
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._stop_probing = threading.Event()
+
+    def candidates(self) -> list[str]:
+        """Models to try for the next request, best first."""
+        now = time.time()
+        with self._lock:
+            closed = [h for h in self._models.values() if h.open_until <= now]
+            if not closed:
+                # Everything is tripped: allow one trial request on the model that reopens first
+                return [min(self._models.values(), key=lambda h: h.open_until).name]
+            closed.sort(key=lambda h: (
+                h.consecutive_failures > 0,
+                h.ewma_ms if h.ewma_ms is not None else float("inf"),
+                h.index,
+            ))
+            return [h.name for h in closed]
+
+    def record_success(self, model: str, latency_s: float) -> None:
+        latency_ms = latency_s * 1000
+        with self._lock:
+            h = self._models[model]
+            h.successes += 1
+            h.consecutive_failures = 0
+            h.open_until = 0.0
+            h.last_success_at = time.time()
+            h.latencies_ms.append(latency_ms)
+            h.ewma_ms = latency_ms if h.ewma_ms is None else (
+                self.EWMA_ALPHA * latency_ms + (1 - self.EWMA_ALPHA) * h.ewma_ms
+            )
+
+    def record_failure(self, model: str, error: str, not_found: bool = False) -> None:
+        with self._lock:
+            h = self._models[model]
+            h.failures += 1
+            h.consecutive_failures += 1
+            h.last_error = error
+            if not_found:
+                h.open_until = time.time() + self.not_found_cooldown
+            elif h.consecutive_failures >= self.failure_threshold:
+                h.open_until = time.time() + self.cooldown
+
+    def p95_ms(self, model: str) -> Optional[float]:
+        with self._lock:
+            return self._models[model].p95_ms()
+
+    def reset(self) -> None:
+        """Forget all health state (used by tests and after a key/config change)."""
+        with self._lock:
+            self._models = {name: _ModelHealth(name, h.index) for name, h in self._models.items()}
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                "preferred": self._preferred_locked(now),
+                "models": [{
+                    "name": h.name,
+                    "state": "open" if h.open_until > now else "closed",
+                    "reopens_in_s": round(h.open_until - now, 1) if h.open_until > now else None,
+                    "successes": h.successes,
+                    "failures": h.failures,
+                    "consecutive_failures": h.consecutive_failures,
+                    "last_error": h.last_error,
+                    "last_success_at": h.last_success_at,
+                    "latency_ms": {
+                        "ewma": round(h.ewma_ms, 1) if h.ewma_ms is not None else None,
+                        "p95": round(h.p95_ms(), 1) if h.latencies_ms else None,
+                    },
+                } for h in sorted(self._models.values(), key=lambda h: h.index)],
+            }
+
+    def _preferred_locked(self, now: float) -> Optional[str]:
+        healthy = [h for h in self._models.values() if h.open_until <= now and h.successes]
+        return min(healthy, key=lambda h: h.ewma_ms).name if healthy else None
+
+    # ----------------------
+    # Background re-probing
+    # ----------------------
+
+    def start_probing(self, probe: Callable[[str], None], interval: float = 30.0) -> None:
+        """
+        Periodically call probe(model) for tripped models whose cooldown has expired.
+        probe should raise on failure; success/failure is recorded like a normal request.
+        """
+        if self._probe_thread is not None:
+            return
+        self._stop_probing.clear()
+        self._probe_thread = threading.Thread(
+            target=self._probe_loop, args=(probe, interval), name="model-probe", daemon=True
+        )
+        self._probe_thread.start()
+
+    def stop_probing(self) -> None:
+        self._stop_probing.set()
+        if self._probe_thread is not None:
+            self._probe_thread.join(timeout=5)
+            self._probe_thread = None
+
+    def _due_for_probe(self) -> list[str]:
+        now = time.time()
+        with self._lock:
+            return [h.name for h in self._models.values() if h.consecutive_failures and h.open_until <= now]
+
+    def _probe_loop(self, probe: Callable[[str], None], interval: float) -> None:
+        while not self._stop_probing.wait(interval):
+            for model in self._due_for_probe():
+                started = time.monotonic()
+                try:
+                    probe(model)
+                except Exception as e:
+                    self.record_failure(model, f"probe: {e}", not_found=getattr(e, "code", None) == 404)
+                else:
+                    self.record_success(model, time.monotonic() - started)
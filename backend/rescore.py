@@ -0,0 +1,75 @@
+# backend/rescore.py
+"""
+Bulk re-scoring of stored transcripts.
+
+Streams a JSONL file in and labels out, holding only one window of lines in
+memory at a time. Each input line is an object with "transcript" and optional
+"total_logs", "medium_flags", "high_flags" (any other fields, e.g. an id, are
+passed through); each output line is the same object with "label" added.
+
+Usage:
+  python rescore.py transcripts.jsonl -o labels.jsonl
+  cat transcripts.jsonl | python rescore.py - > labels.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from itertools import islice
+from typing import IO, Iterator
+
+from ScamAnalysisEngine import classify_calls_async, CLASSIFY_BATCH_PACK, CLASSIFY_BATCH_CONCURRENCY
+
+
+def _read_items(stream: IO[str]) -> Iterator[dict]:
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise SystemExit(f"line {line_no}: invalid JSON ({e})")
+        if not isinstance(item, dict) or "transcript" not in item:
+            raise SystemExit(f"line {line_no}: expected an object with a 'transcript' field")
+        yield item
+
+
+async def rescore(src: IO[str], dst: IO[str], window: int, pack_size: int, concurrency: int) -> int:
+    """Label every item from src into dst, `window` items at a time. Returns the item count."""
+    items = _read_items(src)
+    total = 0
+    while True:
+        chunk = list(islice(items, window))
+        if not chunk:
+            return total
+        labels = await classify_calls_async(chunk, pack_size=pack_size, concurrency=concurrency)
+        for item, label in zip(chunk, labels):
+            dst.write(json.dumps({**item, "label": label}) + "\n")
+        dst.flush()
+        total += len(chunk)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of transcripts, or - for stdin")
+    parser.add_argument("-o", "--output", help="output JSONL file (default: stdout)")
+    parser.add_argument("--window", type=int, default=500, help="items held in memory at once")
+    parser.add_argument("--pack", type=int, default=CLASSIFY_BATCH_PACK, help="transcripts per model prompt")
+    parser.add_argument("--concurrency", type=int, default=CLASSIFY_BATCH_CONCURRENCY, help="prompts in flight")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    dst = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        count = asyncio.run(rescore(src, dst, max(1, args.window), args.pack, args.concurrency))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    print(f"labelled {count} transcripts", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
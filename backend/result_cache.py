@@ -0,0 +1,129 @@
+# backend/result_cache.py
+"""
+Small LRU + TTL cache with an optional on-disk SQLite tier.
+
+Used to avoid repeating expensive work (model calls, RPC lookups) for inputs we
+have already seen. Values must be JSON-serialisable if the disk tier is enabled.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+
+class ResultCache:
+    """
+    Thread-safe in-process LRU with per-entry TTL.
+
+    maxsize  entries kept in memory (0 disables the memory tier)
+    ttl      default time-to-live in seconds
+    db_path  optional SQLite file used as a second, persistent tier
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, db_path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            with self._db:
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+            row = self._disk_get(key, now)
+            if row is None:
+                self._misses += 1
+                return default
+            value, expires_at = row
+            self._disk_hits += 1
+            self._memory_set(key, value, expires_at)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._memory_set(key, value, expires_at)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), expires_at),
+                    )
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        """Drop every entry (both tiers) and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._disk_hits = self._misses = self._evictions = 0
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else None,
+            }
+
+    # Callers hold self._lock for the helpers below
+
+    def _memory_set(self, key: str, value: Any, expires_at: float) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple[Any, float]]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            with self._db:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        return json.loads(row[0]), row[1]
@@ -0,0 +1,367 @@
+# backend/script_index.py
+"""
+Index of known scam scripts, searched by text similarity.
+
+Scam calls follow scripts (IRS, bank fraud, tech support, gift cards, ...) that
+callers paraphrase but rarely rewrite. Each known script is embedded as a
+hashed TF-IDF vector of its word unigrams and bigrams, folded into DIM
+dimensions by a sparse random projection (two signed slots per n-gram, from the
+n-gram's CRC32), and normalised, so a dot product is a cosine similarity. A
+transcript's nearest script then:
+
+  similarity >= SCRIPT_DECIDE_SIMILARITY  decides the call outright (the script's label)
+  similarity >= SCRIPT_HINT_SIMILARITY    is named in the classifier's prompt, and
+                                          counts as a strong keyword in the fallback rule
+
+Storage (SCRIPT_INDEX_DIR; "" keeps everything in memory):
+  vectors.f32   float32 rows, memory-mapped and grown by doubling - only the
+                rows a query touches are read from disk
+  df.i32        document frequency per hash bucket, for the IDF weights
+  ivf.npz       coarse centroids of the approximate search
+  scripts.sqlite3  row -> category, label, text
+
+Inserts are incremental: a new script is written to the next row and joins the
+lists of its nearest centroids. Up to SCRIPT_IVF_MIN scripts a query compares
+against all of them; past that, spherical k-means places about 4*sqrt(n)
+centroids, each script is filed under its two nearest, and a query only scans
+the SCRIPT_NPROBE lists nearest to it. The lists are re-trained (in the insert
+that crosses the size) when the index has doubled since the last training.
+
+IDF weights are those at insert time; `python script_index.py rebuild`
+re-embeds everything with the current ones.
+
+An empty index is seeded from SCRIPT_INDEX_SEED (data/scam_scripts.jsonl).
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent
+SCRIPT_INDEX_DIR = os.getenv("SCRIPT_INDEX_DIR", str(BASE_DIR / "var" / "scripts"))
+SCRIPT_INDEX_SEED = os.getenv("SCRIPT_INDEX_SEED", str(BASE_DIR / "data" / "scam_scripts.jsonl"))
+SCRIPT_DECIDE_SIMILARITY = float(os.getenv("SCRIPT_DECIDE_SIMILARITY", "0.6"))
+SCRIPT_HINT_SIMILARITY = float(os.getenv("SCRIPT_HINT_SIMILARITY", "0.3"))
+SCRIPT_IVF_MIN = int(os.getenv("SCRIPT_IVF_MIN", "4096"))
+SCRIPT_NPROBE = int(os.getenv("SCRIPT_NPROBE", "16"))
+
+DIM = 256
+_BUCKETS = 1 << 20  # hash space the document frequencies are kept over
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_KMEANS_SAMPLE = 50_000
+_KMEANS_ITERATIONS = 10
+_LISTS_PER_SQRT = 4
+_SPILL = 2  # lists each script is filed under
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    id       INTEGER PRIMARY KEY,  -- row in vectors.f32
+    category TEXT NOT NULL,
+    label    TEXT NOT NULL,
+    text     TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+"""
+
+
+class ScriptMatch(NamedTuple):
+    id: int
+    category: str
+    label: str
+    similarity: float
+
+    @property
+    def decides(self) -> bool:
+        return self.similarity >= SCRIPT_DECIDE_SIMILARITY
+
+
+def _ngram_hashes(text: str) -> np.ndarray:
+    words = _TOKEN.findall(text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint32, count=len(grams))
+
+
+def _project(hashes: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Fold weighted hash buckets into a unit DIM-vector: two signed slots per bucket."""
+    vec = np.zeros(DIM, dtype=np.float32)
+    for slot_shift, sign_bit in ((0, 30), (DIM.bit_length() - 1, 31)):
+        slots = (hashes >> slot_shift) & (DIM - 1)
+        signs = 1.0 - 2.0 * ((hashes >> sign_bit) & 1)
+        np.add.at(vec, slots, weights * signs)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+class _Rows:
+    """A growable float32/int32 array, memory-mapped from `path` (or in memory if None)."""
+
+    def __init__(self, path: Optional[Path], width: int, dtype, capacity: int = 1024):
+        self.path, self.width, self.dtype = path, width, np.dtype(dtype)
+        if path is None:
+            self.data = np.zeros((capacity, width), self.dtype)
+            return
+        if not path.exists():
+            path.write_bytes(b"")
+            os.truncate(path, capacity * width * self.dtype.itemsize)
+        rows = path.stat().st_size // (width * self.dtype.itemsize)
+        self.data = np.memmap(path, dtype=self.dtype, mode="r+", shape=(rows, width))
+
+    def ensure(self, rows: int) -> None:
+        if rows <= len(self.data):
+            return
+        capacity = max(rows, 2 * len(self.data))
+        if self.path is None:
+            grown = np.zeros((capacity, self.width), self.dtype)
+            grown[:len(self.data)] = self.data
+            self.data = grown
+            return
+        self.data.flush()
+        os.truncate(self.path, capacity * self.width * self.dtype.itemsize)
+        self.data = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(capacity, self.width))
+
+    def flush(self) -> None:
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+
+class ScriptIndex:
+    """Known scam scripts, searchable by cosine similarity. Thread-safe."""
+
+    def __init__(self, directory: Optional[str] = SCRIPT_INDEX_DIR):
+        root = Path(directory) if directory else None
+        if root is not None:
+            root.mkdir(parents=True, exist_ok=True)
+        self._root = root
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(root / "scripts.sqlite3") if root else ":memory:", check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._meta: list[tuple[str, str]] = [
+            (category, label) for category, label in self._db.execute("SELECT category, label FROM scripts ORDER BY id")
+        ]
+        self._vectors = _Rows(root / "vectors.f32" if root else None, DIM, np.float32)
+        self._df = _Rows(root / "df.i32" if root else None, 1, np.int32, capacity=_BUCKETS)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: list[np.ndarray] = []
+        self._trained_at = 0
+        self._stats = {"queries": 0, "decided": 0, "hinted": 0}
+        self._load_ivf()
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    # ----------------------
+    # Embedding
+    # ----------------------
+
+    def embed(self, text: str) -> np.ndarray:
+        hashes = _ngram_hashes(text)
+        if len(hashes) == 0:
+            return np.zeros(DIM, dtype=np.float32)
+        buckets, counts = np.unique(hashes, return_counts=True)
+        df = self._df.data[buckets & (_BUCKETS - 1), 0]
+        idf = np.log((1 + len(self._meta)) / (1 + df)) + 1
+        return _project(buckets, ((1 + np.log(counts)) * idf).astype(np.float32))
+
+    # ----------------------
+    # Inserts
+    # ----------------------
+
+    def add(self, text: str, category: str, label: str = "2") -> int:
+        return self.add_many([(text, category, label)])[0]
+
+    def add_many(self, scripts: list) -> list[int]:
+        """Insert (text, category, label) scripts; returns their ids."""
+        with self._lock:
+            ids = []
+            for text, category, label in scripts:
+                # Count the script's n-grams first, so its own words don't look unseen
+                buckets = np.unique(_ngram_hashes(text)) & (_BUCKETS - 1)
+                np.add.at(self._df.data[:, 0], buckets, 1)
+                row = len(self._meta)
+                self._meta.append((category, label))
+                self._vectors.ensure(row + 1)
+                self._vectors.data[row] = self.embed(text)
+                ids.append(row)
+                if self._centroids is not None:
+                    for nearest in _nearest_lists(self._vectors.data[row:row + 1], self._centroids, _SPILL)[0]:
+                        self._lists[nearest] = np.append(self._lists[nearest], np.int32(row))
+            self._vectors.flush()
+            self._df.flush()
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO scripts (id, category, label, text, added_at) VALUES (?, ?, ?, ?, ?)",
+                    [(row, c, l, t, time.time()) for row, (t, c, l) in zip(ids, scripts)],
+                )
+            if len(self._meta) >= SCRIPT_IVF_MIN and len(self._meta) >= 2 * self._trained_at:
+                self._train()
+        return ids
+
+    def rebuild(self) -> None:
+        """Re-embed every script with the current IDF weights and re-train the lists."""
+        with self._lock:
+            rows = self._db.execute("SELECT id, text FROM scripts ORDER BY id").fetchall()
+            for row, text in rows:
+                self._vectors.data[row] = self.embed(text)
+            self._vectors.flush()
+            self._trained_at = 0
+            if len(self._meta) >= SCRIPT_IVF_MIN:
+                self._train()
+
+    # ----------------------
+    # Search
+    # ----------------------
+
+    def search(self, text: str, k: int = 1, exact: bool = False) -> list[ScriptMatch]:
+        """The k scripts most similar to `text`, best first. exact=True scans every script."""
+        query = self.embed(text)
+        with self._lock:
+            n, vectors, meta = len(self._meta), self._vectors.data, self._meta
+            centroids, lists = self._centroids, self._lists
+        if n == 0 or not query.any():
+            return []
+        if centroids is None or exact:
+            rows = None
+            scores = vectors[:n] @ query
+        else:
+            probe = np.argpartition(-(centroids @ query), min(SCRIPT_NPROBE, len(lists)) - 1)[:SCRIPT_NPROBE]
+            rows = np.unique(np.concatenate([lists[i] for i in probe]))
+            rows = rows[rows < n]  # ignore scripts added since the snapshot
+            scores = vectors[rows] @ query
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        hits = top if rows is None else rows[top]
+        return [ScriptMatch(int(row), *meta[row], float(score)) for row, score in zip(hits, scores[top])]
+
+    def nearest(self, text: str) -> Optional[ScriptMatch]:
+        """The closest script if it is at least SCRIPT_HINT_SIMILARITY similar, else None."""
+        hits = self.search(text)
+        match = hits[0] if hits and hits[0].similarity >= SCRIPT_HINT_SIMILARITY else None
+        with self._lock:
+            self._stats["queries"] += 1
+            if match is not None:
+                self._stats["decided" if match.decides else "hinted"] += 1
+        return match
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"scripts": len(self._meta), "lists": len(self._lists), **self._stats}
+
+    # ----------------------
+    # Approximate search lists
+    # ----------------------
+
+    def _train(self) -> None:
+        """Spherical k-means over (a sample of) the vectors; callers hold self._lock."""
+        n = len(self._meta)
+        vectors = self._vectors.data[:n]
+        nlist = max(_SPILL, int(_LISTS_PER_SQRT * math.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = vectors[np.sort(rng.choice(n, min(n, _KMEANS_SAMPLE), replace=False))]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assign = _nearest_lists(sample, centroids, 1)[:, 0]
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self._centroids = centroids.astype(np.float32)
+        assign = _nearest_lists(vectors, self._centroids, _SPILL)
+        self._lists = _group(assign, nlist)
+        self._trained_at = n
+        if self._root is not None:
+            np.savez(self._root / "ivf.npz", centroids=self._centroids, assign=assign, n=n)
+
+    def _load_ivf(self) -> None:
+        path = self._root / "ivf.npz" if self._root else None
+        if path is None or not path.exists():
+            return
+        saved = np.load(path)
+        centroids, assign, trained = saved["centroids"], saved["assign"], int(saved["n"])
+        # Scripts added after the last training join their nearest lists
+        if trained < len(self._meta):
+            extra = self._vectors.data[trained:len(self._meta)]
+            assign = np.concatenate([assign, _nearest_lists(extra, centroids, _SPILL)])
+        self._centroids, self._trained_at = centroids, trained
+        self._lists = _group(assign, len(centroids))
+
+
+def _nearest_lists(vectors: np.ndarray, centroids: np.ndarray, k: int) -> np.ndarray:
+    """(n, k) int32: the k centroids nearest each vector, in blocks to bound memory."""
+    out = np.empty((len(vectors), k), dtype=np.int32)
+    for i in range(0, len(vectors), 4096):
+        scores = vectors[i:i + 4096] @ centroids.T
+        out[i:i + 4096] = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return out
+
+
+def _group(assign: np.ndarray, nlist: int) -> list[np.ndarray]:
+    """Row ids of each list, from the (n, k) list assignments of rows 0..n-1."""
+    rows = np.repeat(np.arange(len(assign), dtype=np.int32), assign.shape[1])
+    lists = assign.ravel()
+    order = np.argsort(lists, kind="stable")
+    bounds = np.searchsorted(lists[order], np.arange(nlist + 1))
+    return [rows[order[bounds[i]:bounds[i + 1]]] for i in range(nlist)]
+
+
+def load_jsonl(path: str) -> list[tuple[str, str, str]]:
+    """(text, category, label) from a JSONL file of {"text", "category", "label"} objects."""
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(r["text"], r.get("category", "scam"), str(r.get("label", "2"))) for r in rows]
+
+
+_index: Optional[ScriptIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ScriptIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ScriptIndex()
+            if len(_index) == 0 and SCRIPT_INDEX_SEED and Path(SCRIPT_INDEX_SEED).exists():
+                _index.add_many(load_jsonl(SCRIPT_INDEX_SEED))
+        return _index
+
+
+def nearest(transcript: str) -> Optional[ScriptMatch]:
+    return get_index().nearest(transcript)
+
+
+def stats() -> dict:
+    return get_index().stats()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the index of known scam scripts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load", help="add the scripts in a JSONL file ({text, category, label})")
+    load.add_argument("file")
+    query = sub.add_parser("search", help="most similar scripts to a transcript")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=3)
+    sub.add_parser("rebuild", help="re-embed with the current IDF weights")
+    args = parser.parse_args()
+
+    index = get_index()
+    if args.command == "load":
+        print(f"added {len(index.add_many(load_jsonl(args.file)))}, {len(index)} scripts")
+    elif args.command == "search":
+        for hit in index.search(args.text, args.k):
+            print(f"{hit.similarity:.3f}  #{hit.id} {hit.category} (label {hit.label})")
+    else:
+        index.rebuild()
@@ -0,0 +1,193 @@
+# backend/streaming_asr.py
+"""
+Segmentation for streaming transcription on the live socket.
+
+The client sends small PCM frames (~500 ms) instead of 10-second chunks.
+StreamSegmenter keeps a rolling buffer of the current utterance and decides,
+frame by frame, what to transcribe:
+
+  partial  the utterance so far, re-decoded every `partial_every_s` of new
+           audio so the client sees words (and early warnings) while the
+           caller is still talking;
+  final    the finished utterance, cut where voice activity stops for
+           `silence_ms`, or forcibly at `max_segment_s` with `overlap_s` of
+           audio carried into the next segment so no word is lost at the cut.
+
+Speech is detected frame by frame with vad.VoiceActivityDetector. Timestamps
+are seconds from the start of the stream. The segmenter only does the
+bookkeeping; the socket layer runs Whisper on what it returns.
+"""
+
+import os
+import re
+from collections import deque
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from vad import VAD_ENERGY_THRESHOLD, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+
+STREAM_FRAME_MS = int(os.getenv("STREAM_FRAME_MS", "30"))              # VAD resolution
+STREAM_SILENCE_MS = int(os.getenv("STREAM_SILENCE_MS", "600"))          # pause that ends an utterance
+STREAM_PARTIAL_EVERY_S = float(os.getenv("STREAM_PARTIAL_EVERY_S", "1.0"))
+STREAM_MAX_SEGMENT_S = float(os.getenv("STREAM_MAX_SEGMENT_S", "12"))
+STREAM_OVERLAP_S = float(os.getenv("STREAM_OVERLAP_S", "0.5"))
+STREAM_PRE_ROLL_MS = int(os.getenv("STREAM_PRE_ROLL_MS", "200"))         # audio kept from before speech onset
+
+
+class Segment(NamedTuple):
+    kind: str            # "partial" or "final"
+    index: int           # utterance number, shared by its partials and final
+    audio: np.ndarray    # float32 samples to transcribe
+    start: float         # seconds from stream start
+    end: float
+    overlap: float       # seconds at the start repeated from the previous segment
+
+
+class StreamSegmenter:
+    def __init__(self, sample_rate: int = SAMPLE_RATE, frame_ms: int = STREAM_FRAME_MS,
+                 silence_ms: int = STREAM_SILENCE_MS, partial_every_s: float = STREAM_PARTIAL_EVERY_S,
+                 max_segment_s: float = STREAM_MAX_SEGMENT_S, overlap_s: float = STREAM_OVERLAP_S,
+                 pre_roll_ms: int = STREAM_PRE_ROLL_MS, vad_threshold: float = VAD_ENERGY_THRESHOLD):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.partial_every = int(sample_rate * partial_every_s)
+        self.max_segment = int(sample_rate * max_segment_s)
+        self.overlap = int(sample_rate * overlap_s)
+        self._vad = VoiceActivityDetector(sample_rate, frame_ms, threshold=vad_threshold)
+
+        self._carry = np.zeros(0, dtype=np.float32)      # samples not yet forming a whole frame
+        self._pre_roll: deque = deque(maxlen=pre_roll_ms // frame_ms)
+        self._position = 0                               # samples consumed so far
+        self._skipped = 0                                # of which never sent for transcription
+
+        self._segment: list[np.ndarray] = []             # frames of the current utterance
+        self._segment_len = 0
+        self._segment_start = 0
+        self._segment_overlap = 0
+        self._silence_run = 0
+        self._since_partial = 0
+        self._index = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return bool(self._segment)
+
+    @property
+    def consumed_samples(self) -> int:
+        return self._position
+
+    @property
+    def skipped_samples(self) -> int:
+        """Audio dropped as non-speech: outside every utterance, or trailing silence cut from one."""
+        return self._skipped
+
+    def push(self, samples: np.ndarray) -> list[Segment]:
+        """Add audio and return whatever should be transcribed now (oldest first)."""
+        audio = np.concatenate([self._carry, samples.astype(np.float32, copy=False)])
+        whole = len(audio) - len(audio) % self.frame
+        self._carry = audio[whole:]
+        out: list[Segment] = []
+        for offset in range(0, whole, self.frame):
+            segment = self._push_frame(audio[offset:offset + self.frame])
+            if segment is not None:
+                out.append(segment)
+        return out
+
+    def flush(self) -> Optional[Segment]:
+        """End of stream: finalise the utterance in progress, if any."""
+        if not self._segment:
+            return None
+        if len(self._carry):
+            self._segment.append(self._carry)
+            self._carry = self._carry[:0]
+        return self._finish(trailing_silence=self._silence_run * self.frame)
+
+    def _push_frame(self, frame: np.ndarray) -> Optional[Segment]:
+        start = self._position
+        self._position += len(frame)
+        speech = self._vad.is_speech(frame)
+
+        if not self._segment:
+            if not speech:
+                if len(self._pre_roll) == self._pre_roll.maxlen:
+                    self._skipped += len(self._pre_roll[0]) if self._pre_roll else len(frame)
+                self._pre_roll.append(frame)
+                return None
+            pre = list(self._pre_roll)
+            self._pre_roll.clear()
+            self._segment = pre + [frame]
+            self._segment_len = sum(len(f) for f in self._segment)
+            self._segment_start = start - (self._segment_len - len(frame))
+            self._segment_overlap = 0
+            self._silence_run = 0
+            self._since_partial = len(frame)
+            return None
+
+        self._segment.append(frame)
+        self._segment_len += len(frame)
+        self._since_partial += len(frame)
+        self._silence_run = 0 if speech else self._silence_run + 1
+
+        if self._silence_run >= self.silence_frames:
+            return self._finish(trailing_silence=self._silence_run * self.frame)
+        if self._segment_len >= self.max_segment:
+            return self._cut_with_overlap()
+        if self._since_partial >= self.partial_every:
+            self._since_partial = 0
+            return self._make("partial", np.concatenate(self._segment), self._segment_start)
+        return None
+
+    def _make(self, kind: str, audio: np.ndarray, start: int) -> Segment:
+        return Segment(
+            kind=kind, index=self._index, audio=audio,
+            start=round(start / self.sample_rate, 3),
+            end=round((start + len(audio)) / self.sample_rate, 3),
+            overlap=round(self._segment_overlap / self.sample_rate, 3),
+        )
+
+    def _finish(self, trailing_silence: int) -> Segment:
+        audio = np.concatenate(self._segment)
+        if trailing_silence:
+            kept = max(self.frame, len(audio) - trailing_silence)
+            self._skipped += len(audio) - kept
+            audio = audio[:kept]
+        segment = self._make("final", audio, self._segment_start)
+        self._segment, self._segment_len, self._silence_run = [], 0, 0
+        self._index += 1
+        return segment
+
+    def _cut_with_overlap(self) -> Segment:
+        audio = np.concatenate(self._segment)
+        segment = self._make("final", audio, self._segment_start)
+        self._index += 1
+        # Still mid-utterance: start the next segment with the tail of this one
+        tail = audio[len(audio) - self.overlap:] if self.overlap else audio[:0]
+        self._segment = [tail] if len(tail) else []
+        self._segment_len = len(tail)
+        self._segment_start = self._segment_start + len(audio) - len(tail)
+        self._segment_overlap = len(tail)
+        self._since_partial = 0
+        if not self._segment:
+            self._silence_run = 0
+        return segment
+
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def dedupe_overlap(previous: str, text: str, max_words: int = 8) -> str:
+    """
+    Drop the start of `text` that repeats the end of `previous` (words transcribed
+    twice because the audio overlapped). Comparison ignores case and punctuation.
+    """
+    prev_words = _WORD.findall(previous.lower())[-max_words:]
+    words = text.split()
+    norm = [" ".join(_WORD.findall(w.lower())) for w in words]
+    for n in range(min(len(prev_words), len(words)), 0, -1):
+        if prev_words[-n:] == [w for w in norm[:n]]:
+            return " ".join(words[n:])
+    return text
@@ -3,6 +3,7 @@ Shared pytest configuration and fixtures.
 """
 import os
 import struct
+import tempfile
 
 import pytest
 
@@ -13,6 +14,18 @@ os.environ.setdefault("PRIVATE_KEY", "0x" + "a" * 64)
 os.environ.setdefault("CONTRACT_ADDRESS", "0x" + "b" * 40)
 os.environ.setdefault("CHAIN_ID", "11155111")
 os.environ.setdefault("REPORTER_ADDRESS", "0x" + "c" * 40)
+# Keep queued on-chain reports out of backend/var during tests
+os.environ.setdefault("REPORT_QUEUE_DB", ":memory:")
+os.environ.setdefault("REPORT_BATCH_WINDOW_S", "0")
+# Uploads made by the tests go to a throwaway artifact store
+_artifacts = tempfile.mkdtemp(prefix="scamscan-artifacts-")
+os.environ.setdefault("ARTIFACT_DIR", os.path.join(_artifacts, "files"))
+os.environ.setdefault("ARTIFACT_DB", os.path.join(_artifacts, "index.sqlite3"))
+os.environ.setdefault("CONTENT_INDEX_DB", "")
+os.environ.setdefault("FINGERPRINT_DB", "")
+# An empty in-memory script index: tests that need scripts add their own
+os.environ.setdefault("SCRIPT_INDEX_DIR", "")
+os.environ.setdefault("SCRIPT_INDEX_SEED", "")
 
 
 @pytest.fixture
@@ -0,0 +1,154 @@
+"""
+Tests for artifact_store.py — the index, sharding, eviction and the object-store backend.
+"""
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from artifact_store import ArtifactStore, S3Blobs
+
+
+def _put(store, call_id, size=1000, fmt="wav"):
+    path = store.shard_dir(call_id) / f"{call_id}.{fmt}"
+    path.write_bytes(b"\x01" * size)
+    return store.put(call_id, path, duration_s=size / 32000)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(tmp_path / "files", tmp_path / "index.sqlite3", ttl_s=3600, max_bytes=10_000)
+
+
+@pytest.fixture
+def s3():
+    """A tiny in-memory S3: objects by path, and the headers of every request."""
+    objects, requests = {}, []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body=b""):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_PUT(self):
+            requests.append(("PUT", self.path, dict(self.headers)))
+            objects[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+            self._reply(200)
+
+        def do_GET(self):
+            requests.append(("GET", self.path, dict(self.headers)))
+            if self.path in objects:
+                self._reply(200, objects[self.path])
+            else:
+                self._reply(404)
+
+        def do_DELETE(self):
+            requests.append(("DELETE", self.path, dict(self.headers)))
+            objects.pop(self.path, None)
+            self._reply(204)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    blobs = S3Blobs(f"http://127.0.0.1:{server.server_port}", "calls", "access", "secret")
+    yield blobs, objects, requests
+    server.shutdown()
+
+
+def test_files_are_sharded_and_indexed(store, tmp_path):
+    entry = _put(store, "abc123")
+    path = store.local_path("abc123")
+    assert path.relative_to(tmp_path / "files").parts[:2] == tuple(entry["key"].split("/")[:2])
+    assert len(path.relative_to(tmp_path / "files").parts) == 3
+    assert store.get("abc123") == {**entry, "accessed_at": pytest.approx(entry["accessed_at"], abs=5)}
+    assert entry["format"] == "wav" and entry["size"] == 1000 and entry["duration_s"] == pytest.approx(1000 / 32000)
+    assert store.get("missing") is None
+    with pytest.raises(FileNotFoundError):
+        store.local_path("missing")
+
+
+def test_put_outside_the_shard_directory_is_rejected(store, tmp_path):
+    stray = tmp_path / "x.wav"
+    stray.write_bytes(b"x")
+    with pytest.raises(ValueError):
+        store.put("x", stray, 0.0)
+
+
+def test_index_survives_restart(tmp_path):
+    first = ArtifactStore(tmp_path / "files", tmp_path / "index.sqlite3")
+    _put(first, "call1")
+    second = ArtifactStore(tmp_path / "files", tmp_path / "index.sqlite3")
+    assert second.local_path("call1").exists()
+
+
+def test_sweep_expires_old_artifacts(store):
+    _put(store, "old")
+    created = store.get("old")["created_at"]
+    _put(store, "new")
+    assert store.sweep(now=created + 1800)["expired"] == 0
+    store._conn.execute("UPDATE artifacts SET created_at = ? WHERE call_id = 'new'", (created + 1800,))
+    assert store.sweep(now=created + 3601) == {"expired": 1, "over_size": 0, "uncached": 0}
+    assert store.get("old") is None and store.get("new") is not None
+    assert not any(p.name.startswith("old") for p in store.root.rglob("*"))
+
+
+def test_sweep_evicts_least_recently_used_over_the_cap(store):
+    for i in range(4):
+        _put(store, f"c{i}", size=4000)
+    store.get("c0")  # used recently, so c1 is now the oldest
+    assert store.sweep() == {"expired": 0, "over_size": 2, "uncached": 0}
+    assert {c for c in ("c0", "c1", "c2", "c3") if store.get(c)} == {"c0", "c3"}
+    assert store.stats()["local_bytes"] == 8000
+
+
+def test_delete(store):
+    _put(store, "gone")
+    path = store.local_path("gone")
+    assert store.delete("gone") is True
+    assert not path.exists() and store.get("gone") is None
+    assert store.delete("gone") is False
+
+
+def test_object_store_copy_is_signed_and_refetched_after_eviction(tmp_path, s3):
+    blobs, objects, requests = s3
+    store = ArtifactStore(tmp_path / "files", tmp_path / "index.sqlite3", remote=blobs, max_bytes=1500)
+    entry = _put(store, "r1", size=1000)
+    _put(store, "r2", size=1000)
+
+    method, path, headers = requests[0]
+    assert (method, path) == ("PUT", f"/calls/{entry['key']}")
+    assert headers["authorization"].startswith("AWS4-HMAC-SHA256 Credential=access/")
+    assert "SignedHeaders=host;x-amz-content-sha256;x-amz-date" in headers["authorization"]
+
+    # Over the cap, the older local copy goes but the object stays
+    assert store.sweep() == {"expired": 0, "over_size": 0, "uncached": 1}
+    assert not (store.root / entry["key"]).exists()
+    assert store.get("r1")["local"] is False and f"/calls/{entry['key']}" in objects
+
+    assert store.local_path("r1").read_bytes() == b"\x01" * 1000
+    assert store.get("r1")["local"] is True
+
+    store.delete("r1")
+    assert f"/calls/{entry['key']}" not in objects
+
+
+def test_sweeper_thread_runs_and_stops(store):
+    _put(store, "a", size=20_000)
+    store.start_sweeper(interval=0.01)
+    try:
+        for _ in range(200):
+            if store.get("a") is None:
+                break
+            threading.Event().wait(0.01)
+    finally:
+        store.stop_sweeper()
+    assert store.get("a") is None
+    assert store.stats()["evicted"]["over_size"] == 1
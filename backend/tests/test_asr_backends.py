@@ -0,0 +1,88 @@
+"""
+Tests for asr_backends.py — the inference backends behind TranscriptionEngine.
+"""
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+import torch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asr_backends
+from asr_backends import FasterWhisperBackend, QuantizedWhisperBackend, WhisperBackend, load_backend
+
+
+def _tiny_whisper():
+    # Random weights with the real architecture (no download)
+    from whisper.model import ModelDimensions, Whisper
+    torch.manual_seed(0)
+    dims = ModelDimensions(n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=2,
+                           n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=2)
+    return Whisper(dims).eval()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(RuntimeError, match="Unknown TRANSCRIBE_BACKEND"):
+        load_backend("wav2vec", "base")
+
+
+def test_load_backend_passes_model_size():
+    with patch("whisper.load_model", return_value=MagicMock()) as load:
+        backend = load_backend("whisper", "tiny")
+    assert isinstance(backend, WhisperBackend)
+    load.assert_called_once_with("tiny")
+
+
+def test_whisper_backend_strips_text_and_replicas_are_copies():
+    model = MagicMock()
+    model.transcribe.return_value = {"text": "  hello there "}
+    backend = WhisperBackend(model)
+    assert backend.transcribe(np.zeros(16000, dtype=np.float32)) == "hello there"
+
+    backend = WhisperBackend(_tiny_whisper())
+    replica = backend.replica()
+    assert replica.model is not backend.model
+    assert type(replica) is WhisperBackend
+
+
+def test_quantize_swaps_linear_layers_for_int8():
+    model = _tiny_whisper()
+    mel = torch.randn(1, 80, 3000)
+    with torch.no_grad():
+        expected = model.encoder(mel)
+
+    asr_backends.quantize(model)
+
+    kinds = {type(m) for m in model.modules()}
+    assert torch.ao.nn.quantized.dynamic.Linear in kinds
+    assert not any(isinstance(m, torch.nn.Linear) and not hasattr(m, "_packed_params") for m in model.modules())
+    with torch.no_grad():
+        got = model.encoder(mel)
+    similarity = torch.nn.functional.cosine_similarity(expected.flatten(), got.flatten(), dim=0)
+    assert similarity > 0.99
+
+
+def test_quantized_backend_replica_keeps_its_class():
+    backend = QuantizedWhisperBackend(asr_backends.quantize(_tiny_whisper()))
+    replica = backend.replica()
+    assert type(replica) is QuantizedWhisperBackend
+    assert replica.model is not backend.model
+
+
+def test_faster_whisper_joins_segments_and_shares_one_model():
+    model = MagicMock()
+    model.transcribe.return_value = (iter([MagicMock(text=" Your account "), MagicMock(text=" is locked. ")]), None)
+    backend = FasterWhisperBackend(model)
+
+    assert backend.transcribe(np.zeros(16000, dtype=np.float32)) == "Your account is locked."
+    assert backend.replica() is backend
+    assert not backend.supports_batch
+
+
+def test_faster_whisper_missing_package_has_clear_error():
+    with patch.dict(sys.modules, {"faster_whisper": None}):
+        with pytest.raises(RuntimeError, match="pip install faster-whisper"):
+            load_backend("faster-whisper", "base")
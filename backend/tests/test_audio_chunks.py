@@ -0,0 +1,56 @@
+"""
+Tests for audio_chunks.py — splitting long audio at pauses and stitching transcripts.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from audio_chunks import split_at_silence, stitch_transcripts
+
+SR = 16000
+
+
+def _speech(seconds):
+    t = np.arange(int(SR * seconds)) / SR
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds):
+    return np.zeros(int(SR * seconds), dtype=np.float32)
+
+
+def test_short_audio_is_one_piece():
+    audio = _speech(20.0)
+    assert split_at_silence(audio, chunk_s=28) == [(0, len(audio))]
+
+
+def test_cuts_fall_in_pauses_with_overlap():
+    # 7 s of speech then a 1 s pause, repeated: 80 s
+    audio = np.concatenate([np.concatenate([_speech(7.0), _silence(1.0)]) for _ in range(10)])
+    spans = split_at_silence(audio, chunk_s=28, search_s=8, overlap_s=0.5)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(audio)
+    for (s1, e1), (s2, e2) in zip(spans, spans[1:]):
+        assert e1 - s2 == int(SR * 0.5) // 2 * 2            # neighbours share the overlap
+        cut = (e1 + s2) // 2
+        assert (cut / SR) % 8.0 >= 7.0                       # inside a pause
+    assert all(e - s <= SR * 28.5 for s, e in spans)
+
+
+def test_continuous_audio_still_splits_to_window_size():
+    spans = split_at_silence(_speech(95.0), chunk_s=28, search_s=8, overlap_s=1.0)
+    assert len(spans) == 4
+    assert all(e - s <= SR * 29 for s, e in spans)
+
+
+def test_stitch_removes_words_repeated_in_overlap():
+    texts = [
+        "This is the bank calling about",
+        "calling about your card. Please",
+        "Please confirm the code.",
+        "",
+    ]
+    assert stitch_transcripts(texts) == "This is the bank calling about your card. Please confirm the code."
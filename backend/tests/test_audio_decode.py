@@ -0,0 +1,65 @@
+"""
+Tests for audio_decode.py — in-memory WAV parsing for live-call chunks.
+"""
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from audio_decode import decode_wav_pcm16, decode_pcm16
+from tests.conftest import _make_wav
+
+
+def _wav_with_samples(samples, sample_rate=16000, channels=1, extra_chunk=b""):
+    pcm = np.asarray(samples, dtype="<i2").tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH",
+        b"RIFF", 36 + len(extra_chunk) + len(pcm), b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * channels * 2, channels * 2, 16,
+    )
+    return header + extra_chunk + struct.pack("<4sI", b"data", len(pcm)) + pcm
+
+
+def test_decodes_pcm16_to_float32():
+    audio = decode_wav_pcm16(_wav_with_samples([0, 16384, -32768, 32767]))
+    assert audio.dtype == np.float32
+    np.testing.assert_allclose(audio, [0.0, 0.5, -1.0, 32767 / 32768])
+
+
+def test_decodes_headerless_pcm16():
+    audio = decode_pcm16(np.asarray([0, 16384, -32768], dtype="<i2").tobytes())
+    np.testing.assert_allclose(audio, [0.0, 0.5, -1.0])
+
+
+def test_empty_data_chunk():
+    audio = decode_wav_pcm16(_make_wav())
+    assert audio is not None
+    assert len(audio) == 0
+
+
+def test_skips_unknown_chunks():
+    extra = struct.pack("<4sI", b"LIST", 3) + b"abc\x00"  # odd size → padded
+    audio = decode_wav_pcm16(_wav_with_samples([100, 200], extra_chunk=extra))
+    assert len(audio) == 2
+
+
+def test_streaming_size_placeholder_uses_available_bytes():
+    wav = bytearray(_wav_with_samples([1, 2, 3]))
+    struct.pack_into("<I", wav, 40, 0xFFFFFFFF)
+    assert len(decode_wav_pcm16(bytes(wav))) == 3
+
+
+def test_rejects_other_sample_rates():
+    assert decode_wav_pcm16(_make_wav(num_samples=10, sample_rate=44100)) is None
+
+
+def test_rejects_stereo():
+    assert decode_wav_pcm16(_wav_with_samples([0, 0], channels=2)) is None
+
+
+def test_rejects_non_wav():
+    assert decode_wav_pcm16(b"ID3\x03\x00" + b"\x00" * 64) is None
+    assert decode_wav_pcm16(b"") is None
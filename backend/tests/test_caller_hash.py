@@ -0,0 +1,44 @@
+"""
+Tests for blockchain/caller_hash.py — Web3-free phone normalisation and hashing.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from blockchain.caller_hash import normalize_phone, hash_phone, hash_phones, cache_stats
+
+BACKEND = Path(__file__).parent.parent
+
+
+def test_hash_matches_solidity_keccak256():
+    # keccak256(bytes("+15551234567")), as the contract and web3 compute it
+    assert hash_phone("+15551234567").hex() == "937e40c32a8bf65257a0436af53e81b4e5c3b6c684e18bd49ae468327c5c6857"
+
+
+def test_equivalent_formats_share_a_hash():
+    assert hash_phone("(555) 123-4567") == hash_phone("+15551234567") == hash_phone("15551234567")
+    assert normalize_phone("555.123.4567") == "+15551234567"
+
+
+def test_repeat_lookups_are_cached():
+    hash_phone("+15557654321")
+    before = cache_stats()["hits"]
+    hash_phone("+15557654321")
+    assert cache_stats()["hits"] == before + 1
+
+
+def test_hash_phones_keeps_order_and_duplicates():
+    numbers = ["+15551234567", "+15559999999", "555-123-4567", "+15551234567"]
+    hashes = hash_phones(numbers)
+    assert hashes == [hash_phone(n) for n in numbers]
+    assert hashes[0] == hashes[2] == hashes[3] != hashes[1]
+
+
+def test_importing_does_not_load_web3():
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, blockchain.caller_hash; print('web3' in sys.modules)"],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,36 @@
+"""
+Tests for content_index.py — transcripts remembered by content digest.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import content_index
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    content_index.clear()
+    yield
+    content_index.clear()
+
+
+def test_lookup_by_either_digest():
+    content_index.remember({"sha256": "b1", "pcm_sha256": "p1"}, "hello")
+    assert content_index.lookup({"sha256": "b1", "pcm_sha256": "other"}) == "hello"  # same bytes
+    assert content_index.lookup({"sha256": "other", "pcm_sha256": "p1"}) == "hello"  # same samples
+    assert content_index.lookup({"sha256": "other", "pcm_sha256": None}) is None
+
+
+def test_artifact_without_digests_is_never_matched():
+    content_index.remember({"sha256": None, "pcm_sha256": None}, "hello")
+    assert content_index.lookup({"sha256": None, "pcm_sha256": None}) is None
+
+
+def test_avoided_work_is_counted():
+    content_index.record_reuse({"duration_s": 12.25}, classified=True)
+    content_index.record_reuse({"duration_s": 3.0}, classified=False)
+    assert content_index.stats()["avoided"] == {"transcriptions": 2, "audio_seconds": 15.2, "classifications": 1}
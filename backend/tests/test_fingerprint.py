@@ -0,0 +1,121 @@
+"""
+Tests for fingerprint.py — landmark hashes and the index of known scam recordings.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import fingerprint as fingerprint_module
+from fingerprint import FingerprintIndex, best_match, fingerprint, windows
+
+RATE = 16000
+
+
+def speech_like(seconds: float, seed: int) -> np.ndarray:
+    """Syllables of voiced sound: harmonics of a wandering pitch under moving formants, with pauses."""
+    rng = np.random.default_rng(seed)
+    out = []
+    while sum(map(len, out)) < seconds * RATE:
+        n = int(rng.uniform(0.12, 0.3) * RATE)
+        t = np.arange(n) / RATE
+        f0 = rng.uniform(100, 220) * (1 + 0.1 * t)
+        formants = rng.uniform([300, 900, 2000], [800, 1800, 3000])
+        syllable = np.zeros(n)
+        for h in range(1, 30):
+            freq = f0 * h
+            gain = sum(np.exp(-((freq - f) / 150) ** 2) for f in formants)
+            syllable += gain * np.sin(2 * np.pi * np.cumsum(freq) / RATE)
+        out.append(syllable * np.hanning(n))
+        out.append(np.zeros(int(rng.uniform(0.03, 0.15) * RATE)))
+    audio = np.concatenate(out)[:int(seconds * RATE)]
+    return (0.3 * audio / np.abs(audio).max()).astype(np.float32)
+
+
+def mu_law(audio: np.ndarray) -> np.ndarray:
+    """Round trip through 8-bit mu-law, the telephone codec."""
+    y = np.round(np.sign(audio) * np.log1p(255 * np.abs(audio)) / np.log1p(255) * 127) / 127
+    return (np.sign(y) * ((256 ** np.abs(y)) - 1) / 255).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def robocall():
+    return speech_like(8, seed=1)
+
+
+@pytest.fixture
+def index(robocall):
+    idx = FingerprintIndex(None)
+    idx.add("gift-card robocall", robocall)
+    for seed in range(2, 6):
+        idx.add(f"other {seed}", speech_like(8, seed))
+    return idx
+
+
+def test_hashes_ignore_volume(robocall):
+    hashes, times = fingerprint(robocall)
+    quiet, quiet_times = fingerprint(robocall * 0.05)
+    assert len(hashes) > 100
+    np.testing.assert_array_equal(hashes, quiet)
+    np.testing.assert_array_equal(times, quiet_times)
+
+
+@pytest.mark.parametrize("variant", ["louder", "mu-law", "noise", "excerpt"])
+def test_re_encoded_copies_match(index, robocall, variant):
+    rng = np.random.default_rng(0)
+    audio = {
+        "louder": np.clip(robocall * 3, -1, 1),
+        "mu-law": mu_law(robocall),
+        "noise": robocall + (rng.standard_normal(len(robocall)) * 0.01).astype(np.float32),
+        "excerpt": robocall[3 * RATE:7 * RATE],
+    }[variant]
+    match = index.match(audio)
+    assert match.name == "gift-card robocall"
+    assert match.is_strong()
+    assert match.offset_s == pytest.approx(3.0 if variant == "excerpt" else 0.0, abs=0.02)
+
+
+def test_recording_inside_a_longer_call_matches(index, robocall):
+    call = np.concatenate([speech_like(5, seed=99), robocall, speech_like(5, seed=98)])
+    match = index.match(call)
+    assert match.name == "gift-card robocall" and match.is_strong()
+
+
+def test_long_uploads_are_matched_on_a_few_windows(index, robocall, monkeypatch):
+    monkeypatch.setattr(fingerprint_module, "FINGERPRINT_WINDOW_S", 10)
+    call = np.concatenate([speech_like(40, seed=99), robocall, speech_like(37, seed=98)])  # 85 s
+    assert [len(w) for w in windows(call)] == [10 * RATE] * 3
+    assert len(windows(robocall)) == 1  # shorter than a window: matched whole
+
+    fingerprinted = []
+    monkeypatch.setattr(fingerprint_module, "fingerprint", lambda a: fingerprinted.append(len(a)) or fingerprint(a))
+    match = best_match(call, index)
+    assert match.name == "gift-card robocall" and match.is_strong()  # the middle window
+    assert sum(fingerprinted) <= 3 * 10 * RATE
+
+
+def test_unrelated_audio_is_not_a_strong_match(index):
+    for seed in (10, 11, 12):
+        match = index.match(speech_like(8, seed))
+        assert match is None or not match.is_strong()
+    assert index.stats()["queries"] == 3 and index.stats()["matches"] == 0
+
+
+def test_empty_index_and_silence():
+    idx = FingerprintIndex(None)
+    assert idx.empty and idx.match(speech_like(2, 1)) is None
+    idx.add("x", speech_like(2, 1))
+    assert idx.match(np.zeros(RATE, dtype=np.float32)) is None
+
+
+def test_index_persists_and_removes(tmp_path, robocall):
+    db = str(tmp_path / "fingerprints.sqlite3")
+    rid = FingerprintIndex(db).add("gift-card robocall", robocall)
+
+    reopened = FingerprintIndex(db)
+    assert reopened.match(robocall).recording_id == rid
+    assert reopened.remove(rid) is True
+    assert FingerprintIndex(db).empty
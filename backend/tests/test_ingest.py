@@ -0,0 +1,170 @@
+"""
+Tests for ingest.py — sniffing and decoding uploads as they arrive.
+"""
+import asyncio
+import hashlib
+import json
+import struct
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ingest
+from audio_decode import decode_wav_pcm16
+from ingest import UnsupportedAudio, UploadDecoder, sniff_format
+
+
+@pytest.mark.parametrize("head,fmt", [
+    (b"RIFF\x00\x00\x00\x00WAVEfmt ", "wav"),
+    (b"\x00\x00\x00\x20ftypM4A ", "m4a"),
+    (b"OggS\x00\x02", "ogg"),
+    (b"fLaC\x00\x00", "flac"),
+    (b"\x1a\x45\xdf\xa3\x01", "webm"),
+    (b"ID3\x04\x00", "mp3"),
+    (b"\xff\xfb\x90\x00", "mp3"),
+    (b"\xff\xf1\x50\x80", "aac"),
+    (b"hello world", None),
+    (b"", None),
+])
+def test_sniff_format(head, fmt):
+    assert sniff_format(head) == fmt
+
+
+def _pcm(n):
+    return (np.arange(n) % 2000 - 1000).astype("<i2")
+
+
+def _wav(samples, rate=16000, channels=1, data_size=None, trailer=b""):
+    data = samples.tobytes()
+    size = len(data) if data_size is None else data_size
+    header = struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + len(data), b"WAVE", b"fmt ", 16, 1, channels,
+                         rate, rate * channels * 2, channels * 2, 16, b"data", size)
+    return header + data + trailer
+
+
+def _ingest(tmp_path, data: bytes, fmt: str, chunk: int = 4096):
+    async def run():
+        decoder = UploadDecoder(tmp_path, "call1", fmt)
+        for i in range(0, len(data), chunk):
+            await decoder.feed(data[i:i + chunk])
+        return decoder, await decoder.finish()
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """An 'ffmpeg' that records its arguments and echoes its input as the decoded PCM."""
+    script = tmp_path / "ffmpeg"
+    log = tmp_path / "ffmpeg-args.json"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import json, sys\n"
+        f"json.dump(sys.argv[1:], open({str(log)!r}, 'w'))\n"
+        "src = sys.argv[sys.argv.index('-i') + 1]\n"
+        "data = sys.stdin.buffer.read() if src == 'pipe:0' else open(src, 'rb').read()\n"
+        "sys.stdout.buffer.write(data)\n"
+    )
+    script.chmod(0o755)
+    with patch("ingest.FFMPEG_BIN", str(script)):
+        yield lambda: json.loads(log.read_text())
+
+
+def test_native_wav_is_copied_across_chunk_boundaries(tmp_path):
+    samples = _pcm(16000)
+    decoder, path = _ingest(tmp_path, _wav(samples), "wav", chunk=7)
+
+    assert decoder.mode == "native"
+    assert path == tmp_path / "call1.wav"
+    np.testing.assert_array_equal(decode_wav_pcm16(path.read_bytes()), samples / np.float32(32768))
+    assert decoder.duration_s == pytest.approx(1.0)
+
+
+def test_native_wav_drops_chunks_after_the_data(tmp_path):
+    samples = _pcm(100)
+    decoder, path = _ingest(tmp_path, _wav(samples, trailer=b"LIST\x04\x00\x00\x00abcd"), "wav")
+    assert decoder.samples == 100
+    assert len(path.read_bytes()) == 44 + 200
+
+
+def test_streaming_wav_with_unset_size_keeps_everything(tmp_path):
+    decoder, path = _ingest(tmp_path, _wav(_pcm(1001), data_size=0xFFFFFFFF) + b"\x01", "wav")
+    assert decoder.samples == 1001  # the trailing odd byte is dropped
+    assert struct.unpack_from("<I", path.read_bytes(), 40)[0] == 2002
+
+
+def test_other_wav_is_resampled_by_ffmpeg(tmp_path, fake_ffmpeg):
+    decoder, path = _ingest(tmp_path, _wav(_pcm(4410), rate=44100, channels=2), "wav")
+    args = fake_ffmpeg()
+    assert decoder.mode == "pipe"
+    assert args[args.index("-i") + 1] == "pipe:0"
+    assert args[args.index("-ar") + 1] == "16000" and args[args.index("-ac") + 1] == "1"
+    assert path.name == "call1.wav"
+
+
+def test_compressed_upload_is_piped_while_it_arrives(tmp_path, fake_ffmpeg):
+    data = b"ID3" + bytes(range(256)) * 1000
+    decoder, path = _ingest(tmp_path, data, "mp3", chunk=10_000)
+    assert decoder.mode == "pipe"
+    # The fake echoes its input, so the artifact holds exactly what was fed
+    assert path.read_bytes()[44:] == data[:len(data) // 2 * 2]
+    assert not (tmp_path / "call1.mp3").exists()
+
+
+def test_m4a_is_spooled_then_decoded(tmp_path, fake_ffmpeg):
+    data = b"\x00\x00\x00\x20ftypM4A " + b"\x07" * 5000
+    decoder, path = _ingest(tmp_path, data, "m4a")
+    args = fake_ffmpeg()
+    assert decoder.mode == "spooled"
+    assert args[args.index("-i") + 1] == str(tmp_path / "call1.m4a")
+    assert path.name == "call1.wav"
+    assert not (tmp_path / "call1.m4a").exists()
+
+
+def test_without_ffmpeg_upload_is_stored_as_is(tmp_path):
+    data = b"OggS" + b"\x00" * 1000
+    with patch("ingest.FFMPEG_BIN", str(tmp_path / "missing-ffmpeg")):
+        decoder, path = _ingest(tmp_path, data, "ogg")
+    assert decoder.mode == "raw"
+    assert path == tmp_path / "call1.ogg"
+    assert path.read_bytes() == data
+
+
+def test_decode_failure_raises_and_cleans_up(tmp_path):
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\nimport sys\nsys.stdin.buffer.read()\n"
+                      "sys.stderr.write('pipe:0: Invalid data found when processing input\\n')\nsys.exit(1)\n")
+    script.chmod(0o755)
+    with patch("ingest.FFMPEG_BIN", str(script)):
+        with pytest.raises(UnsupportedAudio, match="Invalid data"):
+            _ingest(tmp_path, b"OggS" + b"\x00" * 1000, "ogg")
+    assert not (tmp_path / "call1.wav").exists()
+    assert ingest.stats()["uploads"]["failed"] >= 1
+
+
+def test_abort_removes_partial_artifact(tmp_path):
+    async def run():
+        decoder = UploadDecoder(tmp_path, "call1", "wav")
+        await decoder.feed(_wav(_pcm(40000)))
+        await decoder.abort()
+    asyncio.run(run())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_pcm_digest_ignores_the_container(tmp_path):
+    samples = _pcm(3000)
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    plain, _ = _ingest(tmp_path / "a", _wav(samples), "wav")
+    retagged, _ = _ingest(tmp_path / "b", _wav(samples, trailer=b"LIST\x04\x00\x00\x00abcd"), "wav", chunk=333)
+    assert plain.pcm_sha256 == retagged.pcm_sha256 == hashlib.sha256(samples.tobytes()).hexdigest()
+
+
+def test_undecoded_upload_has_no_pcm_digest(tmp_path):
+    with patch("ingest.FFMPEG_BIN", str(tmp_path / "missing-ffmpeg")):
+        decoder, _ = _ingest(tmp_path, b"OggS" + b"\x00" * 1000, "ogg")
+    assert decoder.pcm_sha256 is None
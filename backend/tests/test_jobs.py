@@ -0,0 +1,220 @@
+"""
+Tests for jobs.py — job stores and the background job runner.
+"""
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import jobs
+from jobs import JobFailed, JobRunner, MemoryJobStore, SqliteJobStore
+
+
+async def _pipeline(ctx):
+    with ctx.stage("transcribing"):
+        await asyncio.sleep(0)
+    with ctx.stage("classifying"):
+        pass
+    return {"risk_level": "Low"}
+
+
+async def _failing_pipeline(ctx):
+    with ctx.stage("transcribing"):
+        raise FileNotFoundError("No audio file found")
+
+
+# ---------------------------------------------------------------------------
+# JobRunner
+# ---------------------------------------------------------------------------
+
+def test_job_completes_with_stage_timings():
+    async def run():
+        runner = JobRunner(MemoryJobStore())
+        job = runner.submit("call1", _pipeline)
+        assert job["status"] == "queued"
+        result = await runner.wait(job["job_id"])
+        return runner.get(job["job_id"]), result
+
+    job, result = asyncio.run(run())
+    assert result == {"risk_level": "Low"}
+    assert job["status"] == "done"
+    assert job["result"] == result
+    assert set(job["stages"]) == {"transcribing", "classifying"}
+    assert job["stages"]["transcribing"]["duration_ms"] >= 0
+
+
+def test_job_failure_is_recorded():
+    async def run():
+        runner = JobRunner(MemoryJobStore())
+        job = runner.submit("call1", _failing_pipeline)
+        with pytest.raises(FileNotFoundError):
+            await runner.wait(job["job_id"])
+        return runner.get(job["job_id"])
+
+    job = asyncio.run(run())
+    assert job["status"] == "failed"
+    assert job["error_status"] == 500
+    assert "No audio file" in job["error"]
+
+
+def test_wait_on_a_finished_job_resolves_from_its_record():
+    async def run():
+        runner = JobRunner(MemoryJobStore())
+        done = runner.submit("call1", _pipeline)
+        failed = runner.submit("call2", _failing_pipeline)
+        await asyncio.sleep(0.05)  # both finished and no longer tracked as tasks
+        assert not runner._tasks
+        result = await runner.wait(done["job_id"])
+        with pytest.raises(JobFailed) as excinfo:
+            await runner.wait(failed["job_id"])
+        return result, excinfo.value
+
+    result, error = asyncio.run(run())
+    assert result == {"risk_level": "Low"}
+    assert error.status_code == 500 and "No audio file" in error.detail
+
+
+def test_cancelled_wait_leaves_the_job_running():
+    async def slow(ctx):
+        await asyncio.sleep(0.1)
+        return {"risk_level": "High"}
+
+    async def run():
+        runner = JobRunner(MemoryJobStore())
+        job = runner.submit("call1", slow)
+        waiter = asyncio.ensure_future(runner.wait(job["job_id"]))
+        await asyncio.sleep(0.01)
+        waiter.cancel()  # the HTTP client went away
+        with pytest.raises(asyncio.TimeoutError):
+            await runner.wait(job["job_id"], timeout=0.01)
+        return await runner.wait(job["job_id"]), runner.get(job["job_id"])
+
+    result, job = asyncio.run(run())
+    assert result == {"risk_level": "High"} and job["status"] == "done"
+
+
+def test_cancelled_job_is_marked_failed():
+    async def run():
+        runner = JobRunner(MemoryJobStore())
+        job = runner.submit("call1", lambda ctx: asyncio.sleep(10))
+        await asyncio.sleep(0.01)
+        runner._tasks[job["job_id"]].cancel()
+        await asyncio.sleep(0.01)
+        return runner.get(job["job_id"])
+
+    job = asyncio.run(run())
+    assert job["status"] == "failed" and job["error_status"] == 503
+
+
+def test_events_stream_until_done():
+    async def run():
+        runner = JobRunner(MemoryJobStore())
+        job = runner.submit("call1", _pipeline)
+        return [j["status"] async for j in runner.events(job["job_id"]) if j]
+
+    statuses = asyncio.run(run())
+    assert statuses[-1] == "done"
+
+
+# ---------------------------------------------------------------------------
+# SqliteJobStore — survives restart
+# ---------------------------------------------------------------------------
+
+def test_sqlite_results_survive_restart(tmp_path):
+    db = tmp_path / "jobs.sqlite3"
+
+    async def run():
+        runner = JobRunner(SqliteJobStore(db))
+        job = runner.submit("call1", _pipeline)
+        await runner.wait(job["job_id"])
+        return job["job_id"]
+
+    job_id = asyncio.run(run())
+    reopened = JobRunner(SqliteJobStore(db))
+    assert reopened.get(job_id)["result"] == {"risk_level": "Low"}
+
+
+def test_unfinished_jobs_marked_interrupted_on_restart(tmp_path):
+    store = SqliteJobStore(tmp_path / "jobs.sqlite3")
+    store.put({"job_id": "abc", "status": "running", "stages": {}, "updated_at": 0.0})
+
+    runner = JobRunner(SqliteJobStore(tmp_path / "jobs.sqlite3"))
+    job = runner.get("abc")
+    assert job["status"] == "failed"
+    assert job["error_status"] == 503
+
+
+def test_sibling_workers_running_jobs_are_left_alone(tmp_path):
+    db = tmp_path / "jobs.sqlite3"
+    now = time.time()
+    SqliteJobStore(db).put({"job_id": "sib", "status": "running", "stages": {}, "updated_at": now,
+                            "owner": "other-host:4242:beef", "heartbeat_at": now})
+
+    runner = JobRunner(SqliteJobStore(db))
+    assert runner.get("sib")["status"] == "running"
+
+
+def test_job_fails_once_its_owner_stops_heartbeating(tmp_path):
+    db = tmp_path / "jobs.sqlite3"
+    now = time.time()
+    SqliteJobStore(db).put({"job_id": "sib", "status": "running", "stages": {}, "updated_at": now,
+                            "owner": "other-host:4242:beef", "heartbeat_at": now})
+    runner = JobRunner(SqliteJobStore(db))
+
+    with patch("jobs._now", return_value=now + jobs.JOB_STALE_S + 1):
+        job = runner.get("sib")
+    assert job["status"] == "failed"
+    assert job["error_status"] == 503
+
+
+def test_job_of_exited_process_on_this_host_fails_at_once(tmp_path):
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    now = time.time()
+    store = SqliteJobStore(tmp_path / "jobs.sqlite3")
+    store.put({"job_id": "dead", "status": "queued", "stages": {}, "updated_at": now,
+               "owner": f"{socket.gethostname()}:{proc.pid}:beef", "heartbeat_at": now})
+
+    assert JobRunner(store).get("dead")["status"] == "failed"
+
+
+def test_heartbeat_does_not_emit_events():
+    async def run():
+        runner = JobRunner(MemoryJobStore())
+
+        async def slow(ctx):
+            await asyncio.sleep(0.2)
+            return {}
+
+        with patch("jobs.JOB_HEARTBEAT_S", 0.05):
+            job = runner.submit("call1", slow)
+            await asyncio.sleep(0.15)
+            running = runner.get(job["job_id"])
+            await runner.wait(job["job_id"])
+        return running
+
+    running = asyncio.run(run())
+    assert running["status"] == "running"
+    assert running["heartbeat_at"] > running["updated_at"]
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_finished_jobs_expire(kind, tmp_path):
+    store = MemoryJobStore() if kind == "memory" else SqliteJobStore(tmp_path / "jobs.sqlite3")
+    old = time.time() - jobs.JOB_TTL_S - 10
+    store.put({"job_id": "old", "status": "done", "stages": {}, "updated_at": old})
+    store.put({"job_id": "new", "status": "failed", "stages": {}, "updated_at": time.time()})
+    store.put({"job_id": "live", "status": "running", "stages": {}, "updated_at": old,
+               "owner": "x", "heartbeat_at": old})
+
+    assert store.purge(time.time() - jobs.JOB_TTL_S) == 1
+    assert store.get("old") is None
+    assert store.get("new") is not None
+    assert store.get("live") is not None
@@ -0,0 +1,54 @@
+"""
+Tests for local_scorer.py — weighted phrase pre-classifier.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import local_scorer
+from local_scorer import extract_features, preclassify
+
+
+def test_longest_phrase_wins():
+    features = extract_features("This is the Social Security Administration.")
+    assert features.strong_hits == 1
+    assert features.weak_hits == 0  # "security" is consumed by "social security"
+
+
+def test_matches_whole_words_and_plurals():
+    assert extract_features("The atmosphere was lovely.").score == 0
+    assert extract_features("Buy two gift cards.").strong_hits == 1
+
+
+def test_repeated_phrase_counts_once():
+    assert extract_features("wire wire wire").score == extract_features("wire").score
+
+
+def test_confident_high_from_phrases():
+    assert preclassify("Go buy gift cards and read me the verification code.", 0, 0, 0) == "2"
+
+
+def test_confident_high_from_history():
+    assert preclassify("Hi, how are you?", 20, 5, 15) == "2"
+
+
+def test_no_local_low_label():
+    # Missing keywords aren't evidence of safety: these must still reach the model
+    assert preclassify("See you at the cricket match tomorrow.", 0, 0, 0) is None
+    assert preclassify("Grandma, it is me, I am in jail and need bail money wired tonight.", 0, 0, 0) is None
+    assert preclassify("We are calling from Microsoft, your computer has a virus, "
+                       "please install the software.", 0, 0, 0) is None
+
+
+def test_weak_words_defer_to_model():
+    assert preclassify("Hello, this is your bank.", 0, 0, 0) is None
+
+
+def test_stats_track_short_circuits():
+    before = local_scorer.stats()
+    preclassify("See you tomorrow.", 0, 0, 0)
+    preclassify("Go buy gift cards and read me the verification code.", 0, 0, 0)
+    after = local_scorer.stats()
+    assert after["calls"] == before["calls"] + 2
+    assert after["short_circuit_high"] == before["short_circuit_high"] + 1
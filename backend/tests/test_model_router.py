@@ -0,0 +1,69 @@
+"""
+Tests for model_router.py — per-model health, circuit breakers and probing.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from model_router import ModelRouter
+
+MODELS = ["pro", "flash", "legacy"]
+
+
+def test_configured_order_until_latency_is_known():
+    assert ModelRouter(MODELS).candidates() == MODELS
+
+
+def test_fastest_healthy_model_first():
+    router = ModelRouter(MODELS)
+    router.record_success("legacy", 0.2)
+    router.record_success("flash", 0.5)
+    assert router.candidates()[:2] == ["legacy", "flash"]
+
+
+def test_circuit_opens_after_threshold_and_reopens_after_cooldown():
+    router = ModelRouter(MODELS, failure_threshold=2, cooldown=0.05)
+    router.record_failure("pro", "boom")
+    assert "pro" in router.candidates()
+    router.record_failure("pro", "boom")
+    assert "pro" not in router.candidates()
+    time.sleep(0.06)
+    assert router.candidates()[-1] == "pro"   # half-open: tried after healthy models
+
+
+def test_not_found_opens_immediately():
+    router = ModelRouter(MODELS, not_found_cooldown=60)
+    router.record_failure("pro", "404", not_found=True)
+    assert router.candidates() == ["flash", "legacy"]
+
+
+def test_all_open_allows_single_trial():
+    router = ModelRouter(MODELS, failure_threshold=1, cooldown=60)
+    for m in MODELS:
+        router.record_failure(m, "down")
+    assert router.candidates() == ["pro"]
+
+
+def test_background_probe_closes_recovered_circuit():
+    router = ModelRouter(MODELS, failure_threshold=1, cooldown=0.01)
+    router.record_failure("pro", "down")
+    router.start_probing(lambda model: None, interval=0.02)
+    try:
+        deadline = time.time() + 2
+        while router.snapshot()["models"][0]["consecutive_failures"] and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        router.stop_probing()
+    pro = router.snapshot()["models"][0]
+    assert pro["consecutive_failures"] == 0
+    assert pro["state"] == "closed"
+
+
+def test_snapshot_reports_latency():
+    router = ModelRouter(MODELS)
+    router.record_success("flash", 0.1)
+    flash = router.snapshot()["models"][1]
+    assert flash["latency_ms"]["ewma"] == 100.0
+    assert flash["latency_ms"]["p95"] == 100.0
@@ -0,0 +1,190 @@
+"""
+Tests for blockchain/registry_indexer.py — event-indexed mirror of ScamRegistry.
+
+Runs against an in-process eth-tester chain (no network). Instead of compiling
+the Solidity source, a few bytes of hand-assembled EVM code stand in for the
+contract: submitReport(bytes32, uint8) emits ScamReported exactly like the real
+one, which is all the indexer looks at.
+"""
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("eth_tester")
+
+from eth_utils import keccak
+from web3 import Web3, EthereumTesterProvider
+
+from blockchain.registry_indexer import RegistryIndexer, RegistryMirror
+
+_ABI = json.loads((Path(__file__).parent.parent / "abi" / "ScamRegistry.json").read_text())
+
+
+def _emitter_bytecode() -> bytes:
+    topic = keccak(text="ScamReported(bytes32,uint8,uint256)")
+    runtime = (
+        bytes.fromhex("602435600052")      # mstore(0x00, calldataload(0x24))   riskLevel
+        + bytes.fromhex("42602052")        # mstore(0x20, timestamp)
+        + bytes.fromhex("600435")          # calldataload(0x04)                 callerHash (topic 1)
+        + b"\x7f" + topic                  # push32 event signature             (topic 0)
+        + bytes.fromhex("60406000a200")    # log2(0x00, 0x40, ...); stop
+    )
+    # Constructor: codecopy the runtime that follows it and return it
+    init = bytes([0x60, len(runtime), 0x80, 0x60, 11, 0x60, 0x00, 0x39, 0x60, 0x00, 0xF3])
+    return init + runtime
+
+
+@pytest.fixture
+def chain():
+    w3 = Web3(EthereumTesterProvider())
+    sender = w3.eth.accounts[0]
+    tx = w3.eth.send_transaction({"from": sender, "data": _emitter_bytecode()})
+    contract = w3.eth.contract(address=w3.eth.get_transaction_receipt(tx).contractAddress, abi=_ABI)
+
+    def report(number: str, risk: int):
+        contract.functions.submitReport(keccak(text=number), risk).transact({"from": sender})
+
+    return w3, contract, report
+
+
+def _stats(mirror, number):
+    return mirror.get(keccak(text=number))
+
+
+def test_sync_builds_per_hash_totals(chain):
+    w3, contract, report = chain
+    report("+15551234567", 2)
+    report("+15551234567", 1)
+    report("+15551234567", 0)
+    report("+15559999999", 2)
+
+    indexer = RegistryIndexer(w3, contract, RegistryMirror())
+    assert indexer.sync_once() == 4
+    assert _stats(indexer.mirror, "+15551234567")["total_reports"] == 3
+    assert _stats(indexer.mirror, "+15551234567")["high_risk_reports"] == 1
+    assert _stats(indexer.mirror, "+15551234567")["medium_risk_reports"] == 1
+    assert _stats(indexer.mirror, "+15559999999")["high_risk_reports"] == 1
+    assert _stats(indexer.mirror, "+15550000000") is None
+    assert indexer.mirror.checkpoint() == w3.eth.block_number
+    assert indexer.lag() == 0
+
+
+def test_mirror_matches_contract_state_over_small_ranges(chain):
+    w3, contract, report = chain
+    for i in range(7):
+        report(f"+1555000000{i % 3}", i % 3)
+
+    indexer = RegistryIndexer(w3, contract, RegistryMirror(), batch_size=2)
+    assert indexer.sync_once() == 7
+    for i in range(3):
+        assert _stats(indexer.mirror, f"+1555000000{i}")["total_reports"] == len(range(i, 7, 3))
+
+
+def test_catch_up_after_downtime_resumes_from_checkpoint(chain, tmp_path):
+    w3, contract, report = chain
+    db = str(tmp_path / "mirror.sqlite3")
+    report("+15551234567", 2)
+    RegistryIndexer(w3, contract, RegistryMirror(db)).sync_once()
+
+    # Process is down while more reports land
+    report("+15551234567", 2)
+    report("+15551234567", 1)
+
+    indexer = RegistryIndexer(w3, contract, RegistryMirror(db))
+    assert indexer.sync_once() == 2
+    assert _stats(indexer.mirror, "+15551234567")["total_reports"] == 3
+
+
+def test_reorg_within_depth_is_undone(chain):
+    w3, contract, report = chain
+    tester = w3.provider.ethereum_tester
+    report("+15551234567", 2)
+    indexer = RegistryIndexer(w3, contract, RegistryMirror(), reorg_depth=12)
+    indexer.sync_once()
+
+    fork_point = tester.take_snapshot()
+    report("+15551234567", 2)
+    report("+15559999999", 2)
+    indexer.sync_once()
+    assert _stats(indexer.mirror, "+15551234567")["total_reports"] == 2
+
+    # The two blocks above are replaced by a different branch
+    tester.revert_to_snapshot(fork_point)
+    report("+15558888888", 1)
+    report("+15558888888", 1)
+    report("+15558888888", 1)
+    indexer.sync_once()
+
+    assert _stats(indexer.mirror, "+15551234567")["total_reports"] == 1
+    assert _stats(indexer.mirror, "+15559999999") is None
+    assert _stats(indexer.mirror, "+15558888888")["medium_risk_reports"] == 3
+    assert indexer.stats()["reorgs"] == 1
+
+
+def _failing_get_logs(w3, errors):
+    """get_logs that raises the given errors first, recording the block range of every call."""
+    real, ranges = w3.eth.get_logs, []
+
+    def get_logs(params):
+        ranges.append(params["toBlock"] - params["fromBlock"] + 1)
+        if errors:
+            raise errors.pop(0)
+        return real(params)
+    return get_logs, ranges
+
+
+def test_range_errors_halve_the_batch_and_it_grows_back(chain):
+    w3, contract, report = chain
+    for i in range(24):
+        report(f"+1555000000{i % 3}", 1)
+    indexer = RegistryIndexer(w3, contract, RegistryMirror(), batch_size=8)
+    get_logs, ranges = _failing_get_logs(w3, [ValueError({"code": -32005, "message": "query returned more than 10000 results"})])
+    with patch.object(w3.eth, "get_logs", get_logs):
+        assert indexer.sync_once() == 24
+    # Halved once, then doubled back after a run of good requests
+    assert ranges[:6] == [8, 4, 4, 4, 4, 4]
+    assert indexer.batch_size == 8 and ranges[6] > 4
+
+
+def test_other_rpc_errors_are_raised_without_shrinking_the_batch(chain):
+    w3, contract, report = chain
+    report("+15551234567", 2)
+    indexer = RegistryIndexer(w3, contract, RegistryMirror(), batch_size=8)
+    get_logs, ranges = _failing_get_logs(w3, [ConnectionError("connection reset by peer")])
+    with patch.object(w3.eth, "get_logs", get_logs):
+        with pytest.raises(ConnectionError):
+            indexer.sync_once()
+        assert indexer.batch_size == 8 and len(ranges) == 1  # no retry with a smaller range
+        assert indexer.sync_once() == 1
+
+
+def test_reorg_deeper_than_window_rebuilds(chain):
+    w3, contract, report = chain
+    tester = w3.provider.ethereum_tester
+    fork_point = tester.take_snapshot()
+    for _ in range(4):
+        report("+15551234567", 2)
+    indexer = RegistryIndexer(w3, contract, RegistryMirror(), reorg_depth=2)
+    indexer.sync_once()
+
+    tester.revert_to_snapshot(fork_point)
+    for _ in range(5):
+        report("+15559999999", 0)
+    indexer.sync_once()
+
+    assert _stats(indexer.mirror, "+15551234567") is None
+    assert _stats(indexer.mirror, "+15559999999")["total_reports"] == 5
+
+
+def test_is_fresh_requires_recent_sync(chain):
+    w3, contract, report = chain
+    indexer = RegistryIndexer(w3, contract, RegistryMirror())
+    assert not indexer.is_fresh(max_lag=5, max_age=60)
+    indexer.sync_once()
+    assert indexer.is_fresh(max_lag=5, max_age=60)
+    assert not indexer.is_fresh(max_lag=5, max_age=-1)
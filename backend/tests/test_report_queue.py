@@ -0,0 +1,211 @@
+"""
+Tests for blockchain/report_queue.py — durable background report submission.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from blockchain.report_queue import ReportQueue
+
+
+class FakeSender:
+    """Records transactions; broadcast failures are scripted per call."""
+
+    def __init__(self, batch=True):
+        self.batch = batch
+        self.nonce = 0
+        self.signed = []
+        self.batches = []
+        self.broadcasts = []
+        self.known = set()
+        self.broadcast_errors = []
+        self.nonce_resets = 0
+
+    def sign(self, caller_hash, risk_level):
+        tx_hash = f"0x{self.nonce:064x}"
+        self.signed.append((caller_hash, risk_level, self.nonce))
+        self.nonce += 1
+        return tx_hash, f"raw-{tx_hash}"
+
+    def sign_batch(self, caller_hashes, risk_levels):
+        self.batches.append(list(zip(caller_hashes, risk_levels)))
+        tx_hash = f"0x{self.nonce:064x}"
+        self.nonce += 1
+        return tx_hash, f"raw-{tx_hash}"
+
+    def supports_batch(self):
+        return self.batch
+
+    def broadcast(self, raw_tx):
+        if self.broadcast_errors:
+            error = self.broadcast_errors.pop(0)
+            if error is not None:
+                raise error
+        self.broadcasts.append(raw_tx)
+        self.known.add(raw_tx[len("raw-"):])
+        return raw_tx[len("raw-"):]
+
+    def is_known(self, tx_hash):
+        return tx_hash in self.known
+
+    def reset_nonce(self):
+        self.nonce_resets += 1
+
+
+def test_reports_are_sent_in_order():
+    sender = FakeSender()
+    queue = ReportQueue(":memory:", sender)
+    ids = [queue.enqueue(bytes([i]) * 32, i % 3) for i in range(3)]
+    assert queue.stats()["pending"] == 3
+
+    assert queue.drain() == 3
+    assert [s[2] for s in sender.signed] == [0, 1, 2]
+    assert all(queue.get(i)["status"] == "sent" for i in ids)
+    assert queue.get(ids[0])["tx_hash"] == f"0x{0:064x}"
+
+
+def test_failed_broadcast_is_retried_with_the_same_transaction():
+    sender = FakeSender()
+    sender.broadcast_errors = [ConnectionError("rpc down")]
+    queue = ReportQueue(":memory:", sender)
+    report_id = queue.enqueue(b"\x01" * 32, 2)
+
+    assert queue.drain() == 0
+    report = queue.get(report_id)
+    assert report["status"] == "signed" and report["attempts"] == 1
+    assert "rpc down" in report["last_error"]
+
+    assert queue.drain() == 1
+    assert len(sender.signed) == 1          # not re-signed: no duplicate report
+    assert queue.get(report_id)["status"] == "sent"
+
+
+def test_taken_nonce_resigns_report():
+    sender = FakeSender()
+    sender.broadcast_errors = [ValueError("nonce too low")]
+    queue = ReportQueue(":memory:", sender)
+    report_id = queue.enqueue(b"\x01" * 32, 1)
+
+    assert queue.drain() == 1
+    assert len(sender.signed) == 2
+    assert sender.nonce_resets == 1
+    assert queue.get(report_id)["tx_hash"] == f"0x{1:064x}"
+
+
+def test_already_known_transaction_counts_as_sent():
+    sender = FakeSender()
+    queue = ReportQueue(":memory:", sender)
+    report_id = queue.enqueue(b"\x01" * 32, 1)
+    sender.known.add(f"0x{0:064x}")
+    sender.broadcast_errors = [ValueError("already known")]
+
+    queue.drain()
+    assert queue.get(report_id)["status"] == "sent"
+
+
+def test_gives_up_after_max_attempts():
+    sender = FakeSender()
+    sender.broadcast_errors = [ConnectionError("rpc down")] * 2
+    queue = ReportQueue(":memory:", sender, max_attempts=2)
+    report_id = queue.enqueue(b"\x01" * 32, 2)
+    queue.enqueue(b"\x02" * 32, 2)
+
+    queue.drain()
+    queue.drain()
+    assert queue.get(report_id)["status"] == "failed"
+    assert queue.stats() == {"pending": 0, "signed": 0, "sent": 1, "failed": 1, "transactions": 1}
+
+
+def test_pending_reports_survive_restart(tmp_path):
+    db = str(tmp_path / "reports.sqlite3")
+    sender = FakeSender()
+    sender.broadcast_errors = [ConnectionError("crashed mid-send")]
+    first = ReportQueue(db, sender)
+    signed_id = first.enqueue(b"\x01" * 32, 2)
+    pending_id = first.enqueue(b"\x02" * 32, 1)
+    first.drain()
+
+    # New process: the signed transaction is re-broadcast, the pending one is signed and sent
+    restarted = ReportQueue(db, sender)
+    assert restarted.drain() == 2
+    assert restarted.get(signed_id)["status"] == "sent"
+    assert restarted.get(pending_id)["status"] == "sent"
+    assert len(sender.signed) == 2
+
+
+def test_worker_thread_drains_in_background():
+    sender = FakeSender()
+    queue = ReportQueue(":memory:", sender, poll_interval=0.01)
+    queue.start()
+    try:
+        report_id = queue.enqueue(b"\x01" * 32, 2)
+        deadline = time.time() + 2
+        while queue.get(report_id)["status"] != "sent" and time.time() < deadline:
+            time.sleep(0.01)
+        assert queue.get(report_id)["status"] == "sent"
+    finally:
+        queue.stop()
+
+
+# ---------------------------------------------------------------------------
+# Coalescing into submitReports
+# ---------------------------------------------------------------------------
+
+def test_batch_waits_to_fill_then_sends_one_transaction():
+    sender = FakeSender()
+    queue = ReportQueue(":memory:", sender, batch_max=3, batch_window=60)
+    ids = [queue.enqueue(bytes([i]) * 32, 2) for i in range(2)]
+    assert queue.drain() == 0                    # window open, batch not full
+
+    ids.append(queue.enqueue(b"\x09" * 32, 1))
+    assert queue.drain() == 3
+    assert len(sender.batches) == 1 and sender.signed == []
+    assert sender.batches[0][2] == (b"\x09" * 32, 1)
+    assert len({queue.get(i)["tx_hash"] for i in ids}) == 1
+    assert queue.stats()["transactions"] == 1
+
+
+def test_batch_window_expiry_sends_partial_batch():
+    sender = FakeSender()
+    queue = ReportQueue(":memory:", sender, batch_max=10, batch_window=0.01)
+    for i in range(4):
+        queue.enqueue(bytes([i]) * 32, 0)
+    time.sleep(0.02)
+    assert queue.drain() == 4
+    assert [len(b) for b in sender.batches] == [4]
+
+
+def test_flush_and_batch_size_cap():
+    sender = FakeSender()
+    queue = ReportQueue(":memory:", sender, batch_max=2, batch_window=60)
+    for i in range(5):
+        queue.enqueue(bytes([i]) * 32, 0)
+    assert queue.drain(flush=True) == 5
+    assert [len(b) for b in sender.batches] == [2, 2]
+    assert len(sender.signed) == 1               # the lone last report uses submitReport
+
+
+def test_batched_transaction_is_rebroadcast_after_restart(tmp_path):
+    db = str(tmp_path / "reports.sqlite3")
+    sender = FakeSender()
+    sender.broadcast_errors = [ConnectionError("crashed mid-send")]
+    first = ReportQueue(db, sender, batch_max=3)
+    ids = [first.enqueue(bytes([i]) * 32, 2) for i in range(3)]
+    first.drain()
+    assert {first.get(i)["status"] for i in ids} == {"signed"}
+
+    restarted = ReportQueue(db, sender, batch_max=3)
+    assert restarted.drain() == 3
+    assert len(sender.batches) == 1
+    assert sender.broadcasts == [f"raw-0x{0:064x}"]
+
+
+def test_contract_without_batch_entry_point_gets_single_reports():
+    sender = FakeSender(batch=False)
+    queue = ReportQueue(":memory:", sender, batch_max=10, batch_window=60)
+    for i in range(3):
+        queue.enqueue(bytes([i]) * 32, 1)
+    assert queue.drain() == 3
+    assert sender.batches == [] and len(sender.signed) == 3
@@ -0,0 +1,47 @@
+"""
+Tests for rescore.py — streaming JSONL bulk re-scoring CLI.
+"""
+import io
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture
+def rescore():
+    # Imported lazily so ScamAnalysisEngine is first imported by its own test
+    # module, which patches the Gemini client before import
+    import rescore
+    return rescore
+
+
+async def _fake_classify(batch, pack_size, concurrency):
+    _fake_classify.windows.append(len(batch))
+    return ["2" if "gift" in item["transcript"] else "0" for item in batch]
+
+
+def test_rescore_streams_in_windows(tmp_path, rescore):
+    _fake_classify.windows = []
+    src = tmp_path / "in.jsonl"
+    dst = tmp_path / "out.jsonl"
+    src.write_text("\n".join(
+        json.dumps({"id": i, "transcript": "buy gift cards" if i % 2 else "hello"}) for i in range(5)
+    ) + "\n")
+
+    with patch("rescore.classify_calls_async", _fake_classify):
+        rescore.main([str(src), "-o", str(dst), "--window", "2"])
+
+    rows = [json.loads(line) for line in dst.read_text().splitlines()]
+    assert [r["id"] for r in rows] == [0, 1, 2, 3, 4]
+    assert [r["label"] for r in rows] == ["0", "2", "0", "2", "0"]
+    assert _fake_classify.windows == [2, 2, 1]
+
+
+def test_rescore_rejects_lines_without_transcript(rescore):
+    with pytest.raises(SystemExit, match="line 1"):
+        list(rescore._read_items(io.StringIO('{"id": 1}\n')))
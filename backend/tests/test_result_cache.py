@@ -0,0 +1,57 @@
+"""
+Tests for result_cache.py — LRU + TTL cache with optional SQLite tier.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from result_cache import ResultCache
+
+
+def test_get_set_and_counters():
+    cache = ResultCache(maxsize=10, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", "2")
+    assert cache.get("a") == "2"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_entries_expire():
+    cache = ResultCache(maxsize=10, ttl=60)
+    cache.set("a", "1", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_lru_eviction():
+    cache = ResultCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")          # a is now most recently used
+    cache.set("c", 3)       # evicts b
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate():
+    cache = ResultCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db = tmp_path / "cache.sqlite3"
+    ResultCache(maxsize=10, ttl=60, db_path=str(db)).set("k", {"label": "2"})
+
+    reopened = ResultCache(maxsize=10, ttl=60, db_path=str(db))
+    assert reopened.get("k") == {"label": "2"}
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get("k") == {"label": "2"}
+    assert reopened.stats()["hits"] == 1
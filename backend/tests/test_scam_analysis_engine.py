@@ -1,8 +1,14 @@
 """
 Tests for ScamAnalysisEngine.py — LLM classification + heuristic fallback.
 """
+import asyncio
+import json
 import os
+import threading
+import time
+import weakref
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch, MagicMock
 
 os.environ.setdefault("GEMINI_API_KEY", "test-key")
@@ -13,7 +19,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
 # ---------------------------------------------------------------------------
-# Patch genai before import
+# Mock genai: the sync client is built on first use, so install the mock as it
 # ---------------------------------------------------------------------------
 
 mock_genai_client = MagicMock()
@@ -21,8 +27,21 @@ mock_response = MagicMock()
 mock_response.text = "0"
 mock_genai_client.models.generate_content.return_value = mock_response
 
-with patch("google.genai.Client", return_value=mock_genai_client):
-    from ScamAnalysisEngine import classify_call
+import ScamAnalysisEngine
+from ScamAnalysisEngine import (
+    classify_call, classify_call_async, classify_calls, LiveClassifierSession, CLASSIFY_CACHE, MODEL_ROUTER,
+    make_client, cached_label,
+)
+
+ScamAnalysisEngine.client = mock_genai_client
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state():
+    """Each test sees the model, not a cached label or circuit state left by an earlier test."""
+    CLASSIFY_CACHE.clear()
+    MODEL_ROUTER.reset()
+    yield
 
 
 # ---------------------------------------------------------------------------
@@ -71,6 +90,34 @@ def test_heuristic_low_risk_clean_transcript():
     assert result == "0"
 
 
+def test_import_without_api_key_falls_back_to_rules():
+    import subprocess
+    code = ("import ScamAnalysisEngine as e; "
+            "assert e.client is None and not e.warm_up(); "
+            "print(e.classify_call('Please send gift cards to claim your lottery prize.', 0, 0, 0))")
+    env = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+    proc = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent.parent, env=env,
+                          capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() in ("1", "2")
+
+
+def test_missing_api_key_does_not_trip_circuits():
+    with patch("ScamAnalysisEngine.GEMINI_API_KEY", None), patch("ScamAnalysisEngine.client", None):
+        assert classify_call("Hello, is this a good time to talk about your order?", 0, 0, 0) in ("0", "1", "2")
+        with pytest.raises(RuntimeError, match="GEMINI_API_KEY"):
+            ScamAnalysisEngine.get_client()
+    assert all(m["failures"] == 0 for m in MODEL_ROUTER.snapshot()["models"])
+
+
+def test_get_client_builds_once():
+    with patch("ScamAnalysisEngine.client", None), \
+         patch("ScamAnalysisEngine.make_client", side_effect=lambda: MagicMock()) as build:
+        first = ScamAnalysisEngine.get_client()
+        assert ScamAnalysisEngine.get_client() is first
+    assert build.call_count == 1
+
+
 def test_classify_returns_string():
     """classify_call must always return a string, not an int."""
     result = classify_call("test transcript", 0, 0, 0)
@@ -104,3 +151,359 @@ def test_classify_very_long_transcript():
 def test_classify_unicode_transcript():
     result = classify_call("¡Hola! ¿Cómo está usted? Por favor envíe dinero.", 0, 0, 0)
     assert result in ("0", "1", "2")
+
+
+# ---------------------------------------------------------------------------
+# Local pre-classifier short-circuit
+# ---------------------------------------------------------------------------
+
+def test_clear_cut_scams_skip_the_model():
+    with patch("ScamAnalysisEngine._call_with_model", return_value="1") as mock_call:
+        assert classify_call(
+            "Buy a gift card and read me the verification code immediately.", 0, 0, 0
+        ) == "2"
+    mock_call.assert_not_called()
+
+
+def test_keyword_free_calls_still_go_to_the_model():
+    with patch("ScamAnalysisEngine._call_with_model", return_value="2") as mock_call:
+        assert classify_call("Grandma, it is me, I am in jail and need bail money wired tonight.", 0, 0, 0) == "2"
+    mock_call.assert_called_once()
+
+
+def test_ambiguous_calls_go_to_the_model():
+    with patch("ScamAnalysisEngine._call_with_model", return_value="1") as mock_call:
+        assert classify_call("Hello this is your bank.", 0, 0, 0) == "1"
+    mock_call.assert_called_once()
+
+
+# ---------------------------------------------------------------------------
+# Model routing
+# ---------------------------------------------------------------------------
+
+def test_unavailable_model_is_skipped_after_404():
+    from google.genai import errors as genai_errors
+    tried = []
+
+    def fake_call(prompt, model):
+        tried.append(model)
+        if model == "gemini-1.5-pro":
+            raise genai_errors.ClientError(404, {"error": {"message": "not found"}})
+        return "1"
+
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=fake_call):
+        classify_call("Hello this is your bank.", 0, 0, 0)
+        classify_call("Hello this is your credit card company.", 0, 0, 0)
+
+    assert tried == ["gemini-1.5-pro", "gemini-1.5-flash", "gemini-1.5-flash"]
+    health = {m["name"]: m for m in MODEL_ROUTER.snapshot()["models"]}
+    assert health["gemini-1.5-pro"]["state"] == "open"
+    assert MODEL_ROUTER.snapshot()["preferred"] == "gemini-1.5-flash"
+
+
+# ---------------------------------------------------------------------------
+# Result cache
+# ---------------------------------------------------------------------------
+
+def test_repeated_transcript_hits_cache():
+    with patch("ScamAnalysisEngine._call_with_model", return_value="2") as mock_call:
+        assert classify_call("Press 1 to speak to an agent.", 0, 0, 0) == "2"
+        # Same words, different case/punctuation/spacing
+        assert classify_call("press 1 to speak to an  agent", 0, 0, 0) == "2"
+    assert mock_call.call_count == 1
+    assert CLASSIFY_CACHE.stats()["hits"] == 1
+
+
+def test_cache_key_includes_caller_history():
+    with patch("ScamAnalysisEngine._call_with_model", return_value="1") as mock_call:
+        classify_call("Press 1 to speak to an agent.", 0, 0, 0)
+        classify_call("Press 1 to speak to an agent.", 5, 2, 0)
+    assert mock_call.call_count == 2
+
+
+def test_fallback_labels_are_not_cached():
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=Exception("API unavailable")):
+        classify_call("Hello this is your bank.", 0, 0, 0)
+    with patch("ScamAnalysisEngine._call_with_model", return_value="1") as mock_call:
+        assert classify_call("Hello this is your bank.", 0, 0, 0) == "1"
+    assert mock_call.call_count == 1
+
+
+def test_cached_label_never_calls_the_model():
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=Exception("API unavailable")) as mock_call:
+        assert cached_label("Hello this is your bank.", 0, 0, 0) is None  # not the fallback label
+        CLASSIFY_CACHE.set(ScamAnalysisEngine._cache_key("Hello this is your bank.", 0, 0, 0), "1")
+        assert cached_label("hello, this is your bank", 0, 0, 0) == "1"
+    mock_call.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Known scam scripts (script_index)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def scripts():
+    from script_index import ScriptIndex
+    index = ScriptIndex(None)
+    index.add("This is Windows support. Your computer license has expired and your computer has been hacked. "
+              "We need remote access to your computer to remove the viruses.", "tech-support")
+    with patch("ScamAnalysisEngine.nearest_script", index.nearest):
+        yield index
+
+
+def test_transcript_following_a_known_script_is_decided_without_the_model(scripts):
+    transcript = "this is windows support your computer license has expired and your computer has been hacked"
+    with patch("ScamAnalysisEngine._call_with_model") as mock_call:
+        assert classify_call(transcript, 0, 0, 0) == "2"
+        assert asyncio.run(classify_call_async(transcript, 0, 0, 0)) == "2"
+        assert cached_label(transcript, 0, 0, 0) == "2"
+    mock_call.assert_not_called()
+    assert scripts.stats()["decided"] == 3
+
+
+def test_resemblance_to_a_script_goes_into_the_prompt_and_fallback(scripts):
+    transcript = "Windows support here, your computer has been hacked, we need remote access to fix it."
+    prompts = []
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=lambda p, model: prompts.append(p) or "1"):
+        assert classify_call(transcript, 0, 0, 0) == "1"
+    assert "Closest known scam script: tech-support (similarity 0." in prompts[0]
+
+    # One strong phrase alone is medium; with the script's resemblance it is high
+    assert ScamAnalysisEngine._fallback_rule(transcript, 1, 0, 0) == "1"
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=Exception("API unavailable")):
+        assert classify_call(transcript, 1, 0, 0) == "2"
+    assert "Closest known scam script" not in ScamAnalysisEngine._build_prompt(SAFE_TRANSCRIPT, 0, 0, 0)
+
+
+def test_live_session_looks_up_scripts_on_its_window(scripts):
+    prompts = []
+
+    async def call_async(p, model):
+        return prompts.append(p) or "0"
+
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=lambda p, model: prompts.append(p) or "0"), \
+         patch("ScamAnalysisEngine._call_with_model_async", side_effect=call_async):
+        session = LiveClassifierSession(0, 0, 0, mode="incremental")
+        assert session.add_chunk("Windows support here, your computer has been hacked.") == "0"
+        assert "Closest known scam script: tech-support" in prompts[-1]
+        # The script spans chunks: the window holding both is a near copy, decided without the model
+        asyncio.run(session.add_chunk_async("This is Windows support."))
+        assert asyncio.run(session.add_chunk_async("Your computer license has expired and your computer "
+                                                   "has been hacked, we need remote access to your computer "
+                                                   "to remove the viruses.")) == "2"
+    assert len(prompts) == 2 and scripts.stats()["decided"] == 1
+
+
+# ---------------------------------------------------------------------------
+# LiveClassifierSession — incremental vs full-transcript scoring
+# ---------------------------------------------------------------------------
+
+CHUNK = "This is the bank fraud department calling about a charge on your card. "
+
+
+def test_incremental_prompt_size_stays_flat():
+    prompts = []
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=lambda p, model: prompts.append(p) or "0"):
+        session = LiveClassifierSession(0, 0, 0, mode="incremental", context_chars=300)
+        for _ in range(40):
+            session.add_chunk(CHUNK)
+    assert len(prompts) == 40
+    assert len(prompts[-1]) - len(prompts[5]) < len(CHUNK)
+    assert len(session.transcript) > 40 * len(CHUNK) - 100
+
+
+def test_full_mode_resends_whole_transcript():
+    prompts = []
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=lambda p, model: prompts.append(p) or "0"):
+        session = LiveClassifierSession(0, 0, 0, mode="full")
+        for _ in range(10):
+            session.add_chunk(CHUNK)
+    assert len(prompts[-1]) > len(prompts[0]) + 8 * len(CHUNK)
+
+
+def test_incremental_risk_never_decreases():
+    labels = iter(["2", "0"])
+    with patch("ScamAnalysisEngine._call_with_model", side_effect=lambda p, model: next(labels)):
+        session = LiveClassifierSession(0, 0, 0, mode="incremental")
+        assert session.add_chunk("Buy gift cards now.") == "2"
+        assert session.add_chunk("Anyway, how is the weather?") == "2"
+
+
+def test_incremental_silent_chunk_skips_model():
+    with patch("ScamAnalysisEngine._call_with_model", return_value="1") as mock_call:
+        session = LiveClassifierSession(0, 0, 0, mode="incremental")
+        session.add_chunk("Please confirm your account.")
+        calls = mock_call.call_count
+        assert session.add_chunk("") == "1"
+        assert mock_call.call_count == calls
+
+
+def test_silent_opening_uses_caller_history_without_model():
+    with patch("ScamAnalysisEngine._call_with_model") as mock_call:
+        assert LiveClassifierSession(5, 0, 2, mode="incremental").add_chunk("") == "2"
+        assert LiveClassifierSession(0, 0, 0, mode="full").add_chunk("") == "0"
+        mock_call.assert_not_called()
+
+
+def test_peek_flags_clear_high_risk_without_model_or_state_change():
+    with patch("ScamAnalysisEngine._call_with_model") as mock_call:
+        session = LiveClassifierSession(0, 0, 0, mode="incremental")
+        assert session.peek("buy a gift card and read me the verification code") == "2"
+        assert session.peek("Please confirm your account.") is None
+        assert session.transcript == "" and session.risk is None
+        mock_call.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Async client — against a local fake Gemini server
+# ---------------------------------------------------------------------------
+
+class _FakeGemini(BaseHTTPRequestHandler):
+    """Answers POST /v1beta/models/<model>:generateContent using the per-model `behaviour` table."""
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    behaviour: dict = {}
+    requests: list = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        model = self.path.split("/models/")[1].split(":")[0]
+        self.requests.append(model)
+        delay, status, text = self.behaviour.get(model, (0.0, 200, "1"))
+        time.sleep(delay)
+        if status == 200:
+            body = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+        else:
+            body = {"error": {"code": status, "message": "model not found", "status": "NOT_FOUND"}}
+        out = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_gemini():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGemini)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _FakeGemini.behaviour = {}
+    _FakeGemini.requests = []
+    url = f"http://127.0.0.1:{server.server_port}"
+    # The sync client, and the per-event-loop async clients made while the test runs
+    with patch("ScamAnalysisEngine.client", make_client(base_url=url)), \
+         patch.dict(os.environ, {"GEMINI_BASE_URL": url}), \
+         patch("ScamAnalysisEngine._loop_clients", weakref.WeakKeyDictionary()):
+        yield _FakeGemini
+    server.shutdown()
+
+
+AMBIGUOUS = "Hello, this is your bank calling about a payment."
+
+
+def test_async_classify_against_fake_server(fake_gemini):
+    fake_gemini.behaviour = {"gemini-1.5-pro": (0.0, 200, "2")}
+    assert asyncio.run(classify_call_async(AMBIGUOUS, 0, 0, 0)) == "2"
+    assert fake_gemini.requests == ["gemini-1.5-pro"]
+
+
+def test_async_skips_404_model(fake_gemini):
+    fake_gemini.behaviour = {"gemini-1.5-pro": (0.0, 404, ""), "gemini-1.5-flash": (0.0, 200, "1")}
+    with patch("ScamAnalysisEngine.GEMINI_HEDGE", False):
+        assert asyncio.run(classify_call_async(AMBIGUOUS, 0, 0, 0)) == "1"
+    assert fake_gemini.requests == ["gemini-1.5-pro", "gemini-1.5-flash"]
+    assert MODEL_ROUTER.candidates()[0] == "gemini-1.5-flash"
+
+
+def test_async_deadline_moves_to_next_model(fake_gemini):
+    fake_gemini.behaviour = {"gemini-1.5-pro": (2.0, 200, "0"), "gemini-1.5-flash": (0.0, 200, "2")}
+    with patch("ScamAnalysisEngine.GEMINI_TIMEOUT_S", 0.3), patch("ScamAnalysisEngine.GEMINI_HEDGE", False):
+        started = time.monotonic()
+        assert asyncio.run(classify_call_async(AMBIGUOUS, 0, 0, 0)) == "2"
+    assert time.monotonic() - started < 1.5
+    assert "timed out" in MODEL_ROUTER.snapshot()["models"][0]["last_error"]
+
+
+def test_async_hedged_request_wins(fake_gemini):
+    fake_gemini.behaviour = {"gemini-1.5-pro": (1.5, 200, "0"), "gemini-1.5-flash": (0.0, 200, "2")}
+    with patch("ScamAnalysisEngine.GEMINI_HEDGE_DELAY_MS", "100"):
+        started = time.monotonic()
+        assert asyncio.run(classify_call_async(AMBIGUOUS, 0, 0, 0)) == "2"
+    assert time.monotonic() - started < 1.0
+    assert fake_gemini.requests == ["gemini-1.5-pro", "gemini-1.5-flash"]
+
+
+def test_async_all_models_failing_uses_fallback(fake_gemini):
+    fake_gemini.behaviour = {m: (0.0, 200, "not a label") for m in ScamAnalysisEngine.CANDIDATE_MODELS}
+    assert asyncio.run(classify_call_async("Send money by wire today.", 0, 0, 0)) == "2"
+
+
+# ---------------------------------------------------------------------------
+# Batch classification
+# ---------------------------------------------------------------------------
+
+def test_classify_calls_packs_ambiguous_items_into_one_prompt():
+    prompts = []
+
+    async def fake_call(prompt, model):
+        prompts.append(prompt)
+        return "1: 2\n2: 0\n3: 1"
+
+    batch = [
+        "Hello this is your bank.",
+        {"transcript": "Your card payment was declined.", "total_logs": 1},
+        {"transcript": "Please verify your pin.", "medium_flags": 0},
+        "Buy a gift card and read me the verification code.",  # decided locally
+    ]
+    with patch("ScamAnalysisEngine._call_with_model_async", side_effect=fake_call):
+        labels = classify_calls(batch, pack_size=10)
+    assert labels == ["2", "0", "1", "2"]
+    assert len(prompts) == 1
+    assert "[3]" in prompts[0] and "[4]" not in prompts[0]
+
+
+def test_classify_calls_twice_reuses_no_dead_connections(fake_gemini):
+    # Each sync call runs its own event loop; pooled connections from the first
+    # call's (closed) loop must not be handed to the second
+    fake_gemini.behaviour = {"gemini-1.5-pro": (0.0, 200, "1: 1\n2: 0")}
+    batch = ["Hello this is your bank.", "Your card payment was declined."]
+    def pro_failures():
+        models = ScamAnalysisEngine.MODEL_ROUTER.snapshot()["models"]
+        return next(m["failures"] for m in models if m["name"] == "gemini-1.5-pro")
+
+    before = pro_failures()
+    assert classify_calls(batch, pack_size=10) == ["1", "0"]
+    assert classify_calls([b + " Again." for b in batch], pack_size=10) == ["1", "0"]
+    assert pro_failures() == before
+    assert fake_gemini.requests == ["gemini-1.5-pro", "gemini-1.5-pro"]
+
+
+def test_classify_calls_unlabelled_items_fall_back_individually():
+    calls = []
+
+    async def fake_call(prompt, model):
+        calls.append(prompt)
+        if len(calls) == 1:
+            return "1: 2\n2: banana"   # item 2 invalid
+        return "1"
+
+    with patch("ScamAnalysisEngine._call_with_model_async", side_effect=fake_call):
+        labels = classify_calls(["Hello this is your bank.", "Your card payment was declined."])
+    assert labels == ["2", "1"]
+    assert len(calls) == 2
+
+
+def test_classify_calls_respects_pack_size():
+    prompts = []
+
+    async def fake_call(prompt, model):
+        prompts.append(prompt)
+        return "\n".join(f"{i}: 1" for i in range(1, 4))
+
+    batch = [f"Hello this is your bank, reference {i}." for i in range(6)]
+    with patch("ScamAnalysisEngine._call_with_model_async", side_effect=fake_call):
+        assert classify_calls(batch, pack_size=3, concurrency=2) == ["1"] * 6
+    assert len(prompts) == 2
@@ -2,6 +2,7 @@
 Tests for blockchain/scam_registry.py — phone normalization, hash, and mocked Web3.
 """
 import os
+import time
 import pytest
 from unittest.mock import patch, MagicMock, PropertyMock
 
@@ -35,8 +36,6 @@ mock_w3.eth.get_transaction_count.return_value = 1
 mock_w3.eth.send_raw_transaction.return_value = b"\xab" * 32
 mock_w3.to_hex.return_value = "0x" + "ab" * 32
 mock_w3.to_wei.return_value = 1000000000
-# keccak returns different bytes per call so hash tests work
-mock_w3.keccak.side_effect = lambda text="": bytes([hash(text) % 256] * 32)
 
 mock_signed_tx = MagicMock()
 mock_signed_tx.raw_transaction = b"\xcd" * 32
@@ -48,7 +47,20 @@ mock_account.sign_transaction.return_value = mock_signed_tx
 with patch("web3.Web3", return_value=mock_w3):
     with patch("web3.Web3.HTTPProvider", return_value=MagicMock()):
         with patch("eth_account.Account.from_key", return_value=mock_account):
-            from blockchain.scam_registry import normalize_phone, hash_phone, get_caller_stats, submit_caller_report
+            from blockchain.scam_registry import (
+                normalize_phone, hash_phone, get_caller_stats, submit_caller_report,
+                caller_stats_metrics, CALLER_STATS_CACHE, queue_caller_report, report_status,
+                stop_report_queue, get_callers_stats, _sender,
+            )
+            from blockchain.registry_indexer import RegistryMirror
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    CALLER_STATS_CACHE.clear()
+    mock_contract.functions.getReport.reset_mock()
+    yield
+    CALLER_STATS_CACHE.clear()
 
 
 # ---------------------------------------------------------------------------
@@ -140,6 +152,11 @@ class TestGetCallerStats:
 # ---------------------------------------------------------------------------
 
 class TestSubmitCallerReport:
+    def setup_method(self):
+        _sender.reset_nonce()
+        mock_w3.eth.get_transaction_count.reset_mock()
+        mock_contract.functions.submitReport.return_value.estimate_gas.reset_mock()
+
     def _patched_get_web3(self):
         """Return mocked (w3, contract, account) with a fully mocked account."""
         return mock_w3, mock_contract, mock_account
@@ -155,3 +172,180 @@ class TestSubmitCallerReport:
             for level in ("Low", "Medium", "High"):
                 tx = submit_caller_report("+15551234567", level)
                 assert isinstance(tx, str)
+
+
+# ---------------------------------------------------------------------------
+# Caller-stats cache
+# ---------------------------------------------------------------------------
+
+class TestCallerStatsCache:
+    def _patched_get_web3(self):
+        return mock_w3, mock_contract, mock_account
+
+    def test_second_lookup_is_served_from_cache(self):
+        get_caller_stats("+15551234567")
+        get_caller_stats("555-123-4567")     # same number, different format
+        assert mock_contract.functions.getReport.return_value.call.call_count == 1
+        cache = caller_stats_metrics()["cache"]
+        assert cache["hits"] == 1 and cache["misses"] == 1
+
+    def test_cached_dict_is_not_shared(self):
+        get_caller_stats("+15551234567")["total_reports"] = 999
+        assert get_caller_stats("+15551234567")["total_reports"] == 5
+
+    def test_unknown_numbers_are_cached_with_shorter_ttl(self):
+        mock_contract.functions.getReport.return_value.call.return_value = (0, 0, 0)
+        with patch("blockchain.scam_registry.CALLER_STATS_NEGATIVE_TTL", 0):
+            get_caller_stats("+15550000000")
+            get_caller_stats("+15550000000")
+        assert mock_contract.functions.getReport.return_value.call.call_count == 2
+        mock_contract.functions.getReport.return_value.call.return_value = (5, 3, 1)
+
+    def test_rpc_errors_are_not_cached(self):
+        mock_contract.functions.getReport.return_value.call.side_effect = Exception("RPC error")
+        get_caller_stats("+15551234567")
+        mock_contract.functions.getReport.return_value.call.side_effect = None
+        assert get_caller_stats("+15551234567")["total_reports"] == 5
+        assert caller_stats_metrics()["rpc"]["errors"] >= 1
+
+    def test_own_report_updates_cached_stats(self):
+        get_caller_stats("+15551234567")
+        with patch("blockchain.scam_registry._get_web3", self._patched_get_web3):
+            submit_caller_report("+15551234567", "High")
+        stats = get_caller_stats("+15551234567")
+        assert stats == {"total_reports": 6, "high_risk_reports": 4, "medium_risk_reports": 1}
+        assert mock_contract.functions.getReport.return_value.call.call_count == 1
+
+    def test_metrics_report_rpc_latency(self):
+        get_caller_stats("+15551234567")
+        rpc = caller_stats_metrics()["rpc"]
+        assert rpc["calls"] >= 1
+        assert rpc["latency_ms"]["max"] >= 0
+
+
+# ---------------------------------------------------------------------------
+# Event-indexed mirror
+# ---------------------------------------------------------------------------
+
+class TestRegistryMirrorLookups:
+    def _indexer(self, fresh=True):
+        mirror = RegistryMirror()
+        mirror.apply_range(
+            [{"block_number": 10, "log_index": 0, "caller_hash": hash_phone("+15551234567"),
+              "risk_level": 2, "timestamp": 1700000000}],
+            {10: b"\x01" * 32}, checkpoint=10, keep_from=0,
+        )
+        indexer = MagicMock()
+        indexer.mirror = mirror
+        indexer.is_fresh.return_value = fresh
+        return indexer
+
+    def test_fresh_mirror_answers_without_rpc(self):
+        with patch("blockchain.scam_registry._indexer", self._indexer()):
+            stats = get_caller_stats("+15551234567")
+            unknown = get_caller_stats("+15550000000")
+        assert stats == {"total_reports": 1, "high_risk_reports": 1, "medium_risk_reports": 0}
+        assert unknown["total_reports"] == 0
+        assert mock_contract.functions.getReport.return_value.call.call_count == 0
+
+    def test_mirror_answers_are_counted_across_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        indexer = self._indexer()
+        indexer.stats.return_value = {}
+        with patch("blockchain.scam_registry._indexer", indexer):
+            before = caller_stats_metrics()["mirror"]["answers"]
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(get_caller_stats, ["+15551234567"] * 400))
+            assert caller_stats_metrics()["mirror"]["answers"] == before + 400
+
+    def test_stale_mirror_falls_back_to_rpc(self):
+        with patch("blockchain.scam_registry._indexer", self._indexer(fresh=False)):
+            stats = get_caller_stats("+15551234567")
+        assert stats["total_reports"] == 5
+        assert mock_contract.functions.getReport.return_value.call.call_count == 1
+
+
+# ---------------------------------------------------------------------------
+# Nonce / gas caching and the report queue
+# ---------------------------------------------------------------------------
+
+class TestReportSubmissionCaching:
+    def setup_method(self):
+        _sender.reset_nonce()
+        _sender._gas_limit = None
+        mock_w3.eth.get_transaction_count.reset_mock()
+        mock_contract.functions.submitReport.return_value.estimate_gas.reset_mock()
+        mock_contract.functions.submitReport.return_value.build_transaction.reset_mock()
+
+    def _patched_get_web3(self):
+        return mock_w3, mock_contract, mock_account
+
+    def test_nonce_is_tracked_locally(self):
+        with patch("blockchain.scam_registry._get_web3", self._patched_get_web3):
+            for _ in range(3):
+                submit_caller_report("+15551234567", "High")
+        assert mock_w3.eth.get_transaction_count.call_count == 1
+        nonces = [c.args[0]["nonce"] for c in
+                  mock_contract.functions.submitReport.return_value.build_transaction.call_args_list]
+        assert nonces == [1, 2, 3]
+
+    def test_gas_estimate_is_cached(self):
+        with patch("blockchain.scam_registry._get_web3", self._patched_get_web3):
+            submit_caller_report("+15551234567", "High")
+            submit_caller_report("+15551234567", "Low")
+        assert mock_contract.functions.submitReport.return_value.estimate_gas.call_count == 1
+
+    def test_failed_send_resyncs_nonce(self):
+        mock_w3.eth.send_raw_transaction.side_effect = Exception("rpc down")
+        try:
+            with patch("blockchain.scam_registry._get_web3", self._patched_get_web3):
+                with pytest.raises(Exception):
+                    submit_caller_report("+15551234567", "High")
+                mock_w3.eth.send_raw_transaction.side_effect = None
+                submit_caller_report("+15551234567", "High")
+        finally:
+            mock_w3.eth.send_raw_transaction.side_effect = None
+        assert mock_w3.eth.get_transaction_count.call_count == 2
+
+    def test_queue_caller_report_returns_immediately_and_sends_in_background(self):
+        with patch("blockchain.scam_registry._get_web3", self._patched_get_web3):
+            report_id = queue_caller_report("+15551234567", "High")
+            assert report_status(report_id)["status"] in ("pending", "signed", "sent")
+            deadline = time.time() + 2
+            while report_status(report_id)["status"] != "sent" and time.time() < deadline:
+                time.sleep(0.01)
+            assert report_status(report_id)["status"] == "sent"
+        stop_report_queue()
+
+    def test_queue_rejects_invalid_risk_level(self):
+        with pytest.raises(ValueError):
+            queue_caller_report("+15551234567", 7)
+
+
+# ---------------------------------------------------------------------------
+# Batch entry points
+# ---------------------------------------------------------------------------
+
+class TestBatchEntryPoints:
+    def _patched_get_web3(self):
+        return mock_w3, mock_contract, mock_account
+
+    def test_get_callers_stats_uses_one_call_for_misses(self):
+        a, b = hash_phone("+15551234567"), hash_phone("+15559999999")
+        mock_contract.functions.getReports.return_value.call.return_value = ([5, 0], [3, 0], [1, 0])
+        mock_contract.functions.getReports.reset_mock()
+        stats = get_callers_stats(["+15551234567", "+15559999999", "555-123-4567"])
+        assert [s["total_reports"] for s in stats] == [5, 0, 5]
+        mock_contract.functions.getReports.assert_called_once_with([a, b])
+
+        # Now cached: no further RPC
+        get_callers_stats(["+15551234567"])
+        assert mock_contract.functions.getReports.call_count == 1
+
+    def test_sign_batch_builds_submit_reports(self):
+        _sender.reset_nonce()
+        hashes = [b"\x01" * 32, b"\x02" * 32]
+        with patch("blockchain.scam_registry._get_web3", self._patched_get_web3):
+            tx_hash, raw_tx = _sender.sign_batch(hashes, [2, 1])
+        mock_contract.functions.submitReports.assert_any_call(hashes, [2, 1])
+        assert tx_hash.startswith("0x") and raw_tx.startswith("0x")
@@ -0,0 +1,105 @@
+"""
+Tests for script_index.py — embedding, similarity thresholds, storage and the approximate lists.
+"""
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import script_index
+from script_index import ScriptIndex, load_jsonl
+
+SEED = Path(__file__).parent.parent / "data" / "scam_scripts.jsonl"
+
+
+def _random_scripts(count, seed=0, words=40):
+    rng = np.random.default_rng(seed)
+    return [(" ".join(f"w{i}" for i in rng.integers(0, 5000, words)), "synthetic", "2") for _ in range(count)]
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    index = ScriptIndex(None)
+    index.add_many(load_jsonl(str(SEED)))
+    return index
+
+
+def test_ngrams_are_hashed_stably():
+    assert list(script_index._ngram_hashes("Gift card!")) == [zlib.crc32(g.encode()) for g in ("gift", "card", "gift card")]
+
+
+def test_embeddings_are_unit_length(seeded):
+    assert np.linalg.norm(seeded.embed("Your computer has a virus")) == pytest.approx(1.0, abs=1e-5)
+    assert not seeded.embed("!!!").any()
+    assert seeded.search("!!!") == []
+
+
+def test_seed_scripts_cover_the_common_scams():
+    assert {c for _, c, _ in load_jsonl(str(SEED))} >= {"irs", "bank-fraud", "tech-support", "gift-card"}
+
+
+def test_paraphrase_is_hinted_and_near_copy_decides(seeded):
+    paraphrase = seeded.nearest("hello this is microsoft support we found a virus on your computer, "
+                                "please install the remote access software")
+    assert paraphrase.category == "tech-support" and not paraphrase.decides
+
+    recording = seeded.nearest("this is an urgent message from the internal revenue service our records show "
+                               "you owe back taxes and a lawsuit has been filed against you")
+    assert recording.category == "irs" and recording.decides and recording.label == "2"
+
+    assert seeded.nearest("Hi mum, the train is running late, I'll be home around seven.") is None
+
+
+def test_stats_count_queries_and_outcomes():
+    index = ScriptIndex(None)
+    index.add("Buy gift cards and read me the numbers on the back of each card.", "gift-card")
+    index.nearest("buy gift cards and read me the numbers on the back of each card")
+    index.nearest("see you at football practice")
+    assert index.stats() == {"scripts": 1, "lists": 0, "queries": 2, "decided": 1, "hinted": 0}
+
+
+def test_index_persists_and_grows_on_disk(tmp_path):
+    first = ScriptIndex(str(tmp_path))
+    ids = first.add_many(_random_scripts(1500))  # past the initial 1024 rows
+    query = _random_scripts(1500)[1234][0]
+    assert first.search(query)[0].id == ids[1234]
+
+    second = ScriptIndex(str(tmp_path))
+    assert len(second) == 1500
+    assert isinstance(second._vectors.data, np.memmap)
+    hit = second.search(query)[0]
+    assert hit.id == ids[1234] and hit.similarity > 0.99  # embedded with the IDF weights of its time
+
+
+def test_approximate_search_and_incremental_inserts(tmp_path, monkeypatch):
+    monkeypatch.setattr(script_index, "SCRIPT_IVF_MIN", 300)
+    monkeypatch.setattr(script_index, "SCRIPT_NPROBE", 4)
+    scripts = _random_scripts(400)
+    index = ScriptIndex(str(tmp_path))
+    index.add_many(scripts)
+    assert index.stats()["lists"] == int(4 * 400 ** 0.5)
+    assert sum(len(rows) for rows in index._lists) == 2 * 400  # each script under two lists
+
+    found = [index.search(text)[0].id == i for i, (text, _, _) in enumerate(scripts[:100])]
+    assert all(found)
+
+    # Added after training: filed under the existing lists, and found after a restart too
+    late = index.add("Your grandson is in jail and needs bail money wired tonight.", "grandparent")
+    assert index.search("your grandson is in jail and needs bail money wired tonight")[0].id == late
+    reopened = ScriptIndex(str(tmp_path))
+    assert reopened.stats()["lists"] == index.stats()["lists"]
+    assert reopened.search("your grandson is in jail and needs bail money wired tonight")[0].id == late
+
+
+def test_rebuild_reembeds_with_current_weights():
+    index = ScriptIndex(None)
+    index.add("Send bitcoin to this wallet address today.", "crypto")
+    before = index._vectors.data[0].copy()
+    index.add_many([(text + " bitcoin", c, l) for text, c, l in _random_scripts(50, words=10)])
+    index.rebuild()
+    assert not np.allclose(before, index._vectors.data[0])
+    assert index.search("send bitcoin to this wallet address today")[0].similarity == pytest.approx(1.0, abs=1e-5)
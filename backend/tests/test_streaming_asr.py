@@ -0,0 +1,110 @@
+"""
+Tests for streaming_asr.py — utterance segmentation for streaming transcription.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from streaming_asr import StreamSegmenter, dedupe_overlap
+
+SR = 16000
+
+
+def _speech(seconds):
+    t = np.arange(int(SR * seconds)) / SR
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds):
+    return np.zeros(int(SR * seconds), dtype=np.float32)
+
+
+def _feed(segmenter, audio, frame_s=0.5):
+    out = []
+    step = int(SR * frame_s)
+    for i in range(0, len(audio), step):
+        out.extend(segmenter.push(audio[i:i + step]))
+    return out
+
+
+def test_utterance_is_finalised_at_the_pause():
+    seg = StreamSegmenter(silence_ms=600, partial_every_s=10, pre_roll_ms=0)
+    out = _feed(seg, np.concatenate([_silence(1.0), _speech(1.5), _silence(1.0)]))
+    finals = [s for s in out if s.kind == "final"]
+    assert len(finals) == 1
+    assert abs(finals[0].start - 1.0) <= 0.03
+    assert abs(finals[0].end - 2.5) <= 0.06
+    assert finals[0].overlap == 0
+    assert not seg.in_speech
+
+
+def test_partials_arrive_while_speaking():
+    seg = StreamSegmenter(partial_every_s=1.0)
+    out = _feed(seg, _speech(3.2))
+    partials = [s for s in out if s.kind == "partial"]
+    assert len(partials) == 3
+    # Each partial covers the whole utterance so far
+    assert [round(p.end - p.start) for p in partials] == [1, 2, 3]
+    assert all(p.index == 0 for p in partials)
+
+
+def test_first_partial_arrives_well_before_ten_seconds():
+    seg = StreamSegmenter()
+    elapsed = 0.0
+    for _ in range(20):
+        elapsed += 0.5
+        if seg.push(_speech(0.5)):
+            break
+    assert elapsed <= 1.5
+
+
+def test_long_utterance_is_cut_with_overlap():
+    seg = StreamSegmenter(max_segment_s=4, overlap_s=0.5, partial_every_s=100)
+    out = _feed(seg, np.concatenate([_speech(6), _silence(1)]))
+    finals = [s for s in out if s.kind == "final"]
+    assert len(finals) == 2
+    assert finals[1].overlap == 0.5
+    assert finals[1].start == pytest.approx(finals[0].end - 0.5)
+    assert [f.index for f in finals] == [0, 1]
+
+
+def test_flush_finalises_utterance_in_progress():
+    seg = StreamSegmenter(partial_every_s=100)
+    assert _feed(seg, _speech(1.0)) == []
+    final = seg.flush()
+    assert final.kind == "final" and final.end == 1.0
+    assert seg.flush() is None
+
+
+def test_background_noise_is_not_speech():
+    rng = np.random.default_rng(0)
+    noise = (0.02 * rng.standard_normal(SR * 3)).astype(np.float32)
+    seg = StreamSegmenter(vad_threshold=0.01)
+    # The first frames set the noise floor; steady noise after that never opens an utterance
+    out = _feed(seg, noise)
+    assert not [s for s in out if s.kind == "final"]
+
+
+def test_pre_roll_keeps_speech_onset():
+    seg = StreamSegmenter(pre_roll_ms=210, partial_every_s=100)
+    out = _feed(seg, np.concatenate([_silence(1.0), _speech(1.0), _silence(1.0)]))
+    assert out[0].start <= 1.0 - 0.2
+
+
+def test_dedupe_overlap():
+    assert dedupe_overlap("please buy the gift", "the gift cards today") == "cards today"
+    assert dedupe_overlap("Send it now.", "Now, the code") == "the code"
+    assert dedupe_overlap("hello there", "completely new words") == "completely new words"
+    assert dedupe_overlap("", "anything") == "anything"
+
+
+def test_non_speech_is_counted_as_skipped():
+    seg = StreamSegmenter(silence_ms=600, partial_every_s=10, pre_roll_ms=0)
+    _feed(seg, np.concatenate([_silence(3.0), _speech(1.0), _silence(2.0)]))
+    assert seg.consumed_samples == 6 * SR
+    # Everything but the utterance (and its frame alignment) was dropped
+    assert abs(seg.skipped_samples / SR - 5.0) <= 0.06
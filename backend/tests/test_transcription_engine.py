@@ -1,6 +1,7 @@
 """
 Tests for TranscriptionEngine.py
 """
+import asyncio
 import os
 import struct
 import tempfile
@@ -10,16 +11,19 @@ from unittest.mock import patch, MagicMock
 
 
 # ---------------------------------------------------------------------------
-# Mock whisper before importing the module
+# Mock whisper: the model is loaded on first use, so load the mock now
 # ---------------------------------------------------------------------------
 
 mock_model = MagicMock()
 mock_model.transcribe.return_value = {"text": "  Hello, this is a test transcription.  "}
 
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import TranscriptionEngine
+from TranscriptionEngine import transcribe, transcribe_file, transcribe_file_async, TranscriptionQueueFull
+
 with patch("whisper.load_model", return_value=mock_model):
-    import sys
-    sys.path.insert(0, str(Path(__file__).parent.parent))
-    from TranscriptionEngine import transcribe, transcribe_file
+    TranscriptionEngine.get_model()
 
 
 # ---------------------------------------------------------------------------
@@ -28,7 +32,7 @@ with patch("whisper.load_model", return_value=mock_model):
 
 def test_transcribe_file_returns_stripped_text(tmp_path):
     wav = tmp_path / "sample.wav"
-    wav.write_bytes(_minimal_wav())
+    wav.write_bytes(_speech_wav())
 
     result = transcribe_file(str(wav))
     assert result == "Hello, this is a test transcription."
@@ -37,7 +41,7 @@ def test_transcribe_file_returns_stripped_text(tmp_path):
 def test_transcribe_file_strips_whitespace(tmp_path):
     mock_model.transcribe.return_value = {"text": "\n  Extra whitespace.\n  "}
     wav = tmp_path / "sample.wav"
-    wav.write_bytes(_minimal_wav())
+    wav.write_bytes(_speech_wav())
 
     result = transcribe_file(str(wav))
     assert result == "Extra whitespace."
@@ -53,7 +57,7 @@ def test_transcribe_finds_wav(tmp_path):
 
     with patch("TranscriptionEngine.TMP_DIR", tmp_path):
         wav = tmp_path / "abc123.wav"
-        wav.write_bytes(_minimal_wav())
+        wav.write_bytes(_speech_wav())
         result = transcribe("abc123")
 
     assert result == "found wav"
@@ -63,12 +67,14 @@ def test_transcribe_finds_m4a(tmp_path):
     """transcribe() should find a .m4a file when .wav is absent."""
     mock_model.transcribe.return_value = {"text": "found m4a"}
 
-    with patch("TranscriptionEngine.TMP_DIR", tmp_path):
+    with patch("TranscriptionEngine.TMP_DIR", tmp_path), \
+         patch("whisper.load_audio", return_value=_tone(1.0)) as mock_load:
         m4a = tmp_path / "xyz999.m4a"
         m4a.write_bytes(b"\x00" * 64)
         result = transcribe("xyz999")
 
     assert result == "found m4a"
+    assert mock_load.call_args[0][0].endswith("xyz999.m4a")  # non-WAV input goes through ffmpeg
 
 
 def test_transcribe_raises_when_missing(tmp_path):
@@ -77,14 +83,215 @@ def test_transcribe_raises_when_missing(tmp_path):
             transcribe("does-not-exist")
 
 
+# ---------------------------------------------------------------------------
+# VAD pre-stage — only speech reaches Whisper
+# ---------------------------------------------------------------------------
+
+def test_silent_file_skips_whisper(tmp_path):
+    mock_model.transcribe.reset_mock()
+    wav = tmp_path / "silence.wav"
+    wav.write_bytes(_speech_wav(silence_s=5.0, speech_s=0.0))
+
+    assert transcribe_file(str(wav)) == ""
+    mock_model.transcribe.assert_not_called()
+
+
+def test_leading_and_trailing_silence_trimmed(tmp_path):
+    mock_model.transcribe.return_value = {"text": "hello"}
+    wav = tmp_path / "padded.wav"
+    wav.write_bytes(_speech_wav(silence_s=4.0, speech_s=1.0))
+
+    assert transcribe_file(str(wav)) == "hello"
+    sent = mock_model.transcribe.call_args[0][0]
+    # 1 s of speech plus padding, out of 9 s of audio
+    assert 16000 <= len(sent) <= 16000 * 1.6
+
+
+# ---------------------------------------------------------------------------
+# transcribe_file_async()  — worker pool + admission queue
+# ---------------------------------------------------------------------------
+
+def test_transcribe_file_async_runs_on_pool(tmp_path):
+    mock_model.transcribe.return_value = {"text": " pooled "}
+    wav = tmp_path / "sample.wav"
+    wav.write_bytes(_speech_wav())
+
+    result = asyncio.run(transcribe_file_async(str(wav)))
+    assert result == "pooled"
+    assert TranscriptionEngine.queue_stats()["running"] == 0
+
+
+def test_long_file_is_split_and_stitched(tmp_path):
+    import threading
+    import numpy as np
+    from audio_chunks import split_at_silence
+    from vad import trim_silence
+
+    # 7 s of speech, 1 s pause, repeated: longer than one Whisper window
+    audio = np.tile(np.concatenate([_tone(7.0), np.zeros(16000, dtype=np.float32)]), 10)
+    wav = tmp_path / "long.wav"
+    wav.write_bytes(_wav(audio))
+    expected = len(split_at_silence(trim_silence(TranscriptionEngine.load_audio_file(str(wav)))))
+    lock = threading.Lock()
+    calls = []
+
+    def fake_transcribe(samples):
+        with lock:
+            calls.append(len(samples))
+            return f"piece{len(calls)}"
+
+    with patch("TranscriptionEngine.transcribe_audio", side_effect=fake_transcribe):
+        result = asyncio.run(transcribe_file_async(str(wav)))
+
+    assert expected > 1
+    assert len(calls) == expected
+    assert all(n <= 16000 * 30 for n in calls)
+    # Pieces may finish in any order; each one's text appears once in the stitched result
+    assert sorted(result.split()) == sorted(f"piece{i}" for i in range(1, expected + 1))
+
+
+def test_long_file_pieces_in_flight_are_bounded(tmp_path):
+    import threading
+    import time
+    import numpy as np
+
+    audio = np.tile(np.concatenate([_tone(7.0), np.zeros(16000, dtype=np.float32)]), 20)
+    wav = tmp_path / "long.wav"
+    wav.write_bytes(_wav(audio))
+    lock = threading.Lock()
+    running = peak = 0
+
+    def slow_transcribe(samples):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return "x"
+
+    with patch("TranscriptionEngine.transcribe_audio", side_effect=slow_transcribe), \
+         patch("TranscriptionEngine.CHUNK_PARALLEL", 2):
+        asyncio.run(transcribe_file_async(str(wav)))
+
+    assert peak <= 2
+
+
+def test_transcribe_file_async_rejects_when_full(tmp_path):
+    with patch("TranscriptionEngine._pending", TranscriptionEngine.MAX_WORKERS + TranscriptionEngine.MAX_QUEUE):
+        with pytest.raises(TranscriptionQueueFull):
+            asyncio.run(transcribe_file_async(str(tmp_path / "x.wav")))
+
+
+# ---------------------------------------------------------------------------
+# Lazy model loading and warm-up
+# ---------------------------------------------------------------------------
+
+def test_import_loads_neither_model_nor_torch():
+    import subprocess
+    code = ("import sys, TranscriptionEngine; "
+            "assert TranscriptionEngine.MODEL is None; "
+            "assert 'torch' not in sys.modules and 'whisper' not in sys.modules")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent.parent,
+                          capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+
+
+def test_concurrent_first_use_loads_the_model_once():
+    import queue
+    import threading
+    import time
+
+    loads = []
+
+    def slow_load(*args, **kwargs):
+        loads.append(args)
+        time.sleep(0.1)
+        return MagicMock()
+
+    with patch("TranscriptionEngine.MODEL", None), \
+         patch("TranscriptionEngine._idle_models", queue.LifoQueue()), \
+         patch("TranscriptionEngine._model_count", 0), \
+         patch("TranscriptionEngine._warmed_up", threading.Event()), \
+         patch("asr_backends.load_backend", side_effect=slow_load):
+        assert not TranscriptionEngine.is_ready()
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(TranscriptionEngine.get_model())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(loads) == 1
+        assert all(m is models[0] for m in models)
+        assert TranscriptionEngine.is_ready()
+        assert TranscriptionEngine.model_stats()["load_seconds"] >= 0.1
+
+
+def test_warm_up_loads_model_and_marks_ready():
+    import queue
+    import threading
+
+    with patch("TranscriptionEngine.MODEL", None), \
+         patch("TranscriptionEngine._idle_models", queue.LifoQueue()), \
+         patch("TranscriptionEngine._model_count", 0), \
+         patch("TranscriptionEngine._warmed_up", threading.Event()), \
+         patch("asr_backends.load_backend", return_value=MagicMock()) as load:
+        TranscriptionEngine.warm_up()
+        assert load.call_count == 1
+        assert TranscriptionEngine.model_stats()["loaded"] is True
+        assert TranscriptionEngine.is_ready()
+
+
+# ---------------------------------------------------------------------------
+# _BatchScheduler — micro-batching of short clips
+# ---------------------------------------------------------------------------
+
+def test_batch_scheduler_decodes_concurrent_clips_together():
+    import numpy as np
+    import torch
+
+    mock_model.dims.n_mels = 80
+    mock_model.device = torch.device("cpu")
+    mock_model.decode.side_effect = lambda mel, options: [
+        MagicMock(text=f" clip {i} ") for i in range(mel.shape[0])
+    ]
+    scheduler = TranscriptionEngine._BatchScheduler(window_s=0.2, max_size=8)
+
+    futures = [scheduler.submit(np.zeros(16000, dtype=np.float32)) for _ in range(3)]
+    texts = [f.result(timeout=10) for f in futures]
+
+    assert texts == ["clip 0", "clip 1", "clip 2"]
+    assert mock_model.decode.call_args[0][0].shape == (3, 80, 3000)
+    stats = scheduler.stats()
+    assert stats["batch_size_histogram"] == {3: 1}
+    assert stats["items"] == 3
+    assert stats["latency_ms"]["p95"] is not None
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _minimal_wav() -> bytes:
+def _tone(seconds: float):
+    import numpy as np
+    t = np.arange(int(16000 * seconds)) / 16000
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _speech_wav(silence_s: float = 0.0, speech_s: float = 1.0) -> bytes:
+    """16 kHz mono PCM16 WAV: a tone standing in for speech, with `silence_s` of silence either side."""
+    import numpy as np
+    gap = np.zeros(int(16000 * silence_s), dtype=np.float32)
+    return _wav(np.concatenate([gap, _tone(speech_s), gap]))
+
+
+def _wav(samples) -> bytes:
+    pcm = (samples * 32767).astype("<i2").tobytes()
     return struct.pack(
         "<4sI4s4sIHHIIHH4sI",
-        b"RIFF", 36, b"WAVE", b"fmt ",
+        b"RIFF", 36 + len(pcm), b"WAVE", b"fmt ",
         16, 1, 1, 16000, 32000, 2, 16,
-        b"data", 0,
-    )
+        b"data", len(pcm),
+    ) + pcm
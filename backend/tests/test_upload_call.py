@@ -2,6 +2,7 @@
 Tests for the main FastAPI endpoints in uploadCall.py.
 Run with: pytest backend/tests/ -v
 """
+import asyncio
 import io
 import json
 import pytest
@@ -9,16 +10,29 @@ from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 
 # Patch heavy deps before importing the app
+with patch("web3.Web3"):
+    import sys, os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    from uploadCall import app
+
+# Models are loaded on first use; load mocks now
+import ScamAnalysisEngine
+import TranscriptionEngine
+if ScamAnalysisEngine.client is None:
+    ScamAnalysisEngine.client = MagicMock()
 with patch("whisper.load_model", return_value=MagicMock()):
-    with patch("google.genai.Client"):
-        with patch("web3.Web3"):
-            import sys, os
-            sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-            from uploadCall import app
+    TranscriptionEngine.get_model()
 
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def fresh_content_index():
+    # The tests upload the same bytes; each starts without remembered transcripts
+    import content_index
+    content_index.clear()
+
+
 # ---------------------------------------------------------------------------
 # Health check
 # ---------------------------------------------------------------------------
@@ -30,6 +44,45 @@ def test_health_check():
     assert data.get("ok") is True or data.get("status") == "ok"
 
 
+def test_ready_is_503_until_models_are_loaded():
+    with patch("uploadCall.transcription_ready", return_value=False):
+        resp = client.get("/api/ready")
+    assert resp.status_code == 503
+    assert resp.json()["ready"] is False
+
+    with patch("uploadCall.transcription_ready", return_value=False), patch("uploadCall.WARM_UP", False):
+        assert client.get("/api/ready").status_code == 200  # no warm-up: models load on first use
+
+
+def test_startup_warm_up_makes_service_ready():
+    import time
+    with patch("uploadCall._warm_up", {"done": False, "seconds": None, "error": None}), \
+         patch("uploadCall.warm_up_transcription") as warm_up:
+        with TestClient(app) as c:
+            for _ in range(100):
+                body = c.get("/api/ready").json()
+                if body["warm_up"]["done"]:
+                    break
+                time.sleep(0.01)
+    assert body["warm_up"]["done"] is True
+    assert body["ready"] is True
+    warm_up.assert_called_once()
+
+
+def test_model_health_endpoint():
+    resp = client.get("/api/models")
+    assert resp.status_code == 200
+    assert [m["name"] for m in resp.json()["models"]][0] == "gemini-1.5-pro"
+
+
+def test_metrics_endpoint():
+    resp = client.get("/api/metrics")
+    assert resp.status_code == 200
+    assert "queue" in resp.json()["transcription"]
+    assert "hit_rate" in resp.json()["caller_stats"]["cache"]
+    assert "seconds_saved" in resp.json()["transcription"]["vad"]
+
+
 # ---------------------------------------------------------------------------
 # Upload endpoint
 # ---------------------------------------------------------------------------
@@ -48,12 +101,15 @@ def test_upload_valid_wav():
 
 
 def test_upload_valid_mp3():
-    resp = client.post(
-        "/api/calls/upload",
-        files={"file": ("test.mp3", io.BytesIO(b"\xff\xfb" + b"\x00" * 100), "audio/mpeg")},
-    )
+    # Without ffmpeg the upload is kept as is, to be decoded at analysis time
+    with patch("ingest.FFMPEG_BIN", "ffmpeg-not-installed"):
+        resp = client.post(
+            "/api/calls/upload",
+            files={"file": ("test.mp3", io.BytesIO(b"\xff\xfb" + b"\x00" * 100), "audio/mpeg")},
+        )
     assert resp.status_code == 200
     assert "call_id" in resp.json()
+    assert resp.json()["filename"].endswith(".mp3")
 
 
 def test_upload_invalid_format():
@@ -64,8 +120,49 @@ def test_upload_invalid_format():
     assert resp.status_code == 400
 
 
+def test_upload_format_comes_from_content_not_name():
+    resp = client.post("/api/calls/upload", files={"file": ("fake.wav", io.BytesIO(b"not audio"), "audio/wav")})
+    assert resp.status_code == 400
+
+    resp = client.post("/api/calls/upload",
+                       files={"file": ("recording.bin", io.BytesIO(_tone_wav(1.0)), "application/octet-stream")})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["format"] == "wav"
+    assert body["duration_s"] == pytest.approx(1.0)
+
+
+def test_upload_is_stored_as_16k_pcm_artifact():
+    from artifact_store import get_store
+    from audio_decode import decode_wav_pcm16
+    resp = client.post("/api/calls/upload", files={"file": ("call.wav", io.BytesIO(_tone_wav(0.5)), "audio/wav")})
+    call_id = resp.json()["call_id"]
+    entry = get_store().get(call_id)
+    assert entry["format"] == "wav" and entry["duration_s"] == pytest.approx(0.5)
+    artifact = get_store().local_path(call_id)
+    assert artifact.name == resp.json()["filename"] == f"{call_id}.wav"
+    assert len(decode_wav_pcm16(artifact.read_bytes())) == 8000
+
+
+def test_analyse_finds_hand_placed_legacy_audio():
+    with patch("uploadCall.legacy_audio", return_value="tmp/Highrisk.m4a"), \
+         patch("uploadCall.transcribe_async", return_value=MOCK_TRANSCRIPT), \
+         patch("uploadCall.classify_call_async", return_value="2"):
+        resp = client.post("/api/calls/Highrisk/analyse?wait=true")
+    assert resp.status_code == 200
+
+
+def test_upload_undecodable_audio_is_rejected(tmp_path):
+    failing = tmp_path / "ffmpeg"
+    failing.write_text(f"#!{sys.executable}\nimport sys\nsys.stdin.buffer.read()\nsys.stderr.write('Invalid data')\nsys.exit(1)\n")
+    failing.chmod(0o755)
+    with patch("ingest.FFMPEG_BIN", str(failing)):
+        resp = client.post("/api/calls/upload", files={"file": ("x.ogg", io.BytesIO(b"OggS" + b"\x00" * 100), "audio/ogg")})
+    assert resp.status_code == 415
+
+
 def test_upload_oversized_file():
-    fifty_mb_plus = b"\x00" * (51 * 1024 * 1024)
+    fifty_mb_plus = _minimal_wav() + b"\x00" * (51 * 1024 * 1024)
     resp = client.post(
         "/api/calls/upload",
         files={"file": ("big.wav", io.BytesIO(fifty_mb_plus), "audio/wav")},
@@ -82,10 +179,10 @@ MOCK_STATS = {"total_reports": 3, "medium_risk_reports": 1, "high_risk_reports":
 MOCK_RISK_INT = 2  # High
 
 
-@patch("uploadCall.submit_caller_report", return_value="0xdeadbeef")
-@patch("uploadCall.transcribe")
+@patch("uploadCall.queue_caller_report", return_value=7)
+@patch("uploadCall.transcribe_async")
 @patch("uploadCall.get_caller_stats", return_value=MOCK_STATS)
-@patch("uploadCall.classify_call", return_value="2")
+@patch("uploadCall.classify_call_async", return_value="2")
 def test_analyse_high_risk(mock_classify, mock_stats, mock_transcribe, mock_submit):
     mock_transcribe.return_value = MOCK_TRANSCRIPT
 
@@ -98,7 +195,7 @@ def test_analyse_high_risk(mock_classify, mock_stats, mock_transcribe, mock_subm
     call_id = up.json()["call_id"]
 
     resp = client.post(
-        f"/api/calls/{call_id}/analyse",
+        f"/api/calls/{call_id}/analyse?wait=true",
         json={"phone_number": "+15551234567"},
     )
     assert resp.status_code == 200
@@ -107,12 +204,14 @@ def test_analyse_high_risk(mock_classify, mock_stats, mock_transcribe, mock_subm
     assert data["scam_score"] == pytest.approx(0.90)
     assert "transcript" in data
     assert "advice" in data
+    assert data["report_id"] == 7
+    mock_submit.assert_called_once_with("+15551234567", 2)
 
 
-@patch("uploadCall.submit_caller_report", return_value="0xdeadbeef")
-@patch("uploadCall.transcribe")
+@patch("uploadCall.queue_caller_report", return_value=7)
+@patch("uploadCall.transcribe_async")
 @patch("uploadCall.get_caller_stats", return_value=MOCK_STATS)
-@patch("uploadCall.classify_call", return_value="0")
+@patch("uploadCall.classify_call_async", return_value="0")
 def test_analyse_low_risk(mock_classify, mock_stats, mock_transcribe, mock_submit):
     mock_transcribe.return_value = "Hello, this is your bank calling about your account."
 
@@ -123,16 +222,16 @@ def test_analyse_low_risk(mock_classify, mock_stats, mock_transcribe, mock_submi
     )
     call_id = up.json()["call_id"]
 
-    resp = client.post(f"/api/calls/{call_id}/analyse", json={"phone_number": "+15559999999"})
+    resp = client.post(f"/api/calls/{call_id}/analyse?wait=true", json={"phone_number": "+15559999999"})
     assert resp.status_code == 200
     data = resp.json()
     assert data["risk_level"] == "Low"
     assert data["scam_score"] == pytest.approx(0.15)
 
 
-@patch("uploadCall.transcribe")
+@patch("uploadCall.transcribe_async")
 @patch("uploadCall.get_caller_stats", return_value={"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0})
-@patch("uploadCall.classify_call", return_value="1")
+@patch("uploadCall.classify_call_async", return_value="1")
 def test_analyse_no_phone_number(mock_classify, mock_stats, mock_transcribe):
     """Omitting phone_number should still work — stats default to zero."""
     mock_transcribe.return_value = "You may have won a prize."
@@ -144,28 +243,201 @@ def test_analyse_no_phone_number(mock_classify, mock_stats, mock_transcribe):
     )
     call_id = up.json()["call_id"]
 
-    resp = client.post(f"/api/calls/{call_id}/analyse")
+    resp = client.post(f"/api/calls/{call_id}/analyse?wait=true")
     assert resp.status_code == 200
     assert resp.json()["risk_level"] == "Medium"
 
 
-@patch("uploadCall.transcribe", side_effect=FileNotFoundError("No audio found"))
+@patch("uploadCall.transcribe_async", side_effect=FileNotFoundError("No audio found"))
 def test_analyse_missing_audio(mock_transcribe):
     resp = client.post("/api/calls/nonexistent-id/analyse")
     assert resp.status_code == 404
 
 
+@patch("uploadCall.queue_caller_report", return_value=7)
+@patch("uploadCall.transcribe_async", return_value=MOCK_TRANSCRIPT)
+@patch("uploadCall.get_caller_stats", return_value=MOCK_STATS)
+@patch("uploadCall.classify_call_async", return_value="2")
+def test_analyse_async_job(mock_classify, mock_stats, mock_transcribe, mock_submit):
+    """By default the job id is returned immediately; the result is fetched via the jobs API."""
+    with TestClient(app) as c:
+        up = c.post("/api/calls/upload", files={"file": ("test.wav", io.BytesIO(_minimal_wav()), "audio/wav")})
+        call_id = up.json()["call_id"]
+
+        resp = c.post(f"/api/calls/{call_id}/analyse", json={"phone_number": "+15551234567"})
+        assert resp.status_code == 202
+        job_id = resp.json()["job_id"]
+
+        with c.stream("GET", f"/api/jobs/{job_id}/events") as stream:
+            events = [json.loads(line[len("data: "):]) for line in stream.iter_lines() if line.startswith("data: ")]
+        assert events[-1]["status"] == "done"
+
+        job = c.get(f"/api/jobs/{job_id}").json()
+        assert set(job["stages"]) == {"transcribing", "classifying", "reporting"}
+
+        result = c.get(f"/api/jobs/{job_id}/result")
+        assert result.status_code == 200
+        assert result.json()["risk_level"] == "High"
+
+
+@patch("uploadCall.get_caller_stats", return_value=MOCK_STATS)
+@patch("uploadCall.classify_call_async", return_value="0")
+def test_analyse_wait_is_capped(mock_classify, mock_stats):
+    """wait=true holds the request at most ANALYSE_WAIT_S, then answers 202 and the job carries on."""
+    async def slow_transcription(call_id, slot=None):
+        await asyncio.sleep(0.3)
+        return MOCK_TRANSCRIPT
+
+    with TestClient(app) as c, patch("uploadCall.transcribe_async", slow_transcription), \
+         patch("uploadCall.ANALYSE_WAIT_S", 0.05):
+        call_id = c.post("/api/calls/upload", files={"file": ("t.wav", io.BytesIO(_minimal_wav()), "audio/wav")}).json()["call_id"]
+        resp = c.post(f"/api/calls/{call_id}/analyse?wait=true")
+        assert resp.status_code == 202
+        assert resp.headers["Location"] == f"/api/jobs/{resp.json()['job_id']}"
+        with c.stream("GET", f"/api/jobs/{resp.json()['job_id']}/events") as stream:
+            events = [json.loads(line[len("data: "):]) for line in stream.iter_lines() if line.startswith("data: ")]
+        assert events[-1]["status"] == "done" and events[-1]["result"]["risk_level"] == "Low"
+
+
+def test_get_unknown_job_returns_404():
+    assert client.get("/api/jobs/does-not-exist").status_code == 404
+
+
+def test_get_unknown_report_returns_404():
+    assert client.get("/api/reports/999999").status_code == 404
+
+
+@patch("uploadCall.transcribe_async")
+def test_analyse_queue_full_returns_429(mock_transcribe):
+    """A full transcription queue is refused by the endpoint itself, before any job is created."""
+    import TranscriptionEngine
+    wav = _minimal_wav()
+    up = client.post(
+        "/api/calls/upload",
+        files={"file": ("test.wav", io.BytesIO(wav), "audio/wav")},
+    )
+    call_id = up.json()["call_id"]
+
+    with patch("TranscriptionEngine._pending", TranscriptionEngine.MAX_WORKERS + TranscriptionEngine.MAX_QUEUE), \
+         patch("uploadCall.job_runner.submit") as submit:
+        resp = client.post(f"/api/calls/{call_id}/analyse")
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "5"
+    submit.assert_not_called()
+    mock_transcribe.assert_not_called()
+
+
+@patch("uploadCall.get_caller_stats", return_value=MOCK_STATS)
+@patch("uploadCall.classify_call_async", return_value="0")
+def test_analyse_slot_is_handed_to_transcription_and_released(mock_classify, mock_stats):
+    import TranscriptionEngine
+    seen = []
+
+    async def fake_transcribe(call_id, slot=None):
+        seen.append((slot, TranscriptionEngine.queue_stats()["running"]))
+        return MOCK_TRANSCRIPT
+
+    up = client.post("/api/calls/upload", files={"file": ("t.wav", io.BytesIO(_minimal_wav()), "audio/wav")}).json()
+    with patch("uploadCall.transcribe_async", fake_transcribe):
+        assert client.post(f"/api/calls/{up['call_id']}/analyse?wait=true").status_code == 200
+    assert seen[0][0] is not None and seen[0][1] == 1
+    assert TranscriptionEngine.queue_stats()["running"] == 0
+
+
+@patch("uploadCall.get_caller_stats", return_value=MOCK_STATS)
+@patch("uploadCall.classify_call_async", return_value="2")
+@patch("uploadCall.transcribe_async", return_value=MOCK_TRANSCRIPT)
+def test_reupload_reuses_transcript_and_label(mock_transcribe, mock_classify, mock_stats):
+    import content_index
+    wav = _tone_wav(0.5)
+    first = client.post("/api/calls/upload", files={"file": ("a.wav", io.BytesIO(wav), "audio/wav")}).json()
+    client.post(f"/api/calls/{first['call_id']}/analyse?wait=true")
+    mock_transcribe.assert_called_once()
+
+    with patch("uploadCall.cached_label", return_value="2"):
+        second = client.post("/api/calls/upload", files={"file": ("b.wav", io.BytesIO(wav), "audio/wav")}).json()
+        resp = client.post(f"/api/calls/{second['call_id']}/analyse?wait=true")
+    assert second["call_id"] != first["call_id"]
+    assert resp.json()["transcript"] == MOCK_TRANSCRIPT and resp.json()["risk_level"] == "High"
+    mock_transcribe.assert_called_once()
+    mock_classify.assert_called_once()
+    assert content_index.stats()["avoided"] == {"transcriptions": 1, "audio_seconds": 0.5, "classifications": 1}
+
+
+@patch("uploadCall.get_caller_stats", return_value=MOCK_STATS)
+@patch("uploadCall.classify_call_async", return_value="2")
+@patch("uploadCall.transcribe_async", return_value=MOCK_TRANSCRIPT)
+def test_same_audio_in_different_bytes_matches_on_pcm(mock_transcribe, mock_classify, mock_stats):
+    wav = _tone_wav(0.5)
+    retagged = wav + b"LIST\x04\x00\x00\x00abcd"  # same samples, a metadata chunk after them
+    with patch("uploadCall.cached_label", return_value=None):
+        for data in (wav, retagged):
+            up = client.post("/api/calls/upload", files={"file": ("a.wav", io.BytesIO(data), "audio/wav")}).json()
+            client.post(f"/api/calls/{up['call_id']}/analyse?wait=true")
+    mock_transcribe.assert_called_once()
+    assert mock_classify.call_count == 2  # no label without a model call, so the model is asked again
+
+
+@pytest.fixture
+def known_scam():
+    """An index holding one known scam recording; yields its 16 kHz samples."""
+    from fingerprint import FingerprintIndex
+    from tests.test_fingerprint import speech_like
+    audio = speech_like(8, seed=1)
+    index = FingerprintIndex(None)
+    index.add("gift-card robocall", audio)
+    with patch("fingerprint._index", index):
+        yield audio
+
+
+def _samples_wav(audio) -> bytes:
+    return _minimal_wav(num_samples=len(audio))[:44] + (audio * 32767).astype("<i2").tobytes()
+
+
+@patch("uploadCall.queue_caller_report", return_value=7)
+@patch("uploadCall.classify_call_async")
+@patch("uploadCall.transcribe_async")
+def test_known_scam_recording_is_high_without_transcription(mock_transcribe, mock_classify, mock_submit, known_scam):
+    wav = _samples_wav(known_scam[RATE_16K * 2:] * 0.5)  # a quieter copy, missing its first two seconds
+    call_id = client.post("/api/calls/upload", files={"file": ("x.wav", io.BytesIO(wav), "audio/wav")}).json()["call_id"]
+
+    match = client.get(f"/api/calls/{call_id}/fingerprint").json()["match"]
+    assert match["name"] == "gift-card robocall" and match["strong"] is True
+    assert match["offset_s"] == pytest.approx(2.0, abs=0.02)
+
+    resp = client.post(f"/api/calls/{call_id}/analyse?wait=true", json={"phone_number": "+15551234567"})
+    data = resp.json()
+    assert data["risk_level"] == "High" and data["fingerprint"]["name"] == "gift-card robocall"
+    mock_transcribe.assert_not_called()
+    mock_classify.assert_not_called()
+    mock_submit.assert_called_once_with("+15551234567", 2)
+
+
+@patch("uploadCall.get_caller_stats", return_value=MOCK_STATS)
+@patch("uploadCall.classify_call_async", return_value="0")
+@patch("uploadCall.transcribe_async", return_value="Hi, it's me.")
+def test_other_recordings_are_analysed_as_usual(mock_transcribe, mock_classify, mock_stats, known_scam):
+    from tests.test_fingerprint import speech_like
+    wav = _samples_wav(speech_like(8, seed=7))
+    call_id = client.post("/api/calls/upload", files={"file": ("x.wav", io.BytesIO(wav), "audio/wav")}).json()["call_id"]
+    data = client.post(f"/api/calls/{call_id}/analyse?wait=true").json()
+    assert data["risk_level"] == "Low" and data["fingerprint"] is None
+    mock_transcribe.assert_called_once()
+
+
 # ---------------------------------------------------------------------------
 # WebSocket endpoint — basic connection test
 # ---------------------------------------------------------------------------
 
-@patch("live_call_ws.transcribe_file", return_value="Your account has been compromised.")
-@patch("live_call_ws.classify_call", return_value="2")
+@patch("live_call_ws.transcribe_audio_async", return_value="Your account has been compromised.")
+@patch("live_call_ws.LiveClassifierSession.add_chunk_async", return_value="2")
 @patch("live_call_ws.get_caller_stats", return_value={"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0})
 def test_websocket_live_call(mock_stats, mock_classify, mock_transcribe):
     with client.websocket_connect("/ws/live-call?phone_number=%2B15551234567") as ws:
-        ws.send_bytes(_minimal_wav())
+        ws.send_bytes(_tone_wav(1.0))
         data = ws.receive_json()
+    # 16 kHz mono PCM16 is decoded in memory and passed to Whisper as samples
+    assert mock_transcribe.call_args[0][0].shape == (16000,)
     assert "chunk" in data
     assert data["chunk"] == 1
     assert "risk_level" in data
@@ -174,15 +446,140 @@ def test_websocket_live_call(mock_stats, mock_classify, mock_transcribe):
     assert 0.0 <= data["scam_score"] <= 1.0
 
 
+@patch("live_call_ws.transcribe_audio_async", return_value="hello")
+@patch("live_call_ws.LiveClassifierSession.add_chunk_async", return_value="0")
+def test_websocket_caller_lookup_runs_off_the_event_loop(mock_classify, mock_transcribe):
+    import asyncio
+    on_loop = []
+
+    def lookup(phone):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return {"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0}
+
+    with patch("live_call_ws.get_caller_stats", side_effect=lookup):
+        with client.websocket_connect("/ws/live-call?phone_number=%2B15551234567") as ws:
+            ws.send_bytes(_tone_wav(1.0))
+            ws.receive_json()
+    assert on_loop == [False]
+
+
+@patch("ScamAnalysisEngine._classify_prompt_async")
+@patch("ScamAnalysisEngine.classify_call_async")
+@patch("live_call_ws.transcribe_audio_async")
+@patch("live_call_ws.get_caller_stats", return_value={"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0})
+def test_websocket_silent_chunk_skips_whisper_and_classifier(mock_stats, mock_transcribe, mock_call, mock_prompt):
+    with client.websocket_connect("/ws/live-call") as ws:
+        ws.send_bytes(_minimal_wav(num_samples=16000 * 10))
+        data = ws.receive_json()
+    mock_transcribe.assert_not_called()
+    mock_call.assert_not_called()
+    mock_prompt.assert_not_called()
+    assert data["chunk"] == 1
+    assert data["transcript"] == ""
+    assert data["risk_level"] == "Low"
+
+
+@patch("live_call_ws.transcribe_file_async", return_value="Hello there.")
+@patch("live_call_ws.LiveClassifierSession.add_chunk_async", return_value="0")
+@patch("live_call_ws.get_caller_stats", return_value={"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0})
+def test_websocket_non_pcm16_chunk_falls_back_to_ffmpeg(mock_stats, mock_classify, mock_transcribe):
+    with client.websocket_connect("/ws/live-call") as ws:
+        ws.send_bytes(_minimal_wav(num_samples=10, sample_rate=44100))
+        data = ws.receive_json()
+    assert mock_transcribe.call_args[0][0].endswith(".wav")
+    assert data["transcript"] == "Hello there."
+
+
+def _pcm_frames(seconds: float, amplitude: float, frame_s: float = 0.5):
+    import numpy as np
+    t = np.arange(int(16000 * seconds)) / 16000
+    pcm = (amplitude * 32767 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+    step = int(16000 * frame_s) * 2
+    return [pcm[i:i + step] for i in range(0, len(pcm), step)]
+
+
+@patch("live_call_ws.transcribe_audio_async", return_value="buy a gift card and read me the verification code")
+@patch("live_call_ws.LiveClassifierSession.add_chunk_async", return_value="2")
+@patch("live_call_ws.get_caller_stats", return_value={"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0})
+def test_websocket_stream_mode_sends_partials_then_final(mock_stats, mock_classify, mock_transcribe):
+    with client.websocket_connect("/ws/live-call?mode=stream") as ws:
+        for frame in _pcm_frames(1.5, 0.3) + _pcm_frames(1.0, 0.0):
+            ws.send_bytes(frame)
+        messages = [ws.receive_json() for _ in range(2)]
+    partial, final = messages
+    assert partial["type"] == "partial"
+    assert partial["risk_level"] == "High"          # local early warning on interim text
+    assert final["type"] == "final"
+    assert final["segment"] == partial["segment"] == 0
+    assert final["start"] < 0.1 and 1.4 < final["end"] < 1.6
+    assert final["transcript"] == "buy a gift card and read me the verification code"
+    assert final["risk_level"] == "High"
+
+
+@patch("live_call_ws.transcribe_audio_async", return_value="hello")
+@patch("live_call_ws.LiveClassifierSession.add_chunk_async", return_value="0")
+@patch("live_call_ws.get_caller_stats", return_value={"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0})
+def test_websocket_stream_mode_end_flushes_utterance(mock_stats, mock_classify, mock_transcribe):
+    with client.websocket_connect("/ws/live-call?mode=stream") as ws:
+        ws.send_bytes(_pcm_frames(0.5, 0.3)[0])
+        ws.send_text("end")
+        final = ws.receive_json()
+    assert final["type"] == "final"
+    assert final["text"] == "hello"
+    assert final["risk_level"] == "Low"
+
+
+@patch("live_call_ws.transcribe_audio_async", return_value="hello")
+@patch("live_call_ws.LiveClassifierSession.add_chunk_async", return_value="0")
+@patch("live_call_ws.get_caller_stats", return_value={"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0})
+def test_websocket_known_scam_chunk_is_high_at_once(mock_stats, mock_classify, mock_transcribe, known_scam):
+    with client.websocket_connect("/ws/live-call") as ws:
+        ws.send_bytes(_samples_wav(known_scam[:RATE_16K * 5]))
+        first = ws.receive_json()
+        ws.send_bytes(_tone_wav(1.0))
+        second = ws.receive_json()
+    assert first["risk_level"] == "High" and first["fingerprint"]["name"] == "gift-card robocall"
+    assert second["risk_level"] == "High" and second["fingerprint"] == first["fingerprint"]
+    mock_transcribe.assert_not_called()  # the rest of the call isn't transcribed either
+    mock_classify.assert_not_called()
+
+
+@patch("live_call_ws.transcribe_audio_async", return_value="hello")
+@patch("live_call_ws.LiveClassifierSession.add_chunk_async", return_value="0")
+@patch("live_call_ws.get_caller_stats", return_value={"total_reports": 0, "medium_risk_reports": 0, "high_risk_reports": 0})
+def test_websocket_stream_mode_matches_finished_utterances(mock_stats, mock_classify, mock_transcribe, known_scam):
+    pcm = (known_scam * 32767).astype("<i2").tobytes()
+    with client.websocket_connect("/ws/live-call?mode=stream") as ws:
+        for i in range(0, len(pcm), RATE_16K):
+            ws.send_bytes(pcm[i:i + RATE_16K])
+        ws.send_text("end")
+        messages = []
+        while not messages or messages[-1]["type"] != "final":
+            messages.append(ws.receive_json())
+    assert messages[-1]["risk_level"] == "High"
+    assert messages[-1]["fingerprint"]["name"] == "gift-card robocall"
+    mock_classify.assert_not_called()
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _minimal_wav() -> bytes:
-    """Return a valid 44-byte WAV header with no audio data."""
+RATE_16K = 16000
+
+
+def _tone_wav(seconds: float) -> bytes:
+    """16 kHz mono PCM16 WAV of a 220 Hz tone (loud enough to pass voice activity detection)."""
+    return _minimal_wav(num_samples=int(16000 * seconds))[:44] + b"".join(_pcm_frames(seconds, 0.3))
+
+
+def _minimal_wav(num_samples: int = 0, sample_rate: int = 16000) -> bytes:
+    """Return a valid WAV with `num_samples` of silence (header only by default)."""
     import struct
-    num_samples = 0
-    sample_rate = 16000
     num_channels = 1
     bits_per_sample = 16
     byte_rate = sample_rate * num_channels * bits_per_sample // 8
@@ -205,4 +602,4 @@ def _minimal_wav() -> bytes:
         b"data",
         data_size,
     )
-    return header
+    return header + b"\x00" * data_size
@@ -0,0 +1,91 @@
+"""
+Tests for vad.py — energy + zero-crossing voice activity detection.
+"""
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import vad
+from vad import VoiceActivityDetector, frame_features, speech_regions, trim_silence
+
+SR = 16000
+
+
+def _speech(seconds, freq=220, amplitude=0.3):
+    t = np.arange(int(SR * seconds)) / SR
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _silence(seconds):
+    return np.zeros(int(SR * seconds), dtype=np.float32)
+
+
+def test_frame_features_rms_and_zcr():
+    rms, zcr = frame_features(_speech(0.3, freq=400), frame=480)
+    assert len(rms) == 10
+    assert np.allclose(rms, 0.3 / np.sqrt(2), rtol=0.02)
+    assert np.allclose(zcr, 2 * 400 / SR, rtol=0.1)
+
+
+def test_regions_cover_speech_only():
+    audio = np.concatenate([_silence(2.0), _speech(1.0), _silence(3.0), _speech(0.5), _silence(1.0)])
+    regions = speech_regions(audio, pad_ms=0, min_gap_ms=0)
+    assert len(regions) == 2
+    (s1, e1), (s2, e2) = regions
+    assert abs(s1 / SR - 2.0) <= 0.03 and abs(e1 / SR - 3.0) <= 0.03
+    assert abs(s2 / SR - 6.0) <= 0.03 and abs(e2 / SR - 6.5) <= 0.03
+
+
+def test_short_gaps_are_bridged_and_padding_applied():
+    audio = np.concatenate([_silence(1.0), _speech(0.5), _silence(0.2), _speech(0.5), _silence(1.0)])
+    regions = speech_regions(audio, pad_ms=100, min_gap_ms=300)
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert abs(start / SR - 0.9) <= 0.03 and abs(end / SR - 2.3) <= 0.03
+
+
+def test_clicks_shorter_than_min_speech_are_dropped():
+    audio = np.concatenate([_silence(1.0), _speech(0.03), _silence(1.0)])
+    assert speech_regions(audio, min_speech_ms=90) == []
+
+
+def test_hum_and_hiss_are_not_speech():
+    rng = np.random.default_rng(0)
+    hum = _speech(2.0, freq=50, amplitude=0.3)                 # mains hum: too few crossings
+    hiss = (0.3 * rng.standard_normal(SR * 2)).astype(np.float32)  # broadband: too many
+    assert speech_regions(hum) == []
+    assert speech_regions(hiss) == []
+
+
+def test_steady_background_is_absorbed_into_the_noise_floor():
+    detector = VoiceActivityDetector()
+    quiet = np.full(SR * 20, 0.0, dtype=np.float32)
+    quiet[::2] = 0.002  # low-level line noise keeps the floor low at first
+    tune = _speech(40.0, freq=330, amplitude=0.05)
+    detector.mask(quiet)
+    mask = detector.mask(tune)
+    # Detected at first, then the floor rises past it and the rest is dropped
+    assert mask[0] and not mask[-1]
+
+
+def test_trim_silence_returns_speech_and_records_savings():
+    before = vad.stats()
+    audio = np.concatenate([_silence(4.0), _speech(1.0), _silence(4.0)])
+    speech = trim_silence(audio)
+    assert SR <= len(speech) <= SR * 1.5
+    assert len(trim_silence(_silence(2.0))) == 0
+
+    after = vad.stats()
+    assert after["clips"] == before["clips"] + 2
+    assert after["clips_without_speech"] == before["clips_without_speech"] + 1
+    assert after["seconds_saved"] - before["seconds_saved"] >= 9.5
+
+
+def test_trim_silence_disabled_passes_audio_through():
+    audio = _silence(1.0)
+    with patch("vad.VAD_ENABLED", False):
+        assert trim_silence(audio) is audio
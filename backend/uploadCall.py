@@ -1,15 +1,86 @@
 # backend_python/main.py
 from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from pathlib import Path
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import json
+import os
 import secrets
-from TranscriptionEngine import transcribe
-from ScamAnalysisEngine import classify_call
-from blockchain.scam_registry import get_caller_stats, submit_caller_report
+import time
+from TranscriptionEngine import (
+    transcribe_async, reserve_slot, AdmissionSlot, TranscriptionQueueFull, shutdown_executor, queue_stats, batch_stats,
+    warm_up as warm_up_transcription, is_ready as transcription_ready, model_stats, legacy_audio,
+    load_call_audio,
+)
+from ScamAnalysisEngine import (
+    classify_call_async, cached_label, CLASSIFY_CACHE, MODEL_ROUTER, probe_model, GEMINI_API_KEY,
+    warm_up as warm_up_classifier,
+)
+import content_index
+import fingerprint
+import ingest
+import local_scorer
+import script_index
+from artifact_store import get_store, start_sweeper, stop_sweeper
+import vad
+from blockchain.scam_registry import (
+    get_caller_stats, caller_stats_metrics, start_registry_indexer, stop_registry_indexer,
+    queue_caller_report, report_status, report_queue_stats, start_report_queue, stop_report_queue,
+)
 from live_call_ws import live_call_ws
+from jobs import JobContext, JobFailed, JobRunner
+
 
-app = FastAPI(title="ScamScan Backend")
+# Load the Whisper model and build the Gemini clients right after start-up, in the
+# background, so the first request doesn't pay for them. /api/ready turns 200 when
+# that's done. WARM_UP=0 skips it: models load on first use and /api/ready is always 200.
+WARM_UP = os.getenv("WARM_UP", "1") != "0"
+_warm_up = {"done": False, "seconds": None, "error": None}
+
+
+async def _run_warm_up() -> None:
+    started = time.perf_counter()
+    try:
+        # On the event loop, so the async Gemini client it builds is this loop's
+        if not warm_up_classifier():
+            print("[warm-up] GEMINI_API_KEY is not set; calls will be labelled by the fallback rules")
+        await asyncio.to_thread(warm_up_transcription)
+    except Exception as e:
+        _warm_up["error"] = f"{type(e).__name__}: {e}"
+        print(f"[warm-up] failed, models will load on first use: {e}")
+        return
+    _warm_up.update(done=True, seconds=round(time.perf_counter() - started, 2))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_task = asyncio.create_task(_run_warm_up()) if WARM_UP else None
+    # Re-probe Gemini models whose circuit breaker tripped
+    MODEL_ROUTER.start_probing(probe_model, interval=float(os.getenv("MODEL_PROBE_INTERVAL_S", "30")))
+    # Follow the registry's events into a local mirror (REGISTRY_MIRROR=1)
+    try:
+        start_registry_indexer()
+    except RuntimeError as e:
+        print(f"[registry] mirror disabled: {e}")
+    # Resume on-chain reports left queued by a previous run
+    start_report_queue()
+    # Expire and evict stored call audio (see artifact_store.py)
+    start_sweeper()
+    yield
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    stop_sweeper()
+    stop_report_queue()
+    stop_registry_indexer()
+    MODEL_ROUTER.stop_probing()
+    # Let in-flight transcriptions finish before the worker exits
+    shutdown_executor()
+
+
+app = FastAPI(title="ScamScan Backend", lifespan=lifespan)
 
 # CORS for local dev; adjust in prod
 app.add_middleware(
@@ -20,12 +91,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-BASE_DIR = Path(__file__).resolve().parent
-TMP_DIR = BASE_DIR / "tmp"
-TMP_DIR.mkdir(parents=True, exist_ok=True)
+job_runner = JobRunner()
+
+# Longest an analyse request with wait=true is held open before it falls back to the 202
+ANALYSE_WAIT_S = float(os.getenv("ANALYSE_WAIT_S", "20"))
 
-ALLOWED_EXTS = {".mp3", ".wav", ".m4a", ".ogg"}
 MAX_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_CHUNK = 1024 * 1024
 
 _RISK_SCORE = {"Low": 0.15, "Medium": 0.55, "High": 0.90}
 _RISK_ADVICE = {
@@ -36,8 +108,8 @@ _RISK_ADVICE = {
 
 
 @app.websocket("/ws/live-call")
-async def websocket_live_call(websocket: WebSocket, phone_number: str = ""):
-    await live_call_ws(websocket, phone_number)
+async def websocket_live_call(websocket: WebSocket, phone_number: str = "", mode: str = "chunk"):
+    await live_call_ws(websocket, phone_number, mode)
 
 
 @app.get("/api/health")
@@ -45,58 +117,132 @@ def health():
     return {"ok": True}
 
 
+@app.get("/api/ready")
+def ready():
+    """Readiness probe: 503 until the warm-up has loaded the models. /api/health only says the process is up."""
+    is_ready = transcription_ready() or not WARM_UP
+    body = {
+        "ready": is_ready,
+        "transcription": model_stats(),
+        "gemini_configured": bool(GEMINI_API_KEY),
+        "warm_up": {"enabled": WARM_UP, **_warm_up},
+    }
+    return body if is_ready else JSONResponse(body, status_code=503)
+
+
+@app.get("/api/models")
+def model_health():
+    """Router state: per-model circuit, success/failure counts and latency."""
+    return MODEL_ROUTER.snapshot()
+
+
+@app.get("/api/metrics")
+def metrics():
+    """Runtime counters for monitoring and tuning."""
+    return {
+        "transcription": {
+            "model": model_stats(),
+            "queue": queue_stats(),
+            "batching": batch_stats(),
+            "vad": vad.stats(),
+            "ingest": ingest.stats(),
+            "artifacts": get_store().stats(),
+        },
+        "classification": {
+            "cache": CLASSIFY_CACHE.stats(),
+            "preclassifier": local_scorer.stats(),
+            "scripts": script_index.stats(),
+        },
+        "dedup": content_index.stats(),
+        "fingerprints": fingerprint.stats(),
+        "caller_stats": caller_stats_metrics(),
+        "reports": report_queue_stats(),
+    }
+
+
 @app.post("/api/calls/upload")
 async def upload_audio(file: UploadFile = File(...)):
-    ext = Path(file.filename or "").suffix.lower()
-    if ext not in ALLOWED_EXTS:
+    """
+    Store an upload as 16 kHz mono PCM, decoding it while it arrives (see ingest.py),
+    in the artifact store. The format is sniffed from the content; the filename is ignored.
+    """
+    chunk = await file.read(UPLOAD_CHUNK)
+    fmt = ingest.sniff_format(chunk)
+    if fmt is None:
         raise HTTPException(status_code=400, detail="Unsupported file type.")
 
     call_id = secrets.token_hex(16)
-    dest = TMP_DIR / f"{call_id}{ext}"
+    store = get_store()
+    decoder = ingest.UploadDecoder(store.shard_dir(call_id), call_id, fmt)
+    digest = hashlib.sha256()  # content address, see content_index.py
 
     written = 0
     try:
-        with dest.open("wb") as f:
-            while True:
-                chunk = await file.read(1024 * 1024)  # 1MB
-                if not chunk:
-                    break
-                written += len(chunk)
-                if written > MAX_SIZE:
-                    raise HTTPException(status_code=413, detail="File too large.")
-                f.write(chunk)
-    except Exception:
-        if dest.exists():
-            try:
-                dest.unlink()
-            except OSError:
-                pass
+        while chunk:
+            written += len(chunk)
+            if written > MAX_SIZE:
+                raise HTTPException(status_code=413, detail="File too large.")
+            digest.update(chunk)
+            await decoder.feed(chunk)
+            chunk = await file.read(UPLOAD_CHUNK)
+        dest = await decoder.finish()
+        await asyncio.to_thread(store.put, call_id, dest, decoder.duration_s, digest.hexdigest(), decoder.pcm_sha256)
+    except ingest.UnsupportedAudio:
+        raise HTTPException(status_code=415, detail="Could not decode the audio.")
+    except BaseException:
+        # Including cancellation (client went away): don't leave ffmpeg or partial files behind
+        await decoder.abort()
         raise
 
-    return {"call_id": call_id, "filename": dest.name}
+    return {"call_id": call_id, "filename": dest.name, "format": fmt, "duration_s": round(decoder.duration_s, 2)}
 
 
 class AnalysePayload(BaseModel):
     phone_number: str | None = None
 
 
-@app.post("/api/calls/{call_id}/analyse")
-async def analyse_call(call_id: str, payload: AnalysePayload = AnalysePayload()):
-    matches = list(TMP_DIR.glob(f"{call_id}.*"))
-    if not matches:
-        raise HTTPException(status_code=404, detail="Audio not found for call_id.")
+def _match_known_scam(call_id: str):
+    return fingerprint.match_known_scam(load_call_audio(call_id))
 
-    phone_number = payload.phone_number
 
-    transcript = transcribe(call_id)
+async def _run_analysis(call_id: str, artifact: dict | None, known: str | None, slot: AdmissionSlot | None,
+                        phone_number: str | None, job: JobContext) -> dict:
+    """
+    Analysis pipeline: transcribe, classify against caller history, report on-chain.
+    A recording that was analysed before reuses its transcript `known` (see content_index.py);
+    one that matches a known scam recording (fingerprint.py) is High without either step.
+    `slot` is the transcription admission analyse_call reserved, released once transcription is over.
+    """
+    match = None
+    try:
+        if known is None and not fingerprint.get_index().empty:
+            with job.stage("fingerprinting"):
+                match = await asyncio.to_thread(_match_known_scam, call_id)
+        if match is None:
+            with job.stage("transcribing"):
+                if known is not None:
+                    transcript = known
+                else:
+                    transcript = await transcribe_async(call_id, slot)
+                    if artifact:
+                        content_index.remember(artifact, transcript)
+    finally:
+        if slot is not None:
+            slot.release()  # unused if the fingerprint decided the call
 
-    stats = get_caller_stats(phone_number) if phone_number else {"total_reports": 0, "high_risk_reports": 0, "medium_risk_reports": 0}
-    risk_int = int(classify_call(
-        transcript,
-        stats["total_reports"],
-        stats["medium_risk_reports"],
-        stats["high_risk_reports"],
-    ))
+    if match is not None:
+        transcript, risk_int = "", 2
+    else:
+        with job.stage("classifying"):
+            if phone_number:
+                stats = await asyncio.to_thread(get_caller_stats, phone_number)
+            else:
+                stats = {"total_reports": 0, "high_risk_reports": 0, "medium_risk_reports": 0}
+            counts = (stats["total_reports"], stats["medium_risk_reports"], stats["high_risk_reports"])
+            label = cached_label(transcript, *counts) if known is not None else None
+            if known is not None:
+                content_index.record_reuse(artifact, classified=label is not None)
+            risk_int = int(label or await classify_call_async(transcript, *counts))
 
     if risk_int == 0:
         risk_level = "Low"
@@ -105,12 +251,115 @@ async def analyse_call(call_id: str, payload: AnalysePayload = AnalysePayload())
     else:
         risk_level = "High"
 
+    report_id = None
     if phone_number:
-        submit_caller_report(phone_number, risk_int)
+        with job.stage("reporting"):
+            # Queued for the background submitter; the response doesn't wait for the chain
+            report_id = queue_caller_report(phone_number, risk_int)
 
     return {
         "transcript": transcript,
         "risk_level": risk_level,
         "scam_score": _RISK_SCORE[risk_level],
         "advice": _RISK_ADVICE[risk_level],
+        "report_id": report_id,
+        "fingerprint": match.to_dict() if match is not None else None,
     }
+
+
+@app.post("/api/calls/{call_id}/analyse")
+async def analyse_call(call_id: str, payload: AnalysePayload = AnalysePayload(), wait: bool = False):
+    """
+    Enqueue an analysis job and return its id (202); the result is fetched from
+    /api/jobs/{job_id}/result. With wait=true the response carries the result if the
+    job finishes within ANALYSE_WAIT_S, and is the same 202 otherwise.
+    """
+    artifact = get_store().get(call_id)
+    if artifact is None and legacy_audio(call_id) is None:
+        raise HTTPException(status_code=404, detail="Audio not found for call_id.")
+
+    # Reserve transcription capacity now, so a full queue is a 429 the client can retry,
+    # not a job that fails later. A recording analysed before needs no transcription.
+    known = content_index.lookup(artifact) if artifact else None
+    try:
+        slot = reserve_slot() if known is None else None
+    except TranscriptionQueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Transcription queue is full ({e.depth} pending). Try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+    phone_number = payload.phone_number
+    job = job_runner.submit(call_id, lambda ctx: _run_analysis(call_id, artifact, known, slot, phone_number, ctx))
+
+    if wait:
+        try:
+            result = await job_runner.wait(job["job_id"], timeout=ANALYSE_WAIT_S)
+            return {"job_id": job["job_id"], **result}
+        except asyncio.TimeoutError:
+            job = job_runner.get(job["job_id"])
+        except JobFailed as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job["job_id"], "status": job["status"]},
+        headers={"Location": f"/api/jobs/{job['job_id']}"},
+    )
+
+
+@app.get("/api/calls/{call_id}/fingerprint")
+async def match_fingerprint(call_id: str):
+    """Best match of the call's audio among known scam recordings, and whether it's strong enough to decide the call."""
+    if get_store().get(call_id) is None and legacy_audio(call_id) is None:
+        raise HTTPException(status_code=404, detail="Audio not found for call_id.")
+    index = fingerprint.get_index()
+    match = None if index.empty else await asyncio.to_thread(lambda: fingerprint.best_match(load_call_audio(call_id), index))
+    return {"match": {**match.to_dict(), "strong": match.is_strong()} if match is not None else None}
+
+
+def _get_job_or_404(job_id: str) -> dict:
+    job = job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    return _get_job_or_404(job_id)
+
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = _get_job_or_404(job_id)
+    if job["status"] == "done":
+        return job["result"]
+    if job["status"] == "failed":
+        raise HTTPException(status_code=job["error_status"] or 500, detail=job["error"])
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": job["status"], "stage": job["stage"]})
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events: one `job` event per state change, ending when the job finishes."""
+    _get_job_or_404(job_id)
+
+    async def event_stream():
+        async for job in job_runner.events(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: job\ndata: {json.dumps(job)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/api/reports/{report_id}")
+def get_report(report_id: int):
+    """Status of a queued on-chain report: pending, signed, sent or failed (with tx_hash once signed)."""
+    report = report_status(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found.")
+    return report
@@ -0,0 +1,170 @@
+# backend/vad.py
+"""
+Voice activity detection ahead of Whisper.
+
+Calls are full of silence, line noise and hold music, and every second of it
+costs a Whisper pass (and, on the live socket, a classification of nothing).
+This stage finds speech cheaply on NumPy frames so only that is transcribed:
+
+  energy  frame RMS above both VAD_ENERGY_THRESHOLD and VAD_NOISE_RATIO times
+          an adaptive noise floor (the floor falls at once and creeps up
+          slowly, so steady background - hiss, hum, a long hold tune - is
+          absorbed into it and stops counting as speech);
+  ZCR     zero-crossing rate inside [VAD_ZCR_MIN, VAD_ZCR_MAX]: mains hum and
+          DC offset cross too rarely, broadband hiss too often.
+
+Speech regions are padded by VAD_PAD_MS, gaps shorter than VAD_MIN_GAP_MS are
+bridged and blips shorter than VAD_MIN_SPEECH_MS dropped, so Whisper still gets
+whole words with natural pauses. VAD_ENABLED=0 turns the stage off.
+"""
+
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") != "0"
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_ENERGY_THRESHOLD = float(os.getenv("VAD_ENERGY_THRESHOLD", "0.01"))  # minimum speech RMS (~ -40 dBFS)
+VAD_NOISE_RATIO = float(os.getenv("VAD_NOISE_RATIO", "3.0"))
+VAD_FLOOR_RISE = float(os.getenv("VAD_FLOOR_RISE", "1.004"))  # per frame; steady sound is absorbed in ~15 s
+VAD_ZCR_MIN = float(os.getenv("VAD_ZCR_MIN", "0.01"))    # crossings per sample; 0.01 ~ an 80 Hz tone
+VAD_ZCR_MAX = float(os.getenv("VAD_ZCR_MAX", "0.45"))    # white noise sits around 0.5
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))
+VAD_MIN_GAP_MS = int(os.getenv("VAD_MIN_GAP_MS", "300"))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "90"))
+
+
+def frame_features(audio: np.ndarray, frame: int) -> tuple[np.ndarray, np.ndarray]:
+    """Per-frame RMS and zero-crossing rate. A short last frame is zero-padded."""
+    n = -(-len(audio) // frame)
+    frames = np.zeros(n * frame, dtype=np.float32)
+    frames[:len(audio)] = audio
+    frames = frames.reshape(n, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    # Crossings of the frame's own mean, so a DC offset doesn't hide them
+    signs = np.signbit(frames - frames.mean(axis=1, keepdims=True))
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(1, frame - 1)
+    return rms, zcr
+
+
+class VoiceActivityDetector:
+    """
+    Frame classifier with an adaptive noise floor. Keep one per stream (a live
+    call) so the floor carries over from chunk to chunk.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS,
+                 threshold: float = VAD_ENERGY_THRESHOLD, noise_ratio: float = VAD_NOISE_RATIO,
+                 zcr_min: float = VAD_ZCR_MIN, zcr_max: float = VAD_ZCR_MAX, floor_rise: float = VAD_FLOOR_RISE):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.threshold = threshold
+        self.noise_ratio = noise_ratio
+        self.zcr_min = zcr_min
+        self.zcr_max = zcr_max
+        self.floor_rise = floor_rise
+        self.noise_floor: Optional[float] = None
+
+    def mask(self, audio: np.ndarray) -> np.ndarray:
+        """One bool per frame of `audio`: True where it looks like speech."""
+        if not len(audio):
+            return np.zeros(0, dtype=bool)
+        rms, zcr = frame_features(audio, self.frame)
+        loud = np.zeros(len(rms), dtype=bool)
+        floor = self.noise_floor
+        for i, level in enumerate(rms.tolist()):
+            if floor is None:
+                floor = min(level, self.threshold)
+            loud[i] = level >= max(self.threshold, self.noise_ratio * floor)
+            floor = max(1e-4, min(level, floor * self.floor_rise))
+        self.noise_floor = floor
+        return loud & (zcr >= self.zcr_min) & (zcr <= self.zcr_max)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        return bool(self.mask(frame)[0])
+
+
+def speech_regions(audio: np.ndarray, detector: Optional[VoiceActivityDetector] = None,
+                   pad_ms: int = VAD_PAD_MS, min_gap_ms: int = VAD_MIN_GAP_MS,
+                   min_speech_ms: int = VAD_MIN_SPEECH_MS) -> list[tuple[int, int]]:
+    """[start, end) sample ranges holding speech, padded and merged."""
+    detector = detector or VoiceActivityDetector()
+    mask = detector.mask(audio)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    runs = edges.reshape(-1, 2)  # [start_frame, end_frame) of each speech run
+
+    ms_per_frame = 1000 * detector.frame / detector.sample_rate
+    min_frames = max(1, round(min_speech_ms / ms_per_frame))
+    pad = round(pad_ms / ms_per_frame)
+    min_gap = round(min_gap_ms / ms_per_frame)
+
+    regions: list[list[int]] = []
+    for start, end in runs.tolist():
+        if end - start < min_frames:
+            continue
+        start, end = max(0, start - pad), min(len(mask), end + pad)
+        if regions and start - regions[-1][1] < min_gap:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    return [(s * detector.frame, min(len(audio), e * detector.frame)) for s, e in regions]
+
+
+def trim_silence(audio: np.ndarray, detector: Optional[VoiceActivityDetector] = None) -> np.ndarray:
+    """
+    Just the speech in `audio` (regions joined back to back); empty if there is
+    none. Returns `audio` untouched when VAD is disabled.
+    """
+    if not VAD_ENABLED or not len(audio):
+        return audio
+    regions = speech_regions(audio, detector)
+    kept = sum(end - start for start, end in regions)
+    if kept == len(audio):
+        speech = audio
+    elif regions:
+        speech = np.concatenate([audio[start:end] for start, end in regions])
+    else:
+        speech = audio[:0]
+    record(len(audio), kept)
+    return speech
+
+
+# ----------------------
+# Metrics
+# ----------------------
+
+_lock = threading.Lock()
+_clips = 0
+_silent_clips = 0
+_audio_samples = 0
+_speech_samples = 0
+
+
+def record(audio_samples: int, speech_samples: int) -> None:
+    """Count one clip that went through VAD and how much of it was kept."""
+    global _clips, _silent_clips, _audio_samples, _speech_samples
+    with _lock:
+        _clips += 1
+        _silent_clips += speech_samples == 0
+        _audio_samples += audio_samples
+        _speech_samples += speech_samples
+
+
+def stats() -> dict:
+    with _lock:
+        audio_s = _audio_samples / SAMPLE_RATE
+        speech_s = _speech_samples / SAMPLE_RATE
+        clips, silent = _clips, _silent_clips
+    return {
+        "enabled": VAD_ENABLED,
+        "clips": clips,
+        "clips_without_speech": silent,
+        "audio_seconds": round(audio_s, 1),
+        "speech_seconds": round(speech_s, 1),
+        "seconds_saved": round(audio_s - speech_s, 1),
+        "saved_ratio": round(1 - speech_s / audio_s, 4) if audio_s else None,
+    }
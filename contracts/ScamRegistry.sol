@@ -42,6 +42,24 @@ contract ScamRegistry {
     /// @param riskLevel  0 = LOW, 1 = MEDIUM, 2 = HIGH
     function submitReport(bytes32 callerHash, uint8 riskLevel) external {
         require(msg.sender == reporter, "Not authorized");
+        _record(callerHash, riskLevel);
+    }
+
+    /// @notice Submit several reports in one transaction
+    /// @dev Amortises the per-transaction cost when the backend has a queue of reports
+    /// @param callerHashes Hashes of normalised phone numbers (keccak256)
+    /// @param riskLevels   Risk level for each hash, same length as callerHashes
+    function submitReports(bytes32[] calldata callerHashes, uint8[] calldata riskLevels) external {
+        require(msg.sender == reporter, "Not authorized");
+        require(callerHashes.length == riskLevels.length, "Length mismatch");
+
+        for (uint256 i = 0; i < callerHashes.length; i++) {
+            _record(callerHashes[i], riskLevels[i]);
+        }
+    }
+
+    /// @dev Apply one report to the stats and emit ScamReported
+    function _record(bytes32 callerHash, uint8 riskLevel) private {
         require(riskLevel <= 2, "Invalid risk level"); // 0,1,2 only
 
         CallerStats storage s = stats[callerHash];
@@ -83,4 +101,31 @@ contract ScamRegistry {
             s.mediumRiskReports
         );
     }
+
+    /// @notice Get aggregated stats for several caller hashes in one call
+    /// @param callerHashes Hashes of normalised phone numbers (keccak256)
+    /// @return totalReports       Total number of reports, per hash
+    /// @return highRiskReports    Number of HIGH risk reports, per hash
+    /// @return mediumRiskReports  Number of MEDIUM risk reports, per hash
+    function getReports(bytes32[] calldata callerHashes)
+        external
+        view
+        returns (
+            uint256[] memory totalReports,
+            uint256[] memory highRiskReports,
+            uint256[] memory mediumRiskReports
+        )
+    {
+        uint256 n = callerHashes.length;
+        totalReports = new uint256[](n);
+        highRiskReports = new uint256[](n);
+        mediumRiskReports = new uint256[](n);
+
+        for (uint256 i = 0; i < n; i++) {
+            CallerStats storage s = stats[callerHashes[i]];
+            totalReports[i] = s.totalReports;
+            highRiskReports[i] = s.highRiskReports;
+            mediumRiskReports[i] = s.mediumRiskReports;
+        }
+    }
 }
\ No newline at end of file
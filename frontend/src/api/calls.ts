@@ -7,6 +7,7 @@ export type AnalyseResult = {
 };
 
 const API_BASE = "/api"; // using Vite proxy to http://localhost:8000
+const JOB_POLL_MS = 1000;
 
 export async function uploadAudio(file: File): Promise<string> {
   const form = new FormData();
@@ -24,15 +25,21 @@ export async function uploadAudio(file: File): Promise<string> {
   return data.call_id as string;
 }
 
+// The analyse endpoint answers 202 with a job id; the result is polled from the job
 export async function analyseCall(
   callId: string,
-  opts?: { phoneNumber?: string }
+  opts?: { phoneNumber?: string; pollMs?: number }
 ): Promise<AnalyseResult> {
-  const res = await fetch(`${API_BASE}/calls/${callId}/analyse`, {
+  let res = await fetch(`${API_BASE}/calls/${callId}/analyse`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ phone_number: opts?.phoneNumber ?? null }),
   });
+  while (res.status === 202) {
+    const { job_id } = await res.json();
+    await new Promise((resolve) => setTimeout(resolve, opts?.pollMs ?? JOB_POLL_MS));
+    res = await fetch(`${API_BASE}/jobs/${job_id}/result`);
+  }
   if (!res.ok) {
     let detail = "";
     try {
@@ -127,6 +127,24 @@ describe("analyseCall", () => {
     expect(result.advice).toBe("Do not engage.");
   });
 
+  it("polls the job result while the analysis is running", async () => {
+    mockOk({ job_id: "job-1", status: "queued" }, 202);
+    mockOk({ job_id: "job-1", status: "running", stage: "transcribing" }, 202);
+    mockOk(mockResult);
+
+    const result = await analyseCall("my-call-id", { pollMs: 0 });
+
+    expect(result.risk_level).toBe("HIGH");
+    expect(mockFetch.mock.calls[1][0]).toBe("/api/jobs/job-1/result");
+    expect(mockFetch).toHaveBeenCalledTimes(3);
+  });
+
+  it("throws when the job fails", async () => {
+    mockOk({ job_id: "job-1", status: "queued" }, 202);
+    mockFail(500, { detail: "Transcription failed" });
+    await expect(analyseCall("my-call-id", { pollMs: 0 })).rejects.toThrow(/500/);
+  });
+
   it("throws on 404 (audio not found)", async () => {
     mockFail(404, { detail: "No audio found" });
     await expect(analyseCall("missing-id")).rejects.toThrow(/404/);